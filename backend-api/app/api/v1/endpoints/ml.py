@@ -1,26 +1,484 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from app.ml.inference.food_detector import FoodDetector
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS, Counter, Gauge, registry
+from app.ml.inference.batching import BatchScheduler
+from app.ml.inference.cache import DetectionCache
+from app.ml.inference.executor import (
+    InferencePool,
+    InferenceQueueFull,
+    InferenceTimeout,
+    InferenceWorkerLost,
+    process_detect_batch_from_bytes,
+    process_detect_from_bytes
+)
+from app.ml.inference.loader import ModelNotReady
+from app.ml.inference.registry import (
+    CANDIDATE,
+    ModelLoadInProgress,
+    ModelRegistry,
+    ModelVersion,
+    resolve_model_path
+)
+from app.ml.inference.streaming import LatestFrame, StreamSession
+from app.models.meal import MealDetectionsRequest
+from app.models.registry import CandidateTrafficRequest, ModelLoadRequest
+from app.services.meal_analyzer import MealAnalyzer
+from app.utils.responses import FastJSONResponse, detection_response, dumps
+from app.utils.static_responses import PrecomputedResponse
+from app.utils.uploads import read_upload, validate_image
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import asyncio
+import hmac
+import json
+import logging
 import os
+import time
 import uuid
-from typing import List, Dict
+import weakref
+from typing import Any, AsyncIterator, Iterator, List, Literal, Dict, Optional, Tuple
 
-router = APIRouter()
-food_detector = FoodDetector()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=FastJSONResponse)
+use_worker_pool = settings.INFERENCE_EXECUTOR == "shared_memory"
+
+# Metadata endpoints of the active model, encoded once per model by build_static_responses
+static_responses: Dict[str, PrecomputedResponse] = {}
+# Per model (active or candidate): the /analyze-meal model_info block for each class_names option and
+# the nutrient matrix, built by get_meal_metadata; entries go away with the detector of a released version
+meal_metadata = weakref.WeakKeyDictionary()
+
+def food_classes_response(food_detector) -> PrecomputedResponse:
+    return PrecomputedResponse({
+        "success": True,
+        "num_classes": len(food_detector.class_names),
+        "classes": food_detector.class_names
+    })
+
+def build_static_responses(food_detector):
+    """Precompute the metadata payloads of a newly activated model"""
+    global static_responses
+    model_info = food_detector.get_model_info()
+    static_responses = {
+        "food-classes": food_classes_response(food_detector),
+        "model-info": PrecomputedResponse({
+            "success": True,
+            "model_name": "HealthSphere_Food_Detection_v1",
+            "framework": "YOLOv8",
+            "num_classes": len(food_detector.class_names),
+            "confidence_threshold": food_detector.confidence_threshold,
+            "supported_formats": ["JPG", "PNG", "JPEG"]
+        }),
+        "debug-model": PrecomputedResponse({
+            "success": True,
+            "model_loaded": True,
+            "class_names_count": len(food_detector.class_names),
+            "class_names": food_detector.class_names,
+            "confidence_threshold": food_detector.confidence_threshold,
+            "model_info": model_info
+        })
+    }
+
+def build_meal_model_info(food_detector) -> Dict[str, Dict]:
+    """The model_info block of /analyze-meal for each class_names option"""
+    model_info = food_detector.get_model_info()
+    without_classes = {key: value for key, value in model_info.items() if key != "class_names"}
+    return {
+        "full": model_info,
+        "ref": {
+            **without_classes,
+            "class_names_url": f"{settings.API_V1_STR}/ml/food-classes",
+            "class_names_etag": food_classes_response(food_detector).etag
+        },
+        "omit": without_classes
+    }
+
+def build_nutrition_estimator(food_detector):
+    """Index the nutrition table by the class ids of a model"""
+    from app.services.nutrition import NutritionEstimator
+    return NutritionEstimator(
+        food_detector.class_names,
+        reference_area_fraction=settings.NUTRITION_REFERENCE_AREA_FRACTION,
+        portion_range=settings.NUTRITION_PORTION_RANGE
+    )
+
+def get_meal_metadata(food_detector) -> Tuple[Dict[str, Dict], Any]:
+    """The /analyze-meal model_info options and nutrition estimator (None when disabled) of a model"""
+    metadata = meal_metadata.get(food_detector)
+    if metadata is None:
+        nutrition_estimator = build_nutrition_estimator(food_detector) if settings.NUTRITION_ENABLED else None
+        metadata = meal_metadata[food_detector] = (build_meal_model_info(food_detector), nutrition_estimator)
+    return metadata
+
+def on_model_loaded(food_detector):
+    build_static_responses(food_detector)
+    get_meal_metadata(food_detector)
+
+# Worker processes own the model in "process" and "shared_memory" modes, so this process stays thin
+# and hot reload / A/B routing only apply to the in-process "thread" executor
+hot_reload_supported = settings.INFERENCE_EXECUTOR == "thread"
+model_registry = ModelRegistry(
+    settings.MODEL_PATH,
+    load_model=hot_reload_supported,
+    warmup_runs=settings.MODEL_WARMUP_RUNS,
+    warmup_image_size=settings.MODEL_WARMUP_IMAGE_SIZE,
+    on_activated=on_model_loaded,
+    candidate_path=settings.MODEL_CANDIDATE_PATH if hot_reload_supported else "",
+    candidate_traffic=settings.MODEL_CANDIDATE_TRAFFIC
+)
+if settings.MODEL_CANDIDATE_PATH and not hot_reload_supported:
+    logger.warning("MODEL_CANDIDATE_PATH is ignored with INFERENCE_EXECUTOR=%s", settings.INFERENCE_EXECUTOR)
+if not settings.LAZY_MODEL_LOADING:
+    model_registry.load_initial()
+
+inference_pool = InferencePool(
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_QUEUE_SIZE,
+    kind="thread" if use_worker_pool else settings.INFERENCE_EXECUTOR,
+    model_path=settings.MODEL_PATH
+)
+
+worker_pool = None
+if use_worker_pool:
+    from app.ml.inference.worker_pool import SharedMemoryWorkerPool
+    worker_pool = SharedMemoryWorkerPool(
+        num_workers=settings.SHM_WORKERS,
+        slots_per_worker=settings.SHM_SLOTS_PER_WORKER,
+        max_image_side=settings.SHM_MAX_IMAGE_SIDE,
+        model_path=settings.MODEL_PATH,
+        max_batch_size=settings.BATCH_MAX_SIZE,
+        request_timeout=settings.SHM_REQUEST_TIMEOUT_SECONDS
+    )
+
+def service_unavailable(e: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)}
+    )
+
+def get_detector():
+    """Return the active FoodDetector, or answer 503 while it is still loading"""
+    try:
+        return model_registry.get()
+    except ModelNotReady as e:
+        raise service_unavailable(e)
+
+@contextmanager
+def serve_model() -> Iterator[ModelVersion]:
+    """Hold the model version serving a request (active or A/B candidate) for the block,
+    or answer 503 while loading"""
+    if not inference_pool.ready:
+        detail = inference_pool.warmup_error or "still starting"
+        raise service_unavailable(ModelNotReady(f"Inference worker processes are not ready: {detail}"))
+    try:
+        with model_registry.serve() as version:
+            yield version
+    except ModelNotReady as e:
+        raise service_unavailable(e)
+
+def thread_detect_batch(items: List[Tuple[Any, bytes]]) -> List[List[Dict]]:
+    """Detect a scheduler batch of (detector, image bytes), one batched forward per model version"""
+    results: List[Optional[List[Dict]]] = [None] * len(items)
+    groups: Dict[int, List[int]] = {}
+    for index, (detector, _) in enumerate(items):
+        groups.setdefault(id(detector), []).append(index)
+    for indices in groups.values():
+        detector = items[indices[0]][0]
+        batch_detections = detector.detect_batch_from_bytes([items[index][1] for index in indices])
+        for index, detections in zip(indices, batch_detections):
+            results[index] = detections
+    return results
+
+# Worker processes own their models, so only picklable module-level functions cross over
+batch_scheduler = BatchScheduler(
+    process_detect_batch_from_bytes if settings.INFERENCE_EXECUTOR == "process" else thread_detect_batch,
+    max_batch_size=settings.BATCH_MAX_SIZE,
+    window_ms=settings.BATCH_WINDOW_MS,
+    executor=inference_pool.executor,
+    max_concurrent_batches=inference_pool.max_workers
+)
+
+meal_analyzer = MealAnalyzer(settings.MEAL_CONFIDENCE_EDGES)
+
+detection_cache = DetectionCache(
+    max_entries=settings.DETECTION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.DETECTION_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.DETECTION_CACHE_TTL_SECONDS,
+    disk_dir=settings.DETECTION_CACHE_DIR,
+    disk_max_entries=settings.DETECTION_CACHE_DISK_MAX_ENTRIES
+)
+
+async def detection_cache_key(image_bytes: bytes, food_detector) -> str:
+    """Cache key for an image under the given model version and thresholds"""
+    # Hashing a multi-MB upload takes a few ms, so keep it off the event loop
+    return await asyncio.to_thread(
+        DetectionCache.make_key,
+        image_bytes,
+        f"{food_detector.model_version}|{food_detector.preprocessing_version}",
+        food_detector.confidence_threshold,
+        food_detector.iou_threshold
+    )
+
+async def run_detection(image_bytes: bytes) -> Tuple[List[Dict], Any]:
+    """Return detections for an uploaded image from its routed model version, cached when possible,
+    together with the detector of that version for describing the model in the response
+
+    Inference errors propagate, so only real results are ever cached.
+    """
+    with serve_model() as version:
+        food_detector = version.detector
+        if not settings.DETECTION_CACHE_ENABLED:
+            return await run_inference(image_bytes, version), food_detector
+        
+        cache_key = await detection_cache_key(image_bytes, food_detector)
+        detections = await detection_cache.aget(cache_key)
+        if detections is None:
+            detections = await run_inference(image_bytes, version)
+            await detection_cache.aput(cache_key, detections)
+        return detections, food_detector
+
+def cascade_stages(detections: List[Dict]) -> Optional[List[str]]:
+    """Cascade stages that produced the detections; None when unknown (e.g. served from the disk cache)"""
+    stages = getattr(detections, "stages", None)
+    return list(stages) if stages else None
+
+def cascade_stats() -> Optional[Dict]:
+    """Escalation counters of the in-process cascade (worker processes keep their own)"""
+    detector = model_registry.active.detector
+    if detector is None or detector.cascade is None:
+        return None
+    return detector.cascade.stats()
+
+async def run_inference(image_bytes: bytes, version: Optional[ModelVersion] = None) -> List[Dict]:
+    """Run food detection on the inference pool, batching with concurrent requests
+
+    Without a version the request is routed here and holds its version for
+    the inference only.
+    """
+    if version is None:
+        with serve_model() as version:
+            return await run_inference(image_bytes, version)
+    
+    started = time.perf_counter()
+    detections = await infer_on_pool(image_bytes, version.detector)
+    version.record(1, len(detections), time.perf_counter() - started)
+    return detections
+
+async def infer_on_pool(image_bytes: bytes, food_detector) -> List[Dict]:
+    """Run one image through the executor of the configured INFERENCE_EXECUTOR"""
+    try:
+        with inference_pool.admit():
+            if worker_pool is not None:
+                # Decode here, then ship pixels to a worker through shared memory
+                prepared = await inference_pool.run(food_detector.prepare_image, image_bytes)
+                if prepared is None:
+                    logger.warning("Could not decode image data")
+                    return []
+                return await worker_pool.detect(prepared.image, prepared.original_size)
+            if settings.INFERENCE_EXECUTOR == "process":
+                if settings.BATCHING_ENABLED:
+                    return await batch_scheduler.submit(image_bytes)
+                return await inference_pool.run(process_detect_from_bytes, image_bytes)
+            if settings.BATCHING_ENABLED:
+                return await batch_scheduler.submit((food_detector, image_bytes))
+            return await inference_pool.run(food_detector.detect_from_bytes, image_bytes)
+    except (InferenceQueueFull, InferenceWorkerLost) as e:
+        raise service_unavailable(e)
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+async def run_batch_inference(images_bytes: List[bytes], version: ModelVersion) -> List[List[Dict]]:
+    """Run one batched forward over images that already arrived together"""
+    started = time.perf_counter()
+    results = await batch_on_pool(images_bytes, version.detector)
+    version.record(len(images_bytes), sum(map(len, results)), time.perf_counter() - started)
+    return results
+
+async def batch_on_pool(images_bytes: List[bytes], food_detector) -> List[List[Dict]]:
+    """Run images as one batch on the executor of the configured INFERENCE_EXECUTOR"""
+    try:
+        with inference_pool.admit():
+            if worker_pool is not None:
+                prepare_image = food_detector.prepare_image
+                images = await inference_pool.run(lambda: [prepare_image(b) for b in images_bytes])
+                return list(await asyncio.gather(*(
+                    worker_pool.detect(image.image, image.original_size) if image is not None
+                    else asyncio.sleep(0, result=[])
+                    for image in images
+                )))
+            # The images are already a batch, so skip the scheduler's collection window
+            if settings.INFERENCE_EXECUTOR == "process":
+                return await inference_pool.run(process_detect_batch_from_bytes, images_bytes)
+            return await inference_pool.run(food_detector.detect_batch_from_bytes, images_bytes)
+    except (InferenceQueueFull, InferenceWorkerLost) as e:
+        raise service_unavailable(e)
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+async def iter_batch_detections(
+    images_bytes: List[bytes], version: ModelVersion
+) -> AsyncIterator[Tuple[int, List[Dict], Dict]]:
+    """Yield (index, detections, timing) per image as soon as its result is available.
+
+    Cache hits are yielded first; the misses run in chunks of BATCH_MAX_SIZE,
+    one batched forward per chunk. All images of the request use the given
+    model version, which the caller holds (serve_model) until the last result.
+    """
+    started = time.perf_counter()
+    cache_keys: List[Optional[str]] = [None] * len(images_bytes)
+    pending = []
+    for index, image_bytes in enumerate(images_bytes):
+        if settings.DETECTION_CACHE_ENABLED:
+            cache_keys[index] = await detection_cache_key(image_bytes, version.detector)
+            detections = await detection_cache.aget(cache_keys[index])
+            if detections is not None:
+                yield index, detections, {
+                    "cached": True,
+                    "batch_size": 0,
+                    "batch_ms": 0.0,
+                    "elapsed_ms": (time.perf_counter() - started) * 1000
+                }
+                continue
+        pending.append(index)
+
+    chunk_size = max(1, settings.BATCH_MAX_SIZE)
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        forward_started = time.perf_counter()
+        results = await run_batch_inference([images_bytes[index] for index in chunk], version)
+        finished = time.perf_counter()
+        for index, detections in zip(chunk, results):
+            if cache_keys[index] is not None:
+                await detection_cache.aput(cache_keys[index], detections)
+            yield index, detections, {
+                "cached": False,
+                "batch_size": len(chunk),
+                "batch_ms": (finished - forward_started) * 1000,
+                "elapsed_ms": (finished - started) * 1000
+            }
+
+# Live camera streams, for /inference-stats
+stream_sessions: Dict[str, StreamSession] = {}
+
+# Scrape-time gauges for /metrics
+registry.register(Gauge("model_ready", "1 once the model is loaded and warmed up",
+                        function=lambda: 1.0 if is_model_loaded() else 0.0))
+registry.register(Gauge("model_load_seconds", "Time taken to load the model",
+                        function=lambda: model_registry.active.loader.load_seconds))
+registry.register(Gauge("model_warmup_seconds", "Time taken by the warm-up inferences",
+                        function=lambda: model_registry.active.loader.warmup_seconds))
+registry.register(Gauge("inference_in_flight", "Inference requests admitted and not yet finished",
+                        function=lambda: inference_pool.in_flight))
+registry.register(Counter("inference_rejected_total", "Inference requests rejected with 503",
+                        function=lambda: inference_pool.rejected_total))
+registry.register(Gauge("inference_batch_queue_depth", "Images waiting for the batch scheduler",
+                        function=lambda: batch_scheduler.queue_depth))
+registry.register(Gauge("inference_ready_workers", "Inference worker processes with a loaded model",
+                        function=lambda: worker_pool.ready_workers if worker_pool is not None
+                        else inference_pool.ready_workers if inference_pool.kind == "process" else None))
+registry.register(Gauge("detection_cache_entries", "Entries in the detection result cache",
+                        function=lambda: detection_cache.stats()["entries"]))
+registry.register(Gauge("detection_cache_hit_ratio", "Fraction of cache lookups served from the cache",
+                        function=lambda: detection_cache.stats()["hit_rate"]))
+registry.register(Gauge("stream_sessions_active", "Open camera-stream WebSocket sessions",
+                        function=lambda: len(stream_sessions)))
+
+async def send_json(websocket: WebSocket, message: Dict):
+    """Send a message as an orjson-encoded text frame"""
+    with STAGE_SECONDS.time("serialize"):
+        text = dumps(message).decode()
+    await websocket.send_text(text)
+
+async def process_stream(websocket: WebSocket, latest: LatestFrame, tracker, session: StreamSession,
+                         send_lock: asyncio.Lock):
+    """Run the newest frame of a camera stream through the model or the tracker and push the result"""
+    last_frame_id = 0
+    while True:
+        frame = await latest.get()
+        if frame is None:
+            return
+        frame_id, received_at, frame_bytes, client_timestamp = frame
+        frames = frame_id - last_frame_id
+        last_frame_id = frame_id
+        
+        inferred = tracker.should_infer()
+        if inferred:
+            try:
+                detections = tracker.update(await run_inference(frame_bytes), frames)
+            except HTTPException:
+                # Inference pool saturated: coast on the tracker rather than queueing
+                inferred = False
+            except Exception:
+                logger.exception("Stream %s: detection failed on frame %d", session.session_id, frame_id)
+                inferred = False
+        if not inferred:
+            detections = tracker.step(frames)
+        
+        latency_ms = (time.perf_counter() - received_at) * 1000
+        session.record_result(latency_ms, inferred)
+        async with send_lock:
+            await send_json(websocket, {
+                "type": "detections",
+                "frame_id": frame_id,
+                "client_timestamp": client_timestamp,
+                "inferred": inferred,
+                "total_detections": len(detections),
+                "detections": detections,
+                "latency_ms": latency_ms,
+                "fps": session.fps,
+                "frames_dropped": session.frames_dropped
+            })
+
+def is_model_loaded() -> bool:
+    """Whether a model is available to serve detections"""
+    if worker_pool is not None:
+        return model_registry.ready and worker_pool.ready_workers > 0
+    if settings.INFERENCE_EXECUTOR == "process":
+        return model_registry.ready and inference_pool.ready
+    return model_registry.ready and model_registry.active.detector.backend is not None
+
+@router.on_event("startup")
+async def start_inference():
+    """Start loading the model in the background and spawn the inference worker processes if any"""
+    model_registry.start()
+    if worker_pool is not None:
+        worker_pool.start()
+    if not inference_pool.ready:
+        warm_up = inference_pool.warm_up(settings.MODEL_WARMUP_RUNS, settings.MODEL_WARMUP_IMAGE_SIZE)
+        if settings.LAZY_MODEL_LOADING:
+            asyncio.create_task(warm_up)
+        else:
+            await warm_up
+
+@router.on_event("shutdown")
+async def shutdown_inference():
+    """Stop the batching loop and inference workers"""
+    await batch_scheduler.close()
+    inference_pool.shutdown()
+    if worker_pool is not None:
+        worker_pool.shutdown()
 
 @router.post("/detect-food")
-async def detect_food_in_image(file: UploadFile = File(...)):
-    """Detect food items in uploaded image"""
+async def detect_food_in_image(request: Request, file: UploadFile = File(...)):
+    """Detect food items in uploaded image
+
+    The response format follows the Accept header: JSON (default),
+    application/msgpack, or application/vnd.healthsphere.columnar+msgpack
+    with the detections packed into typed arrays.
+    """
     try:
         # Validate file type
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image bytes
-        image_bytes = await file.read()
+        # Read image bytes, rejecting oversized or non-image uploads before decoding
+        image_bytes = await read_upload(file)
         
-        # Run food detection
-        detections = food_detector.detect_from_bytes(image_bytes)
+        # Run food detection; model_info describes the version that served it (active or A/B candidate)
+        detections, food_detector = await run_detection(image_bytes)
         
         # Prepare response
         response = {
@@ -34,87 +492,358 @@ async def detect_food_in_image(file: UploadFile = File(...)):
                 "num_classes": len(food_detector.class_names)
             }
         }
+        if settings.CASCADE_ENABLED:
+            response["cascade_stages"] = cascade_stages(detections)
         
-        return JSONResponse(content=response)
+        return detection_response(request, response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
+@router.post("/detect-food/batch")
+async def detect_food_in_batch(files: List[UploadFile] = File(...), stream: bool = False):
+    """Detect food items in several uploaded images with batched inference.
+
+    With ``stream=true`` each image's result is sent as one NDJSON line as soon
+    as it finishes, followed by a summary line.
+    """
+    try:
+        if len(files) > settings.BATCH_ENDPOINT_MAX_IMAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.BATCH_ENDPOINT_MAX_IMAGES} images per request"
+            )
+        for file in files:
+            if not file.content_type.startswith('image/'):
+                raise HTTPException(status_code=400, detail=f"File must be an image: {file.filename}")
+        
+        # Fail before reading the uploads (or starting a stream) if the model is not ready
+        get_detector()
+        started = time.perf_counter()
+        images_bytes = [await read_upload(file) for file in files]
+        
+        def image_result(index: int, detections: List[Dict], timing: Dict) -> Dict:
+            result = {
+                "index": index,
+                "image_filename": files[index].filename,
+                "total_detections": len(detections),
+                "detections": detections,
+                "timing": timing
+            }
+            if settings.CASCADE_ENABLED:
+                result["cascade_stages"] = cascade_stages(detections)
+            return result
+        
+        def add_nutrition(batch_results: List[Dict], food_detector):
+            """Estimate the nutrition of every plate in one pass over all their items"""
+            nutrition_estimator = get_meal_metadata(food_detector)[1]
+            if nutrition_estimator is None:
+                return
+            plates = nutrition_estimator.estimate_images(
+                [result["detections"] for result in batch_results],
+                [images_bytes[result["index"]] for result in batch_results]
+            )
+            for result, nutrition in zip(batch_results, plates):
+                result["nutrition"] = nutrition
+        
+        def summary(total_detections: int) -> Dict:
+            total_ms = (time.perf_counter() - started) * 1000
+            return {
+                "total_images": len(files),
+                "total_detections": total_detections,
+                "total_ms": total_ms,
+                "mean_ms_per_image": total_ms / len(files) if files else 0.0
+            }
+        
+        if stream:
+            async def generate():
+                total_detections = 0
+                try:
+                    with serve_model() as version:
+                        food_detector = version.detector
+                        async for index, detections, timing in iter_batch_detections(images_bytes, version):
+                            total_detections += len(detections)
+                            result = image_result(index, detections, timing)
+                            add_nutrition([result], food_detector)
+                            with STAGE_SECONDS.time("serialize"):
+                                line = dumps(result) + b"\n"
+                            yield line
+                except HTTPException as e:
+                    yield dumps({"success": False, "error": e.detail}) + b"\n"
+                    return
+                except Exception as e:
+                    yield dumps({"success": False, "error": f"Detection failed: {str(e)}"}) + b"\n"
+                    return
+                yield dumps({"success": True, "summary": summary(total_detections)}) + b"\n"
+            
+            return StreamingResponse(generate(), media_type="application/x-ndjson")
+        
+        results: List[Optional[Dict]] = [None] * len(files)
+        with serve_model() as version:
+            food_detector = version.detector
+            async for index, detections, timing in iter_batch_detections(images_bytes, version):
+                results[index] = image_result(index, detections, timing)
+        add_nutrition(results, food_detector)
+        
+        return FastJSONResponse(content={
+            "success": True,
+            "results": results,
+            "summary": summary(sum(result["total_detections"] for result in results))
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch detection failed: {str(e)}")
+
+@router.websocket("/stream")
+async def stream_food_detection(websocket: WebSocket):
+    """Detect food in a live camera stream.
+
+    The client sends frames as binary messages (JPEG preferred). A text
+    message {"timestamp": ...} before a frame is echoed back with its result
+    as client_timestamp, for capture-to-display latency. {"type": "stats"}
+    asks for the session's frame rate, drop and latency counters. Each
+    processed frame is answered with a "detections" message. Frames that
+    arrive while inference is busy replace the waiting one (latest frame
+    wins), and between full inferences boxes come from the tracker.
+    """
+    await websocket.accept()
+    try:
+        get_detector()
+    except HTTPException as e:
+        await websocket.close(code=1013, reason=str(e.detail))
+        return
+    
+    from app.ml.inference.tracking import DetectionTracker
+    tracker = DetectionTracker(
+        iou_threshold=settings.STREAM_TRACK_IOU,
+        smoothing=settings.STREAM_SMOOTHING,
+        max_misses=settings.STREAM_MAX_MISSES,
+        keyframe_interval=settings.STREAM_KEYFRAME_INTERVAL,
+        bbox_decimals=settings.BBOX_DECIMALS,
+        confidence_decimals=settings.CONFIDENCE_DECIMALS
+    )
+    session = StreamSession(str(uuid.uuid4()))
+    latest = LatestFrame()
+    send_lock = asyncio.Lock()
+    stream_sessions[session.session_id] = session
+    processor = asyncio.create_task(process_stream(websocket, latest, tracker, session, send_lock))
+    
+    frame_id = 0
+    client_timestamp = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                frame_bytes = message["bytes"]
+                frame_id += 1
+                session.frames_received += 1
+                try:
+                    validate_image(frame_bytes, name=f"frame {frame_id}")
+                except HTTPException as e:
+                    session.frames_rejected += 1
+                    async with send_lock:
+                        await send_json(websocket, {
+                            "type": "error", "frame_id": frame_id, "status": e.status_code, "detail": e.detail
+                        })
+                    continue
+                latest.put((frame_id, time.perf_counter(), frame_bytes, client_timestamp))
+                session.frames_dropped = latest.dropped
+                client_timestamp = None
+                continue
+            
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except ValueError:
+                control = {}
+            if control.get("type") == "stats":
+                async with send_lock:
+                    await send_json(websocket, {"type": "stats", **session.stats()})
+            elif "timestamp" in control:
+                client_timestamp = control["timestamp"]
+    except WebSocketDisconnect:
+        pass
+    finally:
+        latest.close()
+        await asyncio.gather(processor, return_exceptions=True)
+        stream_sessions.pop(session.session_id, None)
+        stats = session.stats()
+        logger.info(
+            "Stream %s closed: %d frames, %.1f fps out, %d dropped, p50 latency %.1f ms",
+            session.session_id, stats['frames_received'], stats['output_fps'], stats['frames_dropped'],
+            stats['latency_ms']['p50'],
+            extra={"session_id": session.session_id, "frames_received": stats['frames_received'],
+                   "frames_dropped": stats['frames_dropped']}
+        )
+
 @router.get("/food-classes")
-async def get_food_classes():
-    """Get list of supported food classes"""
-    return {
-        "success": True,
-        "num_classes": len(food_detector.class_names),
-        "classes": food_detector.class_names
-    }
+async def get_food_classes(request: Request):
+    """Get list of supported food classes (cacheable: ETag, 304 on If-None-Match)"""
+    get_detector()
+    return static_responses["food-classes"].response(request)
 
 @router.get("/model-info")
-async def get_model_info():
-    """Get model information and performance metrics"""
-    return {
-        "success": True,
-        "model_name": "HealthSphere_Food_Detection_v1",
-        "framework": "YOLOv8",
-        "num_classes": len(food_detector.class_names),
-        "confidence_threshold": food_detector.confidence_threshold,
-        "supported_formats": ["JPG", "PNG", "JPEG"]
-    }
+async def get_model_info(request: Request):
+    """Get model information and performance metrics (cacheable: ETag, 304 on If-None-Match)"""
+    get_detector()
+    return static_responses["model-info"].response(request)
 
 @router.post("/analyze-meal")
-async def analyze_complete_meal(file: UploadFile = File(...)):
-    """Analyze a complete meal image with multiple food items"""
+async def analyze_complete_meal(request: Request, file: UploadFile = File(...),
+                                class_names: Literal["full", "ref", "omit"] = "full"):
+    """Analyze a complete meal image with multiple food items
+
+    class_names controls the class list in model_info: "full" repeats it,
+    "ref" replaces it with the /food-classes URL and its ETag, and "omit"
+    leaves it out. The Accept header selects the format as for /detect-food.
+    With NUTRITION_ENABLED, "nutrition" holds calories and macros per item,
+    per class and for the plate, from portions estimated by box area.
+    """
     try:
         # Validate file type
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image bytes
-        image_bytes = await file.read()
-        
-        # Run food detection
-        detections = food_detector.detect_from_bytes(image_bytes)
-        
-        # Analyze meal composition
-        meal_analysis = {
-            "total_food_items": len(detections),
-            "unique_food_types": len(set(det['class_name'] for det in detections)),
-            "food_distribution": {},
-            "confidence_summary": {
-                "high_confidence": len([d for d in detections if d['confidence'] > 0.7]),
-                "medium_confidence": len([d for d in detections if 0.5 <= d['confidence'] <= 0.7]),
-                "low_confidence": len([d for d in detections if d['confidence'] < 0.5])
-            }
-        }
+        # Read image bytes, rejecting oversized or non-image uploads before decoding
+        image_bytes = await read_upload(file)
         
-        # Count food types
-        for detection in detections:
-            food_type = detection['class_name']
-            if food_type in meal_analysis['food_distribution']:
-                meal_analysis['food_distribution'][food_type] += 1
-            else:
-                meal_analysis['food_distribution'][food_type] = 1
+        # Run food detection (answered from the result cache if this photo was already detected)
+        detections, food_detector = await run_detection(image_bytes)
+        meal_model_info, nutrition_estimator = get_meal_metadata(food_detector)
         
         response = {
             "success": True,
             "image_filename": file.filename,
             "detections": detections,
-            "meal_analysis": meal_analysis,
-            "model_info": food_detector.get_model_info()
+            "meal_analysis": meal_analyzer.analyze(detections),
+            "model_info": meal_model_info[class_names]
         }
+        if nutrition_estimator is not None:
+            response["nutrition"] = nutrition_estimator.estimate_image(detections, image_bytes)
+        if settings.CASCADE_ENABLED:
+            response["cascade_stages"] = cascade_stages(detections)
         
-        return JSONResponse(content=response)
+        return detection_response(request, response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Meal analysis failed: {str(e)}")
 
+@router.post("/analyze-meal/detections")
+async def analyze_meal_detections(request: MealDetectionsRequest):
+    """Analyze the meal composition of detections from an earlier /detect-food response
+
+    Skips re-uploading the photo and re-running detection when the app
+    already has the detections.
+    """
+    detections = [detection.model_dump() for detection in request.detections]
+    response = {
+        "success": True,
+        "meal_analysis": meal_analyzer.analyze(detections)
+    }
+    # Class ids refer to the active model; nutrition is left out while it loads
+    food_detector = model_registry.active.detector
+    nutrition_estimator = get_meal_metadata(food_detector)[1] if food_detector is not None else None
+    if nutrition_estimator is not None:
+        image_area = float(request.image_width * request.image_height) or None
+        response["nutrition"] = nutrition_estimator.estimate(detections, image_area)
+    return FastJSONResponse(content=response)
+
+@router.get("/inference-stats")
+async def get_inference_stats():
+    """Get inference pool, batching scheduler and result cache metrics"""
+    return {
+        "success": True,
+        "executor": inference_pool.stats(),
+        "worker_pool": worker_pool.stats() if worker_pool is not None else None,
+        "cache_enabled": settings.DETECTION_CACHE_ENABLED,
+        "cache": detection_cache.stats(),
+        "batching_enabled": settings.BATCHING_ENABLED,
+        "batching": batch_scheduler.stats(),
+        "cascade": cascade_stats(),
+        "models": model_registry.stats(),
+        "streams": [session.stats() for session in stream_sessions.values()]
+    }
+
+def require_model_admin(request: Request):
+    """Allow model administration only with MODEL_ADMIN_TOKEN and an in-process model"""
+    if not settings.MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Model administration is disabled")
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), settings.MODEL_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if not hot_reload_supported:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Hot reload is not available with INFERENCE_EXECUTOR={settings.INFERENCE_EXECUTOR}"
+        )
+
+@router.get("/models")
+async def get_models():
+    """Serving model versions with per-version latency and detection counts"""
+    return {"success": True, **model_registry.stats()}
+
+@router.post("/models/load", status_code=202)
+async def load_model_version(request: Request, body: ModelLoadRequest):
+    """Load new weights in the background (X-Admin-Token required)
+
+    An "active" version replaces the current model once it is loaded and
+    warmed up; a "candidate" receives the traffic fraction of detection
+    requests. Poll GET /models for progress.
+    """
+    require_model_admin(request)
+    # Loading weights unpickles them, so only files the operator placed in MODEL_LOAD_DIR may be loaded
+    models_dir = settings.MODEL_LOAD_DIR or os.path.dirname(settings.MODEL_PATH) or "."
+    try:
+        version = model_registry.load(resolve_model_path(body.model_path, models_dir), body.role)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelLoadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if body.role == CANDIDATE and body.traffic is not None:
+        model_registry.candidate_traffic = body.traffic
+    return {"success": True, "version_id": version.version_id, "role": body.role, "state": version.loader.state}
+
+@router.post("/models/promote")
+async def promote_candidate_model(request: Request):
+    """Make the A/B candidate the active model (X-Admin-Token required)"""
+    require_model_admin(request)
+    if model_registry.candidate is None:
+        raise HTTPException(status_code=409, detail="There is no candidate model to promote")
+    version = model_registry.promote()
+    return {"success": True, "active": version.version_id}
+
+@router.put("/models/candidate/traffic")
+async def set_candidate_traffic(request: Request, body: CandidateTrafficRequest):
+    """Change the fraction of detection requests routed to the candidate (X-Admin-Token required)"""
+    require_model_admin(request)
+    model_registry.candidate_traffic = body.traffic
+    return {"success": True, "candidate_traffic": body.traffic}
+
+@router.delete("/models/candidate")
+async def remove_candidate_model(request: Request):
+    """Stop A/B routing and unload the candidate (X-Admin-Token required)"""
+    require_model_admin(request)
+    version = model_registry.remove_candidate()
+    return {"success": True, "removed": version.version_id if version is not None else None}
+
 @router.get("/debug-model")
-async def debug_model():
+async def debug_model(request: Request):
     """Debug endpoint to check model loading and class names"""
     try:
+        food_detector = model_registry.get()
+        if is_model_loaded():
+            return static_responses["debug-model"].response(request)
         return {
             "success": True,
-            "model_loaded": food_detector.model is not None,
+            "model_loaded": is_model_loaded(),
             "class_names_count": len(food_detector.class_names),
             "class_names": food_detector.class_names,
             "confidence_threshold": food_detector.confidence_threshold,
@@ -127,14 +856,34 @@ async def debug_model():
             "model_loaded": False
         }
 
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed, 503 while loading"""
+    ready = is_model_loaded()
+    status = model_registry.active.loader.state
+    if not ready and status == "ready":
+        status = "warming_up"  # Worker processes are still loading their models
+    content = {
+        "success": ready,
+        "status": "ready" if ready else status,
+        "model": model_registry.active.loader.status()
+    }
+    if worker_pool is not None:
+        content["ready_workers"] = worker_pool.ready_workers
+    elif inference_pool.kind == "process":
+        content["ready_workers"] = inference_pool.ready_workers
+        content["workers_warmup_seconds"] = inference_pool.warmup_seconds
+        content["workers_error"] = inference_pool.warmup_error
+    return FastJSONResponse(status_code=200 if ready else 503, content=content)
+
 @router.get("/health")
 async def health_check():
-    """Simple health check endpoint"""
+    """Liveness check; answers while the model is still loading (see /ready)"""
     return {
         "success": True,
         "status": "healthy",
-        "timestamp": "2025-08-10T21:16:00Z",
-        "model_loaded": food_detector.model is not None
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "model_loaded": is_model_loaded()
     }
 
 @router.post("/test-upload")
@@ -19,13 +19,99 @@ class Settings(BaseSettings):
     
     # ML Model Settings
     MODEL_PATH: str = "app/ml/models/best.pt"
+    MODEL_BACKEND: str = "auto"  # "auto", "pytorch", "onnxruntime", "openvino" or "stub" (load testing)
+    INTRA_OP_THREADS: int = 0  # 0 = runtime default
+    INTER_OP_THREADS: int = 0
+    LAZY_MODEL_LOADING: bool = True  # Bind immediately and load the model in the background
+    MODEL_WARMUP_RUNS: int = 1  # Inferences on a blank image before reporting ready
+    MODEL_WARMUP_IMAGE_SIZE: int = 640
+    DECODE_TARGET_SIZE: int = 640  # Decode JPEGs at 1/2-1/8 scale down to this long side (0 = full size)
+    APPLY_EXIF_ORIENTATION: bool = True  # Rotate phone photos upright before inference
     CONFIDENCE_THRESHOLD: float = 0.25
     IOU_THRESHOLD: float = 0.5
     
+    # Load Testing Settings (MODEL_BACKEND=stub)
+    STUB_FORWARD_MS: float = 20.0  # Simulated forward pass of MODEL_BACKEND=stub, per batch
+    STUB_PER_IMAGE_MS: float = 5.0  # Added per image in the batch
+    
+    # Model Registry Settings
+    MODEL_CANDIDATE_PATH: str = ""  # Loaded at startup as an A/B candidate (INFERENCE_EXECUTOR=thread only)
+    MODEL_CANDIDATE_TRAFFIC: float = 0.0  # Fraction of detection requests routed to the candidate
+    MODEL_ADMIN_TOKEN: str = ""  # X-Admin-Token for the /models load/promote endpoints (empty = disabled)
+    MODEL_LOAD_DIR: str = ""  # /models/load only reads weights inside this directory (empty = MODEL_PATH's directory)
+    
+    # Model Cascade Settings
+    CASCADE_ENABLED: bool = False  # Run a fast low-resolution pass first, escalate uncertain images to MODEL_PATH
+    CASCADE_FAST_MODEL_PATH: str = ""  # Weights of the fast pass (empty = MODEL_PATH)
+    CASCADE_FAST_IMAGE_SIZE: int = 320  # Network input size of the fast pass
+    CASCADE_UNCERTAIN_BAND: list = [0.2, 0.5]  # Escalate when a fast-pass confidence falls in [low, high)
+    CASCADE_ESCALATE_EMPTY: bool = True  # Also escalate images where the fast pass finds nothing
+    
+    # Tiled Inference Settings
+    TILING_ENABLED: bool = False  # Run large photos as overlapping full-resolution tiles (small items)
+    TILING_DECODE_SIZE: int = 1920  # Decode target long side while tiling (replaces DECODE_TARGET_SIZE if larger)
+    TILING_TILE_SIZE: int = 640  # Tile side in decoded pixels
+    TILING_OVERLAP: float = 0.2  # Fraction of a tile shared with its neighbour
+    TILING_INCLUDE_FULL_IMAGE: bool = True  # Also run the whole image, for items larger than a tile
+    TILING_BATCH_SIZE: int = 8  # Tiles per forward pass
+    TILING_WORKERS: int = 0  # Threads running tile batches concurrently (onnxruntime/openvino; 0 = sequential)
+    
+    # Inference Executor Settings
+    INFERENCE_EXECUTOR: str = "thread"  # "thread", "process" or "shared_memory"
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_QUEUE_SIZE: int = 32  # Requests allowed to wait beyond the running ones
+    INFERENCE_RETRY_AFTER_SECONDS: int = 1
+    
+    # Shared-Memory Worker Pool Settings (INFERENCE_EXECUTOR=shared_memory)
+    SHM_WORKERS: int = os.cpu_count() or 1  # Model-owning worker processes
+    SHM_SLOTS_PER_WORKER: int = 4
+    SHM_MAX_IMAGE_SIDE: int = 1280  # Larger images are downscaled before transfer
+    SHM_REQUEST_TIMEOUT_SECONDS: float = 30.0  # Answer 504 when a worker takes longer (0 = wait indefinitely)
+    
+    # Detection Result Cache Settings
+    DETECTION_CACHE_ENABLED: bool = True
+    DETECTION_CACHE_MAX_ENTRIES: int = 1024
+    DETECTION_CACHE_MAX_MB: int = 64
+    DETECTION_CACHE_TTL_SECONDS: int = 3600
+    DETECTION_CACHE_DIR: str = ""  # Set to enable the on-disk tier, e.g. "app/cache/detections"
+    DETECTION_CACHE_DISK_MAX_ENTRIES: int = 10000
+    
+    # Inference Batching Settings
+    BATCHING_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_WINDOW_MS: float = 10.0  # Higher = fuller batches, lower = better p50 latency
+    BATCH_ENDPOINT_MAX_IMAGES: int = 32  # Images accepted per /detect-food/batch request
+    
+    # Meal Analysis Settings
+    MEAL_CONFIDENCE_EDGES: list = [0.5, 0.7, 0.9]  # Bucket bounds of the confidence_histogram in /analyze-meal
+    NUTRITION_ENABLED: bool = True  # Attach estimated calories/macros to /analyze-meal
+    NUTRITION_REFERENCE_AREA_FRACTION: float = 0.08  # Share of a top-down plate photo one standard serving covers
+    NUTRITION_PORTION_RANGE: list = [0.25, 4.0]  # Portion estimates are clipped to this many standard servings
+    
+    # Camera Stream Settings (WebSocket /stream)
+    STREAM_KEYFRAME_INTERVAL: int = 3  # Full inference every Nth frame once tracks are stable (1 = every frame)
+    STREAM_TRACK_IOU: float = 0.3
+    STREAM_SMOOTHING: float = 0.5  # Weight of the newest detection in the box/confidence average
+    STREAM_MAX_MISSES: int = 2  # Inferences a track may go undetected before it is dropped
+    
     # File Upload Settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_REQUEST_SIZE: int = 64 * 1024 * 1024  # Whole ML request body, all files of a batch together
+    MAX_IMAGE_PIXELS: int = 50_000_000  # Rejects decompression bombs before decoding
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
     UPLOAD_DIR: str = "app/uploads"
     
+    # Response Settings
+    STATIC_RESPONSE_MAX_AGE: int = 300  # Seconds clients may reuse class lists/model info before revalidating
+    BBOX_DECIMALS: int = 1  # Decimal places of bbox coordinates and areas in detections (-1 = full precision)
+    CONFIDENCE_DECIMALS: int = 4  # Decimal places of detection confidences (-1 = full precision)
+    
+    # Logging Settings
+    LOG_LEVEL: str = ""  # Empty = DEBUG when DEBUG is on, otherwise INFO
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
+    LOG_SAMPLE_EVERY: int = 100  # Log 1 in N per-request events such as detection summaries (DEBUG logs all)
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread; more are dropped, never waited on
+    
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
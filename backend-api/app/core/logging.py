@@ -0,0 +1,242 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, TextIO
+
+from app.core.config import settings
+
+# Correlation ID of the request being served, set by RequestIdMiddleware
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+# Client-supplied IDs are echoed into logs and headers, so only accept short plain tokens
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Attributes every LogRecord has, plus ones set by formatters and uvicorn's colour variant of
+# the message; anything else (passed with extra=) is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "color_message"
+}
+
+# Loggers that uvicorn configures with its own synchronous handlers
+_SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["NonBlockingQueueHandler"] = None
+_configured_pid: Optional[int] = None
+_sample_every = 1
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, extra= fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(request_tag)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        request_id = getattr(record, "request_id", None)
+        record.request_tag = f" [{request_id}]" if request_id else ""
+        line = super().format(record)
+        del record.request_tag
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without ever blocking the caller.
+
+    The stdlib prepare() formats the whole record on the calling thread; here
+    only the message is merged with its arguments (so later changes to them
+    cannot alter it) and the request ID is taken from the caller's context.
+    Formatting and the write happen on the listener thread. When the queue
+    is full the record is counted as dropped instead of waiting.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SampledLogger:
+    """Logs only every ``every``-th occurrence of a high-volume event.
+
+    Occurrences are counted per message template, so each kind of event is
+    sampled on its own. Emitted records carry a ``sampled`` field with the
+    number of occurrences they stand for. Without an explicit ``every`` the
+    rate configured by setup_logging applies (LOG_SAMPLE_EVERY, or 1 in
+    DEBUG mode).
+    """
+
+    def __init__(self, logger: logging.Logger, every: Optional[int] = None):
+        self.logger = logger
+        self.every = every
+        self._counters: Dict[str, itertools.count] = {}
+
+    def log(self, level: int, msg: str, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        every = self.every or _sample_every
+        if every > 1:
+            counter = self._counters.get(msg)
+            if counter is None:
+                counter = self._counters.setdefault(msg, itertools.count())
+            if next(counter) % every:
+                return
+            kwargs["extra"] = {**kwargs.get("extra", {}), "sampled": every}
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+
+def get_sampled_logger(name: str, every: Optional[int] = None) -> SampledLogger:
+    """Sampled counterpart of logging.getLogger for per-request log sites"""
+    return SampledLogger(logging.getLogger(name), every)
+
+
+def dropped_records() -> int:
+    """Records discarded because the log queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+
+def setup_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                  stream: Optional[TextIO] = None, sample_every: Optional[int] = None,
+                  queue_size: Optional[int] = None):
+    """Route all logging through one queue drained by a background writer thread.
+
+    The level is LOG_LEVEL, or DEBUG/INFO depending on settings.DEBUG.
+    uvicorn's loggers are moved onto the same queue so access logs stop
+    writing synchronously on the event loop. Safe to call more than once;
+    it reconfigures in a forked or spawned worker process, whose copy of the
+    listener thread does not run.
+    """
+    global _listener, _handler, _configured_pid, _sample_every
+    explicit = any(arg is not None for arg in (level, log_format, stream, sample_every, queue_size))
+    if _configured_pid == os.getpid() and not explicit:
+        return
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+
+    level = (level or settings.LOG_LEVEL or ("DEBUG" if settings.DEBUG else "INFO")).upper()
+    log_format = log_format or settings.LOG_FORMAT
+    if sample_every is None:
+        sample_every = 1 if settings.DEBUG else settings.LOG_SAMPLE_EVERY
+    _sample_every = max(1, sample_every)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size or settings.LOG_QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level)
+    for name in _SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+    _listener.start()
+    if _configured_pid is None:
+        atexit.register(stop_logging)
+    _configured_pid = os.getpid()
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """Give every request a correlation ID for its log records.
+
+    An incoming X-Request-ID header is reused when it is a plain token,
+    otherwise a new ID is generated. The ID is returned in the X-Request-ID
+    response header and is attached to every record logged while serving the
+    request, including on inference threads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), request_id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
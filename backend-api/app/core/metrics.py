@@ -0,0 +1,258 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.logging import dropped_records
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond post-processing up to multi-second CPU forwards
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _ValueMetric(_Metric):
+    """One value per label combination; with ``function`` it is read at scrape time.
+
+    The function returns a number, or a dict of label-value tuples to numbers
+    for labelled metrics; None skips the sample.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 function: Optional[Callable] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            value = self.function()
+            values = list(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values if value is not None]
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+
+class Gauge(_ValueMetric):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets (Prometheus histogram)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (last = +Inf), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """Observe the duration of the with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total[0]) for labels, (counts, total) in self._series.items()]
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_label = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+
+    content_type = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        blocks = []
+        for metric in list(self._metrics.values()):
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                logger.warning("Error collecting metric %s: %s", metric.name, e)
+        return "\n".join(blocks) + "\n"
+
+
+def process_rss_bytes() -> Optional[float]:
+    """Resident set size of this process (Linux), None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def latency_summary(latencies_ms: Iterable[float]) -> Dict[str, float]:
+    """Mean, p50, p95 and max of a window of latencies (all zero when it is empty)"""
+    latencies = sorted(latencies_ms) or [0.0]
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max": latencies[-1]
+    }
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in each ML pipeline stage per call (batched stages cover the whole batch)",
+    ("stage",)
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status code", ("route", "method", "status")
+))
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("route",)
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+HTTP_IN_FLIGHT.set(0)
+registry.register(Gauge(
+    "process_resident_memory_bytes", "Resident memory size of the API process", function=process_rss_bytes
+))
+PROCESS_START_TIME = time.time()
+registry.register(Gauge(
+    "process_start_time_seconds", "Start time of the process since the unix epoch",
+    function=lambda: PROCESS_START_TIME
+))
+registry.register(Counter(
+    "log_records_dropped_total", "Log records discarded because the log queue was full", function=dropped_records
+))
+
+
+class MetricsMiddleware:
+    """Counts requests, tracks in-flight requests and times them per route template.
+
+    For requests with a body, the time from its first to its last chunk is
+    recorded as the "upload_receive" stage (network transfer and spooling).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+        body_started = [None]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        async def timed_receive():
+            message = await receive()
+            if message["type"] == "http.request" and (message.get("body") or body_started[0] is not None):
+                if body_started[0] is None:
+                    body_started[0] = time.perf_counter()
+                if not message.get("more_body", False):
+                    STAGE_SECONDS.observe(time.perf_counter() - body_started[0], "upload_receive")
+            return message
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, timed_receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Routing stores the matched route in the scope; label by its template to bound cardinality
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route_path)
+            HTTP_REQUESTS.inc(route_path, scope["method"], str(status_code[0]))
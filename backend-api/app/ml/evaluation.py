@@ -0,0 +1,136 @@
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import yaml
+
+from app.ml.inference.tracking import box_iou
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+# COCO mAP50-95 thresholds
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def resolve_split_dir(dataset_yaml: Path, split: str) -> Path:
+    """Resolve a split path from dataset.yaml (paths are relative to the yaml's directory)"""
+    with open(dataset_yaml, 'r') as f:
+        config = yaml.safe_load(f)
+    split_path = Path(config[split])
+    if not split_path.is_absolute():
+        split_path = (dataset_yaml.parent / split_path).resolve()
+    return split_path
+
+def valid_split_dir() -> Path:
+    """The val images directory from the model's dataset.yaml"""
+    return resolve_split_dir(MODELS_DIR / "dataset.yaml", "val")
+
+def list_images(image_dir: Path, limit: int = 0) -> List[Path]:
+    paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return paths[:limit] if limit else paths
+
+def label_path(image_path: Path) -> Path:
+    """YOLO layout: .../images/name.jpg is labelled by .../labels/name.txt"""
+    parts = list(image_path.parts)
+    index = len(parts) - 1 - parts[::-1].index("images")
+    parts[index] = "labels"
+    return Path(*parts).with_suffix(".txt")
+
+def read_labels(path: Path, width: int, height: int) -> np.ndarray:
+    """Ground truth rows [x1, y1, x2, y2, class_id] in pixels from a YOLO label file"""
+    if not path.exists():
+        return np.zeros((0, 5), dtype=np.float32)
+    rows = np.loadtxt(path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    cx, w = rows[:, 1] * width, rows[:, 3] * width
+    cy, h = rows[:, 2] * height, rows[:, 4] * height
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2, rows[:, 0]], axis=1)
+
+def count_matches(truth: np.ndarray, truth_classes: np.ndarray, boxes: np.ndarray, min_iou: float) -> int:
+    """Greedy one-to-one matches of same-class boxes, most confident detections first"""
+    if len(truth) == 0 or len(boxes) == 0:
+        return 0
+    boxes = boxes[np.argsort(-boxes[:, 4])]
+    ious = box_iou(boxes, truth)
+    ious[boxes[:, None, 5] != truth_classes[None, :]] = 0.0
+    matched = np.zeros(len(truth), dtype=bool)
+    for row in ious:
+        row = np.where(matched, 0.0, row)
+        best = int(row.argmax())
+        if row[best] >= min_iou:
+            matched[best] = True
+    return int(matched.sum())
+
+def match_predictions(boxes: np.ndarray, truth: np.ndarray) -> np.ndarray:
+    """(N, 10) bool: whether each prediction matches a same-class label at IoU 0.50:0.95
+
+    Each label is matched at most once per threshold, highest IoU first.
+    """
+    correct = np.zeros((len(boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(boxes) == 0 or len(truth) == 0:
+        return correct
+    iou = box_iou(truth[:, :4], boxes[:, :4]) * (truth[:, 4:5] == boxes[None, :, 5])
+    for k, threshold in enumerate(IOU_THRESHOLDS):
+        label_index, box_index = np.nonzero(iou >= threshold)
+        if len(label_index) == 0:
+            continue
+        order = np.argsort(-iou[label_index, box_index], kind="stable")
+        label_index, box_index = label_index[order], box_index[order]
+        matched_labels, matched_boxes = set(), set()
+        for label, box in zip(label_index.tolist(), box_index.tolist()):
+            if label not in matched_labels and box not in matched_boxes:
+                matched_labels.add(label)
+                matched_boxes.add(box)
+        correct[list(matched_boxes), k] = True
+    return correct
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO 101-point AP: mean over recall levels of the best precision reached at that recall or beyond"""
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision)))
+    index = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    reached = index < len(envelope)
+    return float(np.where(reached, envelope[np.minimum(index, len(envelope) - 1)], 0.0).mean())
+
+def compute_metrics(correct: np.ndarray, confidence: np.ndarray, predicted_class: np.ndarray,
+                    label_class: np.ndarray) -> Dict:
+    """Per-class AP at IoU 0.50:0.95, and precision/recall at the confidence with the best mean F1"""
+    order = np.argsort(-confidence, kind="stable")
+    correct, confidence, predicted_class = correct[order], confidence[order], predicted_class[order]
+    classes = np.unique(label_class).astype(int)
+    grid = np.linspace(0, 1, 1000)
+    ap = np.zeros((len(classes), len(IOU_THRESHOLDS)))
+    precision_curve = np.zeros((len(classes), len(grid)))
+    recall_curve = np.zeros((len(classes), len(grid)))
+
+    for row, class_id in enumerate(classes):
+        mask = predicted_class == class_id
+        labels = int((label_class == class_id).sum())
+        if not mask.any():
+            continue
+        true_positives = correct[mask].cumsum(0)
+        false_positives = (~correct[mask]).cumsum(0)
+        recall = true_positives / labels
+        precision = true_positives / (true_positives + false_positives)
+        # Curves over confidence (decreasing along the sorted predictions) at IoU 0.5
+        recall_curve[row] = np.interp(-grid, -confidence[mask], recall[:, 0], left=0)
+        precision_curve[row] = np.interp(-grid, -confidence[mask], precision[:, 0], left=1)
+        for k in range(len(IOU_THRESHOLDS)):
+            ap[row, k] = average_precision(recall[:, k], precision[:, k])
+
+    f1 = 2 * precision_curve * recall_curve / (precision_curve + recall_curve + 1e-16)
+    best = int(f1.mean(0).argmax()) if len(classes) else 0
+    return {
+        "map50": float(ap[:, 0].mean()) if len(classes) else 0.0,
+        "map50_95": float(ap.mean()) if len(classes) else 0.0,
+        "precision": float(precision_curve[:, best].mean()) if len(classes) else 0.0,
+        "recall": float(recall_curve[:, best].mean()) if len(classes) else 0.0,
+        "best_f1_confidence": float(grid[best]),
+        "per_class": {
+            int(class_id): {
+                "labels": int((label_class == class_id).sum()),
+                "ap50": float(ap[row, 0]),
+                "ap50_95": float(ap[row].mean())
+            }
+            for row, class_id in enumerate(classes)
+        }
+    }
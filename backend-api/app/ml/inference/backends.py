@@ -0,0 +1,366 @@
+import ast
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Ultralytics NMS settings, mirrored so every backend returns the same boxes
+MAX_DETECTIONS = 300
+MAX_NMS_CANDIDATES = 30000
+CLASS_OFFSET = 7680  # Shifts boxes per class so one NMS pass is class-aware
+
+class InferenceBackend:
+    """Runs the detection network and returns raw detections per image.
+
+    ``predict`` returns one float32 array of shape (N, 6) per image with rows
+    ``[x1, y1, x2, y2, confidence, class_id]`` in original image pixels,
+    sorted by confidence. ``image_size`` overrides the network input size
+    (0 = the model's own); ``predict`` also takes one per call, so a single
+    loaded model can serve a fast low-resolution pass as well.
+    ``thread_safe`` backends may run ``predict`` from several threads at once.
+    """
+
+    name = "base"
+    thread_safe = False
+
+    def __init__(self, model_path: str, image_size: int = 0):
+        self.model_path = model_path
+        self.image_size = image_size
+        self.model = None
+        self.names: List[str] = []
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        raise NotImplementedError
+
+class PyTorchBackend(InferenceBackend):
+    """Ultralytics YOLO on PyTorch (the original .pt weights)"""
+
+    name = "pytorch"
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 image_size: int = 0):
+        super().__init__(model_path, image_size)
+        import torch
+        from ultralytics import YOLO
+
+        if intra_op_threads > 0:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads > 0:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError:
+                pass  # Can only be set once per process
+        self.model = YOLO(model_path)
+        if getattr(self.model, 'names', None):
+            self.names = list(self.model.names.values())
+        # Training size of the weights; passed explicitly because some ultralytics versions keep the
+        # previous call's imgsz on the cached predictor
+        self.default_image_size = getattr(self.model, 'overrides', {}).get('imgsz') or 640
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        image_size = image_size or self.image_size or self.default_image_size
+        results = self.model(images, conf=conf, iou=iou, imgsz=image_size, verbose=False)
+        if results and results[0].speed:
+            # Ultralytics reports per-image milliseconds for the batch
+            for stage, key in (("preprocess", "preprocess"), ("forward", "inference"), ("postprocess", "postprocess")):
+                STAGE_SECONDS.observe(results[0].speed[key] * len(results) / 1000, stage)
+        return [
+            result.boxes.data.cpu().numpy().astype(np.float32) if result.boxes is not None
+            else np.zeros((0, 6), dtype=np.float32)
+            for result in results
+        ]
+
+def letterbox(image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Resize keeping aspect ratio and pad to size (height, width), like ultralytics LetterBox"""
+    height, width = image.shape[:2]
+    gain = min(size[0] / height, size[1] / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+    pad_w, pad_h = (size[1] - new_width) / 2, (size[0] - new_height) / 2
+
+    if (width, height) != (new_width, new_height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+def preprocess_images(images: List[np.ndarray], size: Tuple[int, int]) -> np.ndarray:
+    """Letterbox BGR images into a normalized float32 RGB NCHW batch"""
+    batch = np.stack([letterbox(image, size) for image in images])
+    batch = batch[..., ::-1].transpose(0, 3, 1, 2)  # BGR HWC -> RGB CHW
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+def scale_boxes(boxes: np.ndarray, input_size: Tuple[int, int], image_shape: Tuple[int, ...]) -> np.ndarray:
+    """Map xyxy boxes from letterboxed input back to original image pixels (in place)"""
+    gain = min(input_size[0] / image_shape[0], input_size[1] / image_shape[1])
+    pad_x = round((input_size[1] - image_shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_size[0] - image_shape[0] * gain) / 2 - 0.1)
+    boxes[:, [0, 2]] -= pad_x
+    boxes[:, [1, 3]] -= pad_y
+    boxes[:, :4] /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices in descending score order"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+def postprocess(output: np.ndarray, conf: float, iou: float) -> np.ndarray:
+    """Decode one raw YOLOv8 head output (4 + num_classes, anchors) into (N, 6) detections"""
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+    mask = scores > conf
+    if not mask.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xywh, scores, class_ids = predictions[mask, :4], scores[mask], class_ids[mask]
+    if len(scores) > MAX_NMS_CANDIDATES:
+        top = scores.argsort()[::-1][:MAX_NMS_CANDIDATES]
+        xywh, scores, class_ids = xywh[top], scores[top], class_ids[top]
+
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+    keep = nms(boxes + class_ids[:, None] * CLASS_OFFSET, scores, iou)[:MAX_DETECTIONS]
+    return np.concatenate(
+        [boxes[keep], scores[keep, None], class_ids[keep, None].astype(np.float32)], axis=1
+    ).astype(np.float32)
+
+def parse_names(metadata: Dict) -> List[str]:
+    """Read class names from ultralytics export metadata (stored as a dict literal)"""
+    names = metadata.get('names')
+    if not names:
+        return []
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    return [names[key] for key in sorted(names)]
+
+class _ExportedModelBackend(InferenceBackend):
+    """Shared letterbox pre-processing and NMS post-processing for exported models"""
+
+    input_size: Tuple[int, int] = (640, 640)
+    static_size: Optional[Tuple[int, int]] = None  # Input size fixed at export, if any
+    dynamic_batch = False
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _set_input_size(self, static_size: Optional[Tuple[int, int]]):
+        """Use the exported input size, or image_size where the export has dynamic height and width"""
+        self.static_size = static_size
+        self._ignored_sizes = set()
+        if static_size is not None:
+            self.input_size = static_size
+            if self.image_size and static_size != (self.image_size, self.image_size):
+                logger.warning("%s was exported for %dx%d input, ignoring image_size=%d; re-export with "
+                               "imgsz=%d or dynamic=True", self.model_path, static_size[0], static_size[1],
+                               self.image_size, self.image_size)
+        elif self.image_size:
+            self.input_size = (self.image_size, self.image_size)
+
+    def _call_input_size(self, image_size: int) -> Tuple[int, int]:
+        """Input size for a predict call asking for image_size (warns once per size a static export ignores)"""
+        if not image_size or image_size == self.image_size:
+            return self.input_size
+        if self.static_size is None:
+            return (image_size, image_size)
+        if image_size not in self._ignored_sizes:
+            self._ignored_sizes.add(image_size)
+            logger.warning("%s was exported for %dx%d input, ignoring image_size=%d; re-export with "
+                           "imgsz=%d or dynamic=True", self.model_path, self.static_size[0], self.static_size[1],
+                           image_size, image_size)
+        return self.input_size
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        if not images:
+            return []
+        input_size = self._call_input_size(image_size)
+        if self.dynamic_batch:
+            with STAGE_SECONDS.time("preprocess"):
+                batch = preprocess_images(images, input_size)
+            with STAGE_SECONDS.time("forward"):
+                outputs = self._forward(batch)
+        else:
+            preprocess_seconds = forward_seconds = 0.0
+            outputs = []
+            for image in images:
+                start = time.perf_counter()
+                batch = preprocess_images([image], input_size)
+                preprocessed = time.perf_counter()
+                outputs.append(self._forward(batch))
+                preprocess_seconds += preprocessed - start
+                forward_seconds += time.perf_counter() - preprocessed
+            outputs = np.concatenate(outputs)
+            STAGE_SECONDS.observe(preprocess_seconds, "preprocess")
+            STAGE_SECONDS.observe(forward_seconds, "forward")
+
+        detections = []
+        with STAGE_SECONDS.time("postprocess"):
+            for image, output in zip(images, outputs):
+                boxes = postprocess(output, conf, iou)
+                scale_boxes(boxes, input_size, image.shape)
+                detections.append(boxes)
+        return detections
+
+class OnnxRuntimeBackend(_ExportedModelBackend):
+    """ONNX Runtime CPU session with configurable intra/inter-op thread pools"""
+
+    name = "onnxruntime"
+    thread_safe = True
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 image_size: int = 0):
+        super().__init__(model_path, image_size)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnxruntime backend requires: pip install onnxruntime") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        self.model = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.model.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        self.dynamic_batch = not isinstance(batch, int)
+        self._set_input_size((height, width) if isinstance(height, int) and isinstance(width, int) else None)
+        self.names = parse_names(self.model.get_modelmeta().custom_metadata_map)
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.run(None, {self.input_name: batch})[0]
+
+class OpenVINOBackend(_ExportedModelBackend):
+    """OpenVINO CPU runtime for models exported with format=openvino"""
+
+    name = "openvino"
+    thread_safe = True
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 image_size: int = 0):
+        super().__init__(model_path, image_size)
+        try:
+            from openvino.runtime import Core
+        except ImportError as e:
+            raise ImportError("The openvino backend requires: pip install openvino") from e
+
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(
+                os.path.join(model_path, name) for name in sorted(os.listdir(model_path)) if name.endswith(".xml")
+            )
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if intra_op_threads > 0:
+            config["INFERENCE_NUM_THREADS"] = str(intra_op_threads)
+
+        core = Core()
+        network = core.read_model(xml_path)
+        model_input = network.inputs[0]
+        shape = model_input.get_partial_shape()
+        self.dynamic_batch = shape[0].is_dynamic
+        self._set_input_size(
+            (shape[2].get_length(), shape[3].get_length()) if shape[2].is_static and shape[3].is_static else None
+        )
+        self.model = core.compile_model(network, "CPU", config)
+
+        metadata_path = os.path.join(os.path.dirname(xml_path), "metadata.yaml")
+        if os.path.exists(metadata_path):
+            import yaml
+            with open(metadata_path, 'r') as f:
+                self.names = parse_names(yaml.safe_load(f) or {})
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.model(batch)[self.model.output(0)]
+
+class StubBackend(InferenceBackend):
+    """Synthetic model for load testing the serving stack without weights or a deep learning runtime.
+
+    Each batch sleeps ``forward_ms`` plus ``per_image_ms`` per image (sleeping
+    releases the GIL like a real forward pass) and returns 1-5 boxes chosen
+    from a cheap fingerprint of the pixels, so the same image always gets
+    the same detections. An ``image_size`` (of the backend or the call)
+    scales the simulated time by the input area relative to 640x640.
+    """
+
+    name = "stub"
+    thread_safe = True
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 image_size: int = 0, forward_ms: Optional[float] = None, per_image_ms: Optional[float] = None):
+        super().__init__(model_path, image_size)
+        self.forward_ms = settings.STUB_FORWARD_MS if forward_ms is None else forward_ms
+        self.per_image_ms = settings.STUB_PER_IMAGE_MS if per_image_ms is None else per_image_ms
+
+    @staticmethod
+    def _boxes(image: np.ndarray, num_classes: int = 30) -> np.ndarray:
+        height, width = image.shape[:2]
+        fingerprint = int(image[::max(1, height // 8), ::max(1, width // 8)].sum())
+        rng = np.random.default_rng(fingerprint)
+        count = int(rng.integers(1, 6))
+        top_left = rng.uniform(0, 0.7, (count, 2)) * [width, height]
+        size = rng.uniform(0.1, 0.3, (count, 2)) * [width, height]
+        confidence = np.sort(rng.uniform(0.3, 0.95, count))[::-1]
+        return np.column_stack([
+            top_left, top_left + size, confidence, rng.integers(0, num_classes, count)
+        ]).astype(np.float32)
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        image_size = image_size or self.image_size
+        scale = (image_size / 640) ** 2 if image_size else 1.0
+        with STAGE_SECONDS.time("forward"):
+            time.sleep((self.forward_ms + self.per_image_ms * len(images)) * scale / 1000)
+        return [boxes[boxes[:, 4] >= conf] for boxes in map(self._boxes, images)]
+
+BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+    StubBackend.name: StubBackend,
+}
+
+def resolve_backend_name(model_path: str, backend: str = "auto") -> str:
+    """Pick a backend from the model file type when backend is "auto" """
+    if backend != "auto":
+        return backend
+    if model_path.endswith(".onnx"):
+        return OnnxRuntimeBackend.name
+    if model_path.endswith(".xml") or model_path.rstrip("/").endswith("_openvino_model"):
+        return OpenVINOBackend.name
+    return PyTorchBackend.name
+
+def create_backend(model_path: str, backend: str = "auto", intra_op_threads: int = 0,
+                   inter_op_threads: int = 0, image_size: int = 0) -> InferenceBackend:
+    """Load model_path with the requested (or inferred) inference backend"""
+    name = resolve_backend_name(model_path, backend)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_path, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads,
+                          image_size=image_size)
+
@@ -0,0 +1,150 @@
+import asyncio
+import contextvars
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class BatchScheduler:
+    """Collect concurrent detection requests into batched forward passes.
+
+    Requests are queued until either ``max_batch_size`` images are waiting or
+    ``window_ms`` has passed since the first one arrived, then the whole batch
+    goes through ``detect_batch`` at once. A larger window trades p50 latency
+    for fuller batches and higher throughput; a window of 0 only batches
+    requests that are already queued. Up to ``max_concurrent_batches``
+    batches run on the executor at once (match it to the executor's
+    workers); while all of them are busy, new requests keep queueing and
+    go out together as the next batch.
+    """
+
+    def __init__(
+        self,
+        detect_batch: Callable[[List[Any]], List[List[Dict]]],
+        max_batch_size: int = 8,
+        window_ms: float = 10.0,
+        executor=None,
+        max_concurrent_batches: int = 1,
+    ):
+        self.detect_batch = detect_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_ms = max(0.0, window_ms)
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._forwards: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.requests_total = 0
+        self.batches_total = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts: Counter = Counter()
+        self._queue_wait_ms_total = 0.0
+        self._forward_ms_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of images waiting for the next batch"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self):
+        """Start the batching loop on the running event loop if needed"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            # A fresh context: batches mix requests, so none of their request IDs applies
+            self._worker = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def submit(self, image: Any) -> List[Dict]:
+        """Queue an image (in whatever form detect_batch takes) and wait for its own detections"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, time.perf_counter()))
+        self.requests_total += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first request, then fill the batch until full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _run(self):
+        """Batching loop: collect the next batch as soon as a forward slot is free"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect_batch()
+            # Drop requests whose callers have already gone away
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = loop.create_task(self._forward(batch))
+            self._forwards.add(task)
+            task.add_done_callback(self._forwards.discard)
+
+    async def _forward(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        """Run one batch on the executor and hand each request its detections (or the error)"""
+        try:
+            started = time.perf_counter()
+            images = [image for image, _, _ in batch]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self.detect_batch, images)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            finished = time.perf_counter()
+            self.batches_total += 1
+            self.batch_size_counts[len(batch)] += 1
+            self._forward_ms_total += (finished - started) * 1000
+            for (_, future, queued_at), detections in zip(batch, results):
+                self._queue_wait_ms_total += (started - queued_at) * 1000
+                if not future.done():
+                    future.set_result(detections)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Stop the batching loop and any batches still running"""
+        tasks = list(self._forwards)
+        if self._worker is not None:
+            tasks.append(self._worker)
+            self._worker = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        """Queue depth and batch size metrics"""
+        processed = sum(size * count for size, count in self.batch_size_counts.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_ms,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "batches_in_flight": len(self._forwards),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "mean_batch_size": processed / self.batches_total if self.batches_total else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_size_counts.items())},
+            "mean_queue_wait_ms": self._queue_wait_ms_total / processed if processed else 0.0,
+            "mean_forward_ms": self._forward_ms_total / self.batches_total if self.batches_total else 0.0,
+        }
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Rough in-memory footprint of one detection dict (keys, floats, bbox list)
+DETECTION_SIZE_BYTES = 600
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class DetectionCache:
+    """Content-addressed cache of detection results.
+
+    Keys combine a hash of the image bytes with the model version and the
+    conf/iou thresholds, so a re-sent photo skips inference while a new model
+    or threshold never serves stale results. The memory tier is an LRU bounded
+    by entry count and estimated bytes, with a TTL; the optional disk tier
+    keeps JSON files in ``disk_dir`` so entries survive restarts.
+
+    Cached detection lists are shared between requests and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600.0, disk_dir: Optional[str] = None,
+                 disk_max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir or None
+        self.disk_max_entries = disk_max_entries
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        # key -> (expires_at, estimated size, detections), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model_version: str, conf: float, iou: float) -> str:
+        """Hash the image content together with everything that changes the result"""
+        digest = hashlib.blake2b(image_bytes, digest_size=16)
+        digest.update(f"|{model_version}|{conf}|{iou}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Look up the memory tier, counting a miss when absent or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, detections = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return detections
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+            if not self.disk_dir:
+                self.misses += 1
+        return None
+
+    def put(self, key: str, detections: List[Dict]):
+        """Store in the memory tier, evicting least recently used entries beyond the bounds"""
+        self._put_memory(key, detections, time.monotonic() + self.ttl_seconds)
+
+    def _put_memory(self, key: str, detections: List[Dict], expires_at: float):
+        size = ENTRY_OVERHEAD_BYTES + DETECTION_SIZE_BYTES * len(detections)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (expires_at, size, detections)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def load_from_disk(self, key: str) -> Optional[List[Dict]]:
+        """Look up the disk tier and promote hits into memory (blocking file I/O)"""
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        remaining = record["expires_at"] - time.time()
+        if remaining <= 0:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.expirations += 1
+                self.misses += 1
+            return None
+
+        detections = record["detections"]
+        self._put_memory(key, detections, time.monotonic() + remaining)
+        with self._lock:
+            self.disk_hits += 1
+        return detections
+
+    def save_to_disk(self, key: str, detections: List[Dict]):
+        """Write an entry to the disk tier atomically (blocking file I/O)"""
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"expires_at": time.time() + self.ttl_seconds, "detections": detections}, f)
+        os.replace(temp_path, path)
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Delete the oldest disk entries beyond disk_max_entries"""
+        entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")]
+        excess = len(entries) - self.disk_max_entries
+        if excess > 0:
+            for entry in sorted(entries, key=lambda e: e.stat().st_mtime)[:excess]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    async def aget(self, key: str) -> Optional[List[Dict]]:
+        """Memory lookup, falling back to the disk tier off the event loop"""
+        detections = self.get(key)
+        if detections is None and self.disk_dir:
+            detections = await asyncio.to_thread(self.load_from_disk, key)
+        return detections
+
+    async def aput(self, key: str, detections: List[Dict]):
+        """Store in memory and, when enabled, on disk off the event loop"""
+        self.put(key, detections)
+        if self.disk_dir:
+            await asyncio.to_thread(self.save_to_disk, key, detections)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "estimated_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_tier": self.disk_dir is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,84 @@
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from app.ml.inference.backends import InferenceBackend
+
+FAST_STAGE = "fast"
+ACCURATE_STAGE = "accurate"
+
+
+class Detections(list):
+    """Detection dicts of one image, plus the cascade stages that produced them.
+
+    A plain list everywhere else (JSON, caching, pickling to and from worker
+    processes); ``stages`` travels with it so responses can report whether
+    the image was escalated.
+    """
+
+    def __init__(self, detections: Iterable[Dict] = (), stages: Sequence[str] = ()):
+        super().__init__(detections)
+        self.stages = tuple(stages)
+
+
+class ModelCascade:
+    """Confidence-gated two-stage inference.
+
+    Every image first goes through ``fast`` at ``fast_image_size`` (typically
+    the accurate backend itself at a low input resolution, so the weights
+    are loaded once, or a smaller model). Images with a fast-pass
+    detection whose confidence falls in ``uncertain_band`` [low, high), or
+    with no detection at all when ``escalate_empty`` is set, are run again
+    through ``accurate`` and take its detections. The fast pass runs at the
+    band's lower bound so that unsure boxes below the reporting threshold
+    can still trigger escalation.
+    """
+
+    def __init__(self, fast: InferenceBackend, accurate: InferenceBackend,
+                 uncertain_band: Sequence[float] = (0.2, 0.5), escalate_empty: bool = True,
+                 fast_image_size: int = 0):
+        self.fast = fast
+        self.accurate = accurate
+        self.fast_image_size = fast_image_size
+        self.low, self.high = uncertain_band
+        self.escalate_empty = escalate_empty
+        self.images_total = 0
+        self.escalated_total = 0
+        self._lock = threading.Lock()
+
+    def needs_escalation(self, boxes: np.ndarray) -> bool:
+        """Whether fast-pass boxes leave the image ambiguous"""
+        if len(boxes) == 0:
+            return self.escalate_empty
+        confidences = boxes[:, 4]
+        return bool(((confidences >= self.low) & (confidences < self.high)).any())
+
+    def predict(self, images: List[np.ndarray], conf: float,
+                iou: float) -> Tuple[List[np.ndarray], List[Tuple[str, ...]]]:
+        """Boxes per image as InferenceBackend.predict returns them, and the stages run for each"""
+        if not images:
+            return [], []
+        fast_boxes = self.fast.predict(images, min(conf, self.low), iou, image_size=self.fast_image_size)
+        escalated = [index for index, boxes in enumerate(fast_boxes) if self.needs_escalation(boxes)]
+
+        results = [boxes[boxes[:, 4] >= conf] for boxes in fast_boxes]
+        stages = [(FAST_STAGE,)] * len(images)
+        if escalated:
+            accurate_boxes = self.accurate.predict([images[index] for index in escalated], conf, iou)
+            for index, boxes in zip(escalated, accurate_boxes):
+                results[index] = boxes
+                stages[index] = (FAST_STAGE, ACCURATE_STAGE)
+
+        with self._lock:
+            self.images_total += len(images)
+            self.escalated_total += len(escalated)
+        return results, stages
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "images_total": self.images_total,
+                "escalated_total": self.escalated_total,
+                "escalation_rate": self.escalated_total / self.images_total if self.images_total else 0.0
+            }
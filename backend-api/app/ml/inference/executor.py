@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference admission queue has no room for another request"""
+
+
+class InferenceWorkerLost(Exception):
+    """Raised for requests held by an inference worker process that exited"""
+
+
+class InferenceTimeout(Exception):
+    """Raised when an inference worker does not answer a request in time"""
+
+
+# Detector owned by each worker process in "process" mode, and whether it has been warmed up
+_process_detector = None
+_process_warmed = False
+
+
+def init_process_detector(model_path: str):
+    """Process pool initializer: load one model per worker process"""
+    global _process_detector
+    from app.core.logging import setup_logging
+    from app.ml.inference.food_detector import FoodDetector
+    setup_logging()
+    _process_detector = FoodDetector(model_path)
+
+
+def process_warm_up(runs: int, image_size: int) -> Tuple[int, float]:
+    """Run warm-up inferences on the worker process's own detector; returns (pid, seconds)"""
+    global _process_warmed
+    started = time.perf_counter()
+    if not _process_warmed:
+        import numpy as np
+        image = np.full((image_size * 3 // 4, image_size, 3), 114, dtype=np.uint8)
+        for _ in range(runs):
+            _process_detector.detect_batch([image])
+        _process_warmed = True
+    return os.getpid(), time.perf_counter() - started
+
+
+def process_detect_from_bytes(image_bytes: bytes) -> List[Dict]:
+    """Run detect_from_bytes on the worker process's own detector"""
+    return _process_detector.detect_from_bytes(image_bytes)
+
+
+def process_detect_batch_from_bytes(images_bytes: List[bytes]) -> List[List[Dict]]:
+    """Run detect_batch_from_bytes on the worker process's own detector"""
+    return _process_detector.detect_batch_from_bytes(images_bytes)
+
+
+class InferencePool:
+    """Bounded executor that keeps blocking inference off the event loop.
+
+    At most ``max_workers`` inferences run at once and up to ``max_queue``
+    more may wait for a worker. Requests beyond that are rejected straight
+    away with ``InferenceQueueFull`` so the API can answer 503 instead of
+    letting work pile up.
+
+    Process workers are spawned and load their model on demand, so
+    ``warm_up`` starts all of them and runs the warm-up inferences in each
+    before ``ready`` is set; thread pools use the in-process model and are
+    ready straight away.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 32,
+        kind: str = "thread",
+        model_path: str = None,
+    ):
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.capacity = self.max_workers + self.max_queue
+
+        if kind == "process":
+            # Spawned rather than forked: workers now start while the loader and log writer threads run
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_process_detector,
+                initargs=(model_path,)
+            )
+        elif kind == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        else:
+            raise ValueError(f"Unknown inference executor kind: {kind}")
+
+        self.in_flight = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.ready = kind == "thread"
+        self.ready_workers = self.max_workers if self.ready else 0
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    async def warm_up(self, runs: int = 1, image_size: int = 640, max_rounds: int = 10):
+        """Spawn every process worker and warm up its model, then mark the pool ready
+
+        The pool hands tasks to whichever worker is free, so rounds of one
+        warm-up task per worker are submitted until each worker process has
+        answered (already-warm workers return immediately).
+        """
+        if self.ready:
+            return
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        warmed = set()
+        try:
+            for _ in range(max_rounds):
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(self.executor, process_warm_up, runs, image_size)
+                    for _ in range(self.max_workers)
+                ))
+                warmed.update(pid for pid, _ in results)
+                self.ready_workers = len(warmed)
+                if len(warmed) >= self.max_workers:
+                    break
+        except Exception as e:
+            logger.exception("Inference worker processes failed to start")
+            self.warmup_error = str(e)
+            return
+        self.warmup_seconds = time.perf_counter() - started
+        self.ready = True
+        logger.info("Inference worker processes ready in %.2fs (%d workers)", self.warmup_seconds,
+                    self.ready_workers, extra={"warmup_seconds": self.warmup_seconds})
+
+    @contextmanager
+    def admit(self):
+        """Reserve a slot for one request or raise InferenceQueueFull"""
+        if self.in_flight >= self.capacity:
+            self.rejected_total += 1
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self.in_flight}/{self.capacity} requests in flight)"
+            )
+        self.in_flight += 1
+        self.admitted_total += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, fn: Callable, *args):
+        """Run a blocking call on the pool without blocking the event loop
+
+        Thread workers run the call in a copy of the caller's context, so its
+        log records keep the request ID.
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            return await loop.run_in_executor(self.executor, contextvars.copy_context().run, fn, *args)
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def shutdown(self):
+        """Stop the workers, cancelling work that has not started yet"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """Admission queue metrics"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "ready": self.ready,
+            "ready_workers": self.ready_workers,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total
+        }
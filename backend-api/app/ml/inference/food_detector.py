@@ -1,16 +1,86 @@
-from ultralytics import YOLO
 import cv2
+import logging
+import threading
 import numpy as np
-from typing import List, Dict
+from contextlib import nullcontext
+from typing import List, Dict, Optional, Tuple, Union
 import yaml
 import os
 
+from app.core.config import settings
+from app.core.logging import get_sampled_logger
+from app.core.metrics import STAGE_SECONDS
+from app.ml.inference.backends import create_backend
+from app.ml.inference.cascade import Detections, ModelCascade
+from app.ml.inference.preprocessing import PreparedImage, decode_for_inference
+from app.ml.inference.tiling import TiledBackend
+
+logger = logging.getLogger(__name__)
+# Per-request summaries; 1 in LOG_SAMPLE_EVERY is logged outside DEBUG mode
+sampled_logger = get_sampled_logger(__name__)
+
 class FoodDetector:
-    def __init__(self, model_path: str = "app/ml/models/best.pt"):
-        """Initialize the YOLOv8 food detection model"""
-        self.model = YOLO(model_path)
-        self.confidence_threshold = 0.25
-        self.iou_threshold = 0.5
+    def __init__(self, model_path: Optional[str] = None, load_model: bool = True, backend: Optional[str] = None):
+        """Initialize the YOLOv8 food detection model
+
+        The inference backend (pytorch, onnxruntime or openvino) comes from
+        settings.MODEL_BACKEND, where "auto" picks one from the model file type.
+        With CASCADE_ENABLED a fast low-resolution pass runs first and this
+        model only sees the images it leaves uncertain (see ModelCascade).
+        With TILING_ENABLED uploads are decoded larger and this model runs on
+        overlapping tiles of them (see TiledBackend).
+        With load_model=False only class names and thresholds are set up, for
+        front ends that hand inference to worker processes owning the model.
+        """
+        self.model_path = model_path or settings.MODEL_PATH
+        backend_name = backend or settings.MODEL_BACKEND
+        self.backend = create_backend(
+            self.model_path,
+            backend_name,
+            intra_op_threads=settings.INTRA_OP_THREADS,
+            inter_op_threads=settings.INTER_OP_THREADS
+        ) if load_model else None
+        self.model = self.backend.model if self.backend is not None else None
+        self.tiling_config = self._tiling_config() if settings.TILING_ENABLED else None
+        self.tiled = None
+        if self.tiling_config is not None and self.backend is not None:
+            self.tiled = TiledBackend(
+                self.backend,
+                batch_size=settings.TILING_BATCH_SIZE,
+                workers=settings.TILING_WORKERS,
+                **self.tiling_config
+            )
+        self.cascade_config = self._cascade_config() if settings.CASCADE_ENABLED else None
+        self.cascade = None
+        if self.cascade_config is not None and self.backend is not None:
+            # Without separate fast weights the loaded model also runs the fast pass, at its own input size per call
+            fast = self.backend
+            if settings.CASCADE_FAST_MODEL_PATH:
+                fast = create_backend(
+                    self.cascade_config["fast_model_path"],
+                    backend_name,
+                    intra_op_threads=settings.INTRA_OP_THREADS,
+                    inter_op_threads=settings.INTER_OP_THREADS
+                )
+            self.cascade = ModelCascade(
+                fast, self.tiled or self.backend, self.cascade_config["uncertain_band"],
+                self.cascade_config["escalate_empty"], fast_image_size=self.cascade_config["fast_image_size"]
+            )
+        # Backends that cannot predict from several threads (PyTorch) serve one call at a time
+        backends = [self.backend] + ([self.cascade.fast] if self.cascade is not None else [])
+        thread_safe = all(b.thread_safe for b in backends if b is not None)
+        self._predict_lock = nullcontext() if thread_safe else threading.Lock()
+        self.model_version = self._model_version()
+        self._name_table = None
+        self._name_table_source = None
+        self.confidence_threshold = settings.CONFIDENCE_THRESHOLD
+        self.iou_threshold = settings.IOU_THRESHOLD
+        self.decode_target_size = settings.DECODE_TARGET_SIZE
+        if self.tiling_config is not None:
+            self.decode_target_size = max(self.decode_target_size, settings.TILING_DECODE_SIZE)
+        self.apply_exif_orientation = settings.APPLY_EXIF_ORIENTATION
+        self.bbox_decimals = settings.BBOX_DECIMALS
+        self.confidence_decimals = settings.CONFIDENCE_DECIMALS
         
         # Load class names from dataset config (fallback to model names if available)
         dataset_config_path = "app/ml/models/dataset.yaml"
@@ -19,17 +89,17 @@ class FoodDetector:
                 with open(dataset_config_path, 'r') as f:
                     config = yaml.safe_load(f)
                     self.class_names = config.get('names', [])
-                    print(f"Loaded {len(self.class_names)} class names from dataset config")
+                    logger.info("Loaded %d class names from dataset config", len(self.class_names))
             except Exception as e:
-                print(f"Error loading dataset config: {e}")
+                logger.warning("Error loading dataset config: %s", e)
                 self.class_names = []
         else:
             self.class_names = []
         
         # If dataset config failed, try to get names from the model
-        if not self.class_names and hasattr(self.model, 'names') and self.model.names:
-            self.class_names = list(self.model.names.values())
-            print(f"Loaded {len(self.class_names)} class names from model")
+        if not self.class_names and self.backend is not None and self.backend.names:
+            self.class_names = list(self.backend.names)
+            logger.info("Loaded %d class names from model", len(self.class_names))
         
         # Final fallback - hardcoded class names from your dataset
         if not self.class_names:
@@ -41,88 +111,193 @@ class FoodDetector:
                 'salmon', 'sausage', 'scrambled eggs with tomatoes', 'shred chicken',
                 'shrimp', 'shrimp roll', 'stewed pork', 'sweet potato', 'tomato'
             ]
-            print(f"Using hardcoded class names: {len(self.class_names)} classes")
+            logger.info("Using hardcoded class names: %d classes", len(self.class_names))
         
-        print(f"Final class names: {self.class_names}")
+        logger.debug("Final class names: %s", self.class_names)
 
-    def detect_food_items(self, image_path: str) -> List[Dict]:
-        """Detect food items in an image file"""
+    def _model_version(self) -> str:
+        """Identify the loaded weights by file name, size and modification time"""
         try:
-            results = self.model(image_path, conf=self.confidence_threshold, iou=self.iou_threshold)
-            
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = float(box.conf[0].cpu().numpy())
-                        class_id = int(box.cls[0].cpu().numpy())
-                        
-                        # Get class name safely
-                        if class_id < len(self.class_names):
-                            class_name = self.class_names[class_id]
-                        else:
-                            class_name = f"class_{class_id}"
-                        
-                        detection = {
-                            'class_id': class_id,
-                            'class_name': class_name,
-                            'confidence': confidence,
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                            'area': float((x2 - x1) * (y2 - y1))
-                        }
-                        detections.append(detection)
-            
-            print(f"Detected {len(detections)} items: {[d['class_name'] for d in detections]}")
-            return detections
-            
-        except Exception as e:
-            print(f"Detection error: {e}")
+            stat = os.stat(self.model_path)
+            return f"{os.path.basename(self.model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+        except OSError:
+            return os.path.basename(self.model_path)
+
+    def _cascade_config(self) -> Dict:
+        return {
+            "fast_model_path": settings.CASCADE_FAST_MODEL_PATH or self.model_path,
+            "fast_image_size": settings.CASCADE_FAST_IMAGE_SIZE,
+            "uncertain_band": list(settings.CASCADE_UNCERTAIN_BAND),
+            "escalate_empty": settings.CASCADE_ESCALATE_EMPTY
+        }
+
+    def _tiling_config(self) -> Dict:
+        return {
+            "tile_size": settings.TILING_TILE_SIZE,
+            "overlap": settings.TILING_OVERLAP,
+            "include_full_image": settings.TILING_INCLUDE_FULL_IMAGE
+        }
+
+    def _predict(self, images: List[np.ndarray]) -> Tuple[List[np.ndarray], Optional[List[Tuple[str, ...]]]]:
+        """Backend boxes per image, and the cascade stages run for each (None without a cascade)"""
+        with self._predict_lock:
+            if self.cascade is not None:
+                return self.cascade.predict(images, self.confidence_threshold, self.iou_threshold)
+            return (self.tiled or self.backend).predict(images, self.confidence_threshold, self.iou_threshold), None
+
+    def _class_name_table(self) -> np.ndarray:
+        """Object array of class names plus a trailing placeholder, rebuilt if class_names changes"""
+        if self._name_table_source is not self.class_names:
+            self._name_table = np.asarray(list(self.class_names) + [None], dtype=object)
+            self._name_table_source = self.class_names
+        return self._name_table
+
+    def _to_detections(self, boxes: np.ndarray) -> List[Dict]:
+        """Convert backend output rows [x1, y1, x2, y2, conf, class_id] into detection dicts
+
+        Areas and class names are computed for all rows at once and values are
+        converted to Python floats with one tolist() per column, instead of
+        per-box numpy scalar conversions. Boxes and areas are rounded to
+        bbox_decimals and confidences to confidence_decimals (-1 = unrounded);
+        rounding happens in float64 so the JSON carries e.g. 18.9 rather than
+        the float32 neighbour 18.899999618530273.
+        """
+        if len(boxes) == 0:
             return []
+        
+        xyxy = boxes[:, :4].astype(np.float64)
+        confidences = boxes[:, 4].astype(np.float64)
+        class_ids = boxes[:, 5].astype(np.int64)
+        areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        if self.bbox_decimals >= 0:
+            xyxy = xyxy.round(self.bbox_decimals)
+            areas = areas.round(self.bbox_decimals)
+        if self.confidence_decimals >= 0:
+            confidences = confidences.round(self.confidence_decimals)
+        
+        # Get class names safely, with a placeholder for ids outside the class list
+        name_table = self._class_name_table()
+        known = (class_ids >= 0) & (class_ids < len(self.class_names))
+        class_names = name_table[np.where(known, class_ids, len(self.class_names))]
+        if not known.all():
+            class_names[~known] = [f"class_{class_id}" for class_id in class_ids[~known]]
+        
+        return [
+            {
+                'class_id': class_id,
+                'class_name': class_name,
+                'confidence': confidence,
+                'bbox': bbox,
+                'area': area
+            }
+            for class_id, class_name, confidence, bbox, area in zip(
+                class_ids.tolist(), class_names.tolist(), confidences.tolist(), xyxy.tolist(), areas.tolist()
+            )
+        ]
 
-    def detect_from_bytes(self, image_bytes: bytes) -> List[Dict]:
-        """Detect food items from image bytes (for API uploads)"""
-        import io
-        from PIL import Image
+    @property
+    def preprocessing_version(self) -> str:
+        """Identifies the decode, rounding, tiling and cascade settings, which change detections like the model does"""
+        version = (f"decode={self.decode_target_size},exif={int(self.apply_exif_orientation)},"
+                   f"round={self.bbox_decimals}/{self.confidence_decimals}")
+        if self.tiling_config is not None:
+            config = self.tiling_config
+            version += (f",tiles={config['tile_size']}:{config['overlap']}"
+                        f":{int(config['include_full_image'])}")
+        if self.cascade_config is not None:
+            config = self.cascade_config
+            version += (f",cascade={os.path.basename(config['fast_model_path'])}@{config['fast_image_size']}"
+                        f":{config['uncertain_band'][0]}-{config['uncertain_band'][1]}"
+                        f":{int(config['escalate_empty'])}")
+        return version
+
+    def detect_food_items(self, image: Union[str, np.ndarray], prepared: Optional[PreparedImage] = None) -> List[Dict]:
+        """Detect food items in an image file path or decoded BGR array
+
+        When the array came from prepare_image, pass its PreparedImage so boxes
+        are reported in original-image coordinates. Inference errors are
+        raised rather than reported as an empty result, so that callers never
+        mistake (or cache) a failure for "no food".
+        """
+        if isinstance(image, str):
+            image = cv2.imread(image)
+            if image is None:
+                raise ValueError("Could not read image file")
+        batch_boxes, stages = self._predict([image])
+        boxes = batch_boxes[0]
+        if prepared is not None:
+            boxes = prepared.restore_boxes(boxes)
+        with STAGE_SECONDS.time("format"):
+            detections = self._to_detections(boxes)
+        if stages is not None:
+            detections = Detections(detections, stages[0])
+        
+        sampled_logger.info("Detected %d items", len(detections), extra={"items": len(detections)})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Detected classes: %s", [d['class_name'] for d in detections])
+        return detections
+
+    def detect_batch(self, images: List[np.ndarray],
+                     prepared: Optional[List[PreparedImage]] = None) -> List[List[Dict]]:
+        """Detect food items in several decoded images with one batched forward pass (errors are raised)"""
+        if not images:
+            return []
+        batch_boxes, stages = self._predict(images)
+        if prepared is not None:
+            batch_boxes = [p.restore_boxes(boxes) for p, boxes in zip(prepared, batch_boxes)]
+        with STAGE_SECONDS.time("format"):
+            batch_detections = [self._to_detections(boxes) for boxes in batch_boxes]
+        if stages is not None:
+            batch_detections = [Detections(d, s) for d, s in zip(batch_detections, stages)]
+        sampled_logger.info("Batched detection on %d images", len(images), extra={"batch_size": len(images)})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Items per image: %s", [len(d) for d in batch_detections])
+        return batch_detections
+
+    def detect_batch_from_bytes(self, images_bytes: List[bytes]) -> List[List[Dict]]:
+        """Decode several uploads and detect food items in one batched forward pass"""
+        images = [self.prepare_image(image_bytes) for image_bytes in images_bytes]
+        decoded = [image for image in images if image is not None]
+        if len(decoded) < len(images):
+            logger.warning("Could not decode %d of %d images", len(images) - len(decoded), len(images))
         
-        print(f"Starting detection from {len(image_bytes)} bytes of image data")
+        batch_detections = iter(self.detect_batch([p.image for p in decoded], decoded))
+        return [next(batch_detections) if image is not None else [] for image in images]
+
+    def prepare_image(self, image_bytes: bytes) -> Optional[PreparedImage]:
+        """Decode an upload at reduced size, upright per its EXIF orientation"""
+        with STAGE_SECONDS.time("decode"):
+            return decode_for_inference(image_bytes, self.decode_target_size, self.apply_exif_orientation)
+
+    def detect_from_bytes(self, image_bytes: bytes) -> List[Dict]:
+        """Detect food items from image bytes (for API uploads)
+
+        Undecodable data yields no detections; inference errors are raised.
+        """
+        logger.debug("Starting detection from %d bytes of image data", len(image_bytes))
         
-        try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            print(f"Image opened successfully: {image.size} {image.mode}")
-            
-            # Save temporarily and run detection
-            temp_path = "temp_image.jpg"
-            image.save(temp_path)
-            print(f"Image saved to temp file: {temp_path}")
-            
-            try:
-                print("Running YOLOv8 detection...")
-                detections = self.detect_food_items(temp_path)
-                print(f"Detection completed. Found {len(detections)} items")
-                return detections
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    print(f"Temp file cleaned up: {temp_path}")
-                    
-        except Exception as e:
-            print(f"Error in detect_from_bytes: {e}")
-            import traceback
-            traceback.print_exc()
+        # Decode in memory at roughly inference resolution and hand the array straight to the model
+        prepared = self.prepare_image(image_bytes)
+        if prepared is None:
+            logger.warning("Could not decode image data")
             return []
+        logger.debug("Image decoded: %dx%d (original %dx%d), running %s backend",
+                     prepared.image.shape[1], prepared.image.shape[0],
+                     prepared.original_size[0], prepared.original_size[1], self.backend.name)
+        return self.detect_food_items(prepared.image, prepared)
 
     def get_model_info(self) -> Dict:
         """Get model information and configuration"""
         return {
             "model_name": "HealthSphere_Food_Detection_v1",
             "framework": "YOLOv8",
+            "backend": self.backend.name if self.backend is not None else None,
+            "model_version": self.model_version,
             "num_classes": len(self.class_names),
             "confidence_threshold": self.confidence_threshold,
             "iou_threshold": self.iou_threshold,
+            "tiling": self.tiling_config,
+            "cascade": self.cascade_config,
             "supported_formats": ["JPG", "PNG", "JPEG"],
             "class_names": self.class_names
         }
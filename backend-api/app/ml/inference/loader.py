@@ -0,0 +1,110 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ModelNotReady(Exception):
+    """Raised when the detector is requested before it has finished loading"""
+
+
+class ModelLoader:
+    """Loads the FoodDetector off the request path and tracks readiness.
+
+    Heavy modules (the detector stack, and torch/ultralytics through the
+    PyTorch backend) are only imported once loading starts, so the app can
+    bind and answer liveness checks straight away. ``start`` loads on a
+    background thread; ``load`` loads synchronously for eager startup.
+    After loading, ``warmup_runs`` inferences on a blank image pay the
+    first-call costs (allocator, kernel selection) before real traffic.
+    ``on_loaded`` is called with the detector before it is reported ready,
+    to precompute anything derived from the model.
+    """
+
+    def __init__(self, model_path: str, load_model: bool = True, warmup_runs: int = 1,
+                 warmup_image_size: int = 640, on_loaded: Optional[Callable[[Any], None]] = None):
+        self.model_path = model_path
+        self.load_model = load_model
+        self.warmup_runs = warmup_runs
+        self.warmup_image_size = warmup_image_size
+        self.on_loaded = on_loaded
+
+        self.state = "pending"
+        self.detector = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self):
+        """Begin loading on a background thread (no-op if already started)"""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "loading"
+        self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def load(self):
+        """Load synchronously (no-op if already started)"""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "loading"
+        self._load()
+
+    def _load(self):
+        try:
+            started = time.perf_counter()
+            from app.ml.inference.food_detector import FoodDetector
+            detector = FoodDetector(self.model_path, load_model=self.load_model)
+            self.load_seconds = time.perf_counter() - started
+            logger.info("Model loaded in %.2fs", self.load_seconds, extra={"load_seconds": self.load_seconds})
+
+            if self.load_model and self.warmup_runs > 0:
+                self.warmup_seconds = self._warm_up(detector)
+                logger.info("Model warmed up in %.2fs (%d runs)", self.warmup_seconds, self.warmup_runs,
+                            extra={"warmup_seconds": self.warmup_seconds})
+
+            if self.on_loaded is not None:
+                self.on_loaded(detector)
+            self.detector = detector
+            self.state = "ready"
+        except Exception as e:
+            logger.exception("Model loading failed")
+            self.error = str(e)
+            self.state = "failed"
+
+    def _warm_up(self, detector) -> float:
+        import numpy as np
+        size = self.warmup_image_size
+        image = np.full((size * 3 // 4, size, 3), 114, dtype=np.uint8)
+        started = time.perf_counter()
+        for _ in range(self.warmup_runs):
+            detector.detect_batch([image])
+        return time.perf_counter() - started
+
+    def get(self):
+        """Return the loaded detector or raise ModelNotReady"""
+        if self.state != "ready":
+            if self.state == "failed":
+                raise ModelNotReady(f"Model failed to load: {self.error}")
+            raise ModelNotReady("Model is still loading")
+        return self.detector
+
+    def status(self) -> Dict:
+        """Loading state for the public /ready and /models responses (file name only, not its path)"""
+        return {
+            "state": self.state,
+            "model_file": os.path.basename(self.model_path),
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error
+        }
@@ -0,0 +1,125 @@
+import io
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Enough for JPEG/PNG headers including EXIF, so large uploads are not copied just to read them
+HEADER_BYTES = 256 * 1024
+
+# libjpeg scales by 1/2, 1/4 or 1/8 while decoding, skipping most of the IDCT work
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+class PreparedImage:
+    """A decoded upload at roughly inference resolution, plus the mapping back to the original.
+
+    ``original_size`` is the (width, height) of the upload after EXIF
+    orientation, i.e. the frame a client displays, and the scale factors map
+    coordinates in ``image`` back to it.
+    """
+
+    def __init__(self, image: np.ndarray, original_size: Tuple[int, int], orientation: int = 1):
+        self.image = image
+        self.original_size = original_size
+        self.orientation = orientation
+        height, width = image.shape[:2]
+        self.scale_x = original_size[0] / width
+        self.scale_y = original_size[1] / height
+
+    @property
+    def reduced(self) -> bool:
+        return self.scale_x != 1.0 or self.scale_y != 1.0
+
+    def restore_boxes(self, boxes: np.ndarray) -> np.ndarray:
+        """Map (N, 6) [x1, y1, x2, y2, conf, cls] boxes to original-image coordinates"""
+        if not self.reduced or len(boxes) == 0:
+            return boxes
+        restored = boxes.copy()
+        restored[:, :4] *= np.array([self.scale_x, self.scale_y, self.scale_x, self.scale_y], dtype=boxes.dtype)
+        return restored
+
+
+def read_header(image_bytes: bytes) -> Optional[Tuple[int, int, int]]:
+    """(width, height, EXIF orientation) from the image header, without decoding pixels"""
+    view = memoryview(image_bytes)
+    # Try the leading bytes first; formats such as WebP need the whole file
+    candidates = [view[:HEADER_BYTES], view] if len(view) > HEADER_BYTES else [view]
+    for data in candidates:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+                return image.width, image.height, orientation if orientation in range(1, 9) else 1
+        except Exception:
+            continue
+    return None
+
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """Largest decode reduction that keeps the long side at or above target_size"""
+    if target_size <= 0:
+        return 1
+    factor = 1
+    for candidate in (2, 4, 8):
+        if max(width, height) / candidate >= target_size:
+            factor = candidate
+    return factor
+
+
+def apply_orientation(image: np.ndarray, orientation: int) -> np.ndarray:
+    """Rotate/flip a decoded image upright according to its EXIF orientation"""
+    if orientation == 2:
+        return cv2.flip(image, 1)
+    if orientation == 3:
+        return cv2.rotate(image, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(image, 0)
+    if orientation == 5:
+        return cv2.transpose(image)
+    if orientation == 6:
+        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.rotate(cv2.transpose(image), cv2.ROTATE_180)
+    if orientation == 8:
+        return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
+
+def decode_for_inference(image_bytes: bytes, target_size: int = 640,
+                         apply_exif_orientation: bool = True) -> Optional[PreparedImage]:
+    """Decode an upload straight to roughly inference resolution.
+
+    A 4032x3024 JPEG with target_size=640 is decoded at 1/4 scale
+    (1008x756), so the full-resolution bitmap is never materialized; the
+    letterbox then only has a small resize left to do. Returns None when the
+    bytes cannot be decoded.
+    """
+    buffer = np.frombuffer(memoryview(image_bytes), dtype=np.uint8)
+    header = read_header(image_bytes)
+    if header is None:
+        # Let OpenCV try formats PIL cannot parse, at full size
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if image is None:
+            return None
+        return PreparedImage(image, (image.shape[1], image.shape[0]))
+
+    width, height, orientation = header
+    factor = reduction_factor(width, height, target_size)
+    image = cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        return None
+
+    if not apply_exif_orientation:
+        orientation = 1
+    image = apply_orientation(image, orientation)
+    if orientation >= 5:
+        width, height = height, width
+    return PreparedImage(image, (width, height), orientation)
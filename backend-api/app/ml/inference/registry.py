@@ -0,0 +1,283 @@
+import gc
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.metrics import latency_summary
+from app.ml.inference.loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+CANDIDATE = "candidate"
+
+
+class ModelLoadInProgress(Exception):
+    """Raised when a model version is requested while another one is still loading"""
+
+
+def resolve_model_path(model_path: str, models_dir: str) -> str:
+    """Resolve model_path, raising ValueError if it is outside models_dir
+
+    Symlinks and ".." are resolved first, so neither can escape the directory.
+    """
+    models_dir = os.path.realpath(models_dir)
+    resolved = os.path.realpath(model_path)
+    if os.path.commonpath([models_dir, resolved]) != models_dir:
+        raise ValueError(f"model_path must be inside the models directory {models_dir}")
+    return resolved
+
+
+class ModelVersion:
+    """One model version: its loader, its role and per-version serving stats"""
+
+    def __init__(self, version_id: str, loader: ModelLoader, role: str, window: int = 1000):
+        self.version_id = version_id
+        self.loader = loader
+        self.role = role
+        self.detector = None
+        self.in_flight = 0
+        self.requests_total = 0
+        self.images_total = 0
+        self.detections_total = 0
+        self.errors_total = 0
+        self.activated_at: Optional[float] = None
+        self.retired_at: Optional[float] = None
+        self._latencies_ms = deque(maxlen=window)
+
+    @property
+    def model_path(self) -> str:
+        return self.loader.model_path
+
+    def record(self, images: int, detections: int, seconds: float):
+        self.requests_total += 1
+        self.images_total += images
+        self.detections_total += detections
+        self._latencies_ms.append(seconds * 1000)
+
+    def stats(self) -> Dict:
+        return {
+            "version_id": self.version_id,
+            "role": self.role,
+            "model_file": os.path.basename(self.model_path),
+            "model_version": self.detector.model_version if self.detector is not None else None,
+            "loader": self.loader.status(),
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "images_total": self.images_total,
+            "errors_total": self.errors_total,
+            "detections_total": self.detections_total,
+            "mean_detections_per_image": self.detections_total / self.images_total if self.images_total else 0.0,
+            "latency_ms": latency_summary(self._latencies_ms)
+        }
+
+
+class ModelRegistry:
+    """Serving model versions with background hot reload and A/B routing.
+
+    The active version serves all traffic except ``candidate_traffic`` (a
+    fraction of requests) routed to an optional candidate. ``load`` brings a
+    new version up on a background thread through its own ModelLoader
+    (including warm-up) while the current one keeps serving, then swaps it
+    in under a lock: requests pick their version with ``serve`` and hold it
+    for their whole inference, so in-flight work finishes on the version it
+    started on. A replaced version is retired and its detector released as
+    soon as its last in-flight request ends, so at most the active version,
+    the candidate and one loading version hold a model at once.
+    ``on_activated`` is called with the detector of each version before it
+    becomes active, to rebuild anything derived from the model. A
+    ``candidate_path`` is loaded as the candidate once the initial version
+    is up.
+    """
+
+    def __init__(self, model_path: str, load_model: bool = True, warmup_runs: int = 1,
+                 warmup_image_size: int = 640, on_activated: Optional[Callable[[Any], None]] = None,
+                 candidate_path: str = "", candidate_traffic: float = 0.0, history: int = 5):
+        self.load_model = load_model
+        self.warmup_runs = warmup_runs
+        self.warmup_image_size = warmup_image_size
+        self.on_activated = on_activated
+        self.candidate_path = candidate_path
+        self.candidate_traffic = candidate_traffic
+        self.retired: deque = deque(maxlen=history)
+
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._loading: Optional[ModelVersion] = None
+        self.candidate: Optional[ModelVersion] = None
+        self.active = self._new_version(model_path, ACTIVE)
+
+    def _new_version(self, model_path: str, role: str) -> ModelVersion:
+        self._sequence += 1
+        version = ModelVersion(f"v{self._sequence}", None, role)
+        version.loader = ModelLoader(
+            model_path,
+            load_model=self.load_model,
+            warmup_runs=self.warmup_runs,
+            warmup_image_size=self.warmup_image_size,
+            on_loaded=lambda detector: self._loaded(version, detector)
+        )
+        return version
+
+    @property
+    def ready(self) -> bool:
+        return self.active.detector is not None
+
+    def start(self):
+        """Begin loading the initial version (then the candidate, if any) on a background thread"""
+        if self.active.loader.state == "pending":
+            threading.Thread(target=self.load_initial, name="model-loader", daemon=True).start()
+
+    def load_initial(self):
+        """Load the initial version synchronously, for eager startup (no-op if already started)"""
+        if self.active.loader.state != "pending":
+            return
+        self.active.loader.load()
+        if self.candidate_path and self.ready:
+            try:
+                self.load(self.candidate_path, CANDIDATE)
+            except (FileNotFoundError, ModelLoadInProgress) as e:
+                logger.error("Could not load the candidate model: %s", e)
+
+    def get(self):
+        """The active detector, or raise ModelNotReady while the first version loads"""
+        detector = self.active.detector
+        if detector is None:
+            return self.active.loader.get()
+        return detector
+
+    def load(self, model_path: str, role: str = ACTIVE) -> ModelVersion:
+        """Load model_path in the background as the next active version or as the candidate"""
+        if role not in (ACTIVE, CANDIDATE):
+            raise ValueError(f"Unknown model role '{role}', expected '{ACTIVE}' or '{CANDIDATE}'")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        with self._lock:
+            if self._loading is not None or self.active.loader.state in ("pending", "loading"):
+                raise ModelLoadInProgress("Another model version is still loading")
+            version = self._new_version(model_path, role)
+            self._loading = version
+        logger.info("Loading %s from %s as %s", version.version_id, model_path, role,
+                    extra={"version_id": version.version_id, "role": role})
+        threading.Thread(target=self._load, args=(version,), name="model-reload", daemon=True).start()
+        return version
+
+    def _load(self, version: ModelVersion):
+        try:
+            version.loader.load()
+        finally:
+            with self._lock:
+                if self._loading is version:
+                    self._loading = None
+                if version.loader.state == "failed":
+                    version.role = "failed"
+                    version.retired_at = time.time()
+                    self.retired.append(version)
+
+    def _loaded(self, version: ModelVersion, detector):
+        """ModelLoader callback: put a loaded and warmed-up version into service"""
+        if version.role == ACTIVE and self.on_activated is not None:
+            self.on_activated(detector)
+        with self._lock:
+            version.detector = detector
+            version.activated_at = time.time()
+            if version.role == ACTIVE:
+                replaced, self.active = self.active, version
+            else:
+                replaced, self.candidate = self.candidate, version
+        if replaced is not None and replaced is not version:
+            self._retire(replaced)
+        logger.info("Model %s (%s) is now %s", version.version_id, detector.model_version, version.role,
+                    extra={"version_id": version.version_id, "role": version.role})
+
+    def promote(self) -> ModelVersion:
+        """Make the candidate the active version"""
+        candidate = self.candidate
+        if candidate is None:
+            raise ValueError("There is no candidate model to promote")
+        if self.on_activated is not None:
+            self.on_activated(candidate.detector)
+        with self._lock:
+            replaced, self.active = self.active, candidate
+            candidate.role = ACTIVE
+            self.candidate = None
+        self._retire(replaced)
+        logger.info("Promoted %s to active", candidate.version_id, extra={"version_id": candidate.version_id})
+        return candidate
+
+    def remove_candidate(self) -> Optional[ModelVersion]:
+        """Stop routing traffic to the candidate and release it"""
+        with self._lock:
+            candidate, self.candidate = self.candidate, None
+        if candidate is not None:
+            self._retire(candidate)
+        return candidate
+
+    def _route(self) -> ModelVersion:
+        """Pick the version for one request: the candidate for candidate_traffic of requests"""
+        candidate = self.candidate
+        if candidate is not None and random.random() < self.candidate_traffic:
+            return candidate
+        if self.active.detector is None:
+            self.active.loader.get()  # Raises ModelNotReady
+        return self.active
+
+    @contextmanager
+    def serve(self) -> Iterator[ModelVersion]:
+        """Route one request and hold its version until the block ends
+
+        Routing and taking the hold happen under one lock, so a version that
+        is swapped out concurrently is never released between the two; a
+        retired version is released when its last request ends.
+        """
+        with self._lock:
+            version = self._route()
+            version.in_flight += 1
+        try:
+            yield version
+        except Exception:
+            version.errors_total += 1
+            raise
+        finally:
+            with self._lock:
+                version.in_flight -= 1
+                release = version.retired_at is not None and version.in_flight == 0
+            if release:
+                self._release(version)
+
+    def _retire(self, version: ModelVersion):
+        with self._lock:
+            version.role = "retired"
+            version.retired_at = time.time()
+            self.retired.append(version)
+            release = version.in_flight == 0
+        if release:
+            self._release(version)
+
+    def _release(self, version: ModelVersion):
+        """Drop the references to a retired version's model and collect it off the request path"""
+        if version.detector is None:
+            return
+        version.detector = None
+        version.loader.detector = None
+        threading.Thread(target=gc.collect, name="model-unload", daemon=True).start()
+        logger.info("Released model %s", version.version_id, extra={"version_id": version.version_id})
+
+    def versions(self) -> List[ModelVersion]:
+        serving = [self.active] + ([self.candidate] if self.candidate is not None else [])
+        loading = [self._loading] if self._loading is not None else []
+        return serving + loading + list(self.retired)
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active.version_id,
+            "candidate": self.candidate.version_id if self.candidate is not None else None,
+            "candidate_traffic": self.candidate_traffic,
+            "loading": self._loading.version_id if self._loading is not None else None,
+            "versions": [version.stats() for version in self.versions()]
+        }
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from app.core.metrics import latency_summary
+
+# (frame_id, received_at, frame bytes, client timestamp)
+Frame = Tuple[int, float, bytes, Optional[float]]
+
+
+class LatestFrame:
+    """Single-slot mailbox between a stream's receiver and its inference loop.
+
+    Putting a frame replaces any frame still waiting, so when inference falls
+    behind the loop always picks up the newest frame and stale ones are
+    counted as dropped instead of queueing up latency.
+    """
+
+    def __init__(self):
+        self._frame: Optional[Frame] = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, frame: Frame):
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._event.set()
+
+    async def get(self) -> Optional[Frame]:
+        """Wait for the next frame; None once closed"""
+        while self._frame is None:
+            if self.closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+
+class StreamSession:
+    """Frame rate, drop and latency counters for one camera stream"""
+
+    def __init__(self, session_id: str, window: int = 120):
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.frames_received = 0
+        self.frames_rejected = 0
+        self.frames_inferred = 0
+        self.frames_tracked = 0
+        self.frames_dropped = 0
+        self._result_times = deque(maxlen=window)
+        self._latencies_ms = deque(maxlen=window)
+
+    def record_result(self, latency_ms: float, inferred: bool):
+        if inferred:
+            self.frames_inferred += 1
+        else:
+            self.frames_tracked += 1
+        self._result_times.append(time.perf_counter())
+        self._latencies_ms.append(latency_ms)
+
+    @property
+    def fps(self) -> float:
+        """Results per second over the recent window"""
+        if len(self._result_times) < 2:
+            return 0.0
+        elapsed = self._result_times[-1] - self._result_times[0]
+        return (len(self._result_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> Dict:
+        duration = time.perf_counter() - self.started
+        results = self.frames_inferred + self.frames_tracked
+        return {
+            "session_id": self.session_id,
+            "duration_seconds": duration,
+            "frames_received": self.frames_received,
+            "frames_rejected": self.frames_rejected,
+            "frames_dropped": self.frames_dropped,
+            "frames_inferred": self.frames_inferred,
+            "frames_tracked": self.frames_tracked,
+            "input_fps": self.frames_received / duration if duration > 0 else 0.0,
+            "output_fps": results / duration if duration > 0 else 0.0,
+            "recent_fps": self.fps,
+            "latency_ms": latency_summary(self._latencies_ms)
+        }
@@ -0,0 +1,145 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import STAGE_SECONDS
+from app.ml.inference.backends import MAX_DETECTIONS, InferenceBackend, nms
+
+logger = logging.getLogger(__name__)
+
+# Tile boxes this close (in pixels) to a tile border inside the image are cut-off parts of larger items
+EDGE_MARGIN = 2.0
+
+
+def tile_windows(width: int, height: int, tile_size: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """(x1, y1, x2, y2) windows of at most tile_size covering the image, overlapping by the given fraction
+
+    The last row and column are shifted back to end at the image border
+    rather than running past it, so every tile has full size when the image
+    is larger than a tile.
+    """
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def merge_detections(parts: List[np.ndarray], iou: float) -> np.ndarray:
+    """Class-aware NMS over (N, 6) boxes already in the same coordinates, best first"""
+    boxes = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+    if len(boxes) == 0:
+        return boxes.reshape(0, 6).astype(np.float32)
+    # Shift each class past the largest coordinate so one NMS pass never suppresses across classes
+    offset = float(boxes[:, :4].max()) + 1.0
+    keep = nms(boxes[:, :4] + boxes[:, 5:6] * offset, boxes[:, 4], iou)[:MAX_DETECTIONS]
+    return boxes[keep].astype(np.float32)
+
+
+class TiledBackend(InferenceBackend):
+    """Sliced inference: images larger than a tile run as overlapping tiles at full resolution.
+
+    A 12 MP tray photo squeezed into a 640 px input leaves items such as
+    baby corn or bean sprouts a few pixels wide; cut into ``tile_size``
+    crops each tile keeps its native resolution. Tiles of every image in a
+    call are gathered into chunks of ``batch_size`` for the wrapped backend,
+    and with ``workers`` > 1 the chunks run concurrently (for backends whose
+    predict is thread-safe). Tile boxes are shifted to image coordinates and
+    merged with class-aware NMS. With ``include_full_image`` the whole image
+    is also run once so that items larger than a tile are still found, and
+    tile boxes touching an inner tile border (pieces of such items) are
+    dropped before merging.
+    """
+
+    name = "tiled"
+
+    def __init__(self, backend: InferenceBackend, tile_size: int = 640, overlap: float = 0.2,
+                 include_full_image: bool = True, batch_size: int = 8, workers: int = 0):
+        super().__init__(backend.model_path, backend.image_size)
+        self.backend = backend
+        self.model = backend.model
+        self.names = backend.names
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.include_full_image = include_full_image
+        self.batch_size = max(1, batch_size)
+        self.workers = workers if backend.thread_safe else 0
+        if workers > 1 and not backend.thread_safe:
+            logger.warning("The %s backend cannot predict from several threads; running tiles sequentially",
+                           backend.name)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tiles")
+
+    @property
+    def thread_safe(self) -> bool:
+        return self.backend.thread_safe
+
+    def _crops(self, image: np.ndarray) -> Tuple[List[np.ndarray], List[Tuple[int, int, int, int]]]:
+        """Tile views of the image (no copies) and their windows; a small image is its own single crop"""
+        height, width = image.shape[:2]
+        if max(width, height) <= self.tile_size:
+            return [image], [(0, 0, width, height)]
+        windows = tile_windows(width, height, self.tile_size, self.overlap)
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+        if self.include_full_image:
+            crops.append(image)
+            windows.append((0, 0, width, height))
+        return crops, windows
+
+    def _run(self, crops: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        chunks = [crops[start:start + self.batch_size] for start in range(0, len(crops), self.batch_size)]
+        if self._executor is not None and len(chunks) > 1:
+            results = self._executor.map(lambda chunk: self.backend.predict(chunk, conf, iou, image_size), chunks)
+        else:
+            results = (self.backend.predict(chunk, conf, iou, image_size) for chunk in chunks)
+        return [boxes for chunk_boxes in results for boxes in chunk_boxes]
+
+    def _to_image(self, boxes: np.ndarray, window: Tuple[int, int, int, int], size: Tuple[int, int]) -> np.ndarray:
+        """Shift tile boxes to image coordinates, dropping ones cut off by an inner tile border"""
+        x1, y1, x2, y2 = window
+        width, height = size
+        if (x1, y1, x2, y2) == (0, 0, width, height) or len(boxes) == 0:
+            return boxes
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] += x1
+        boxes[:, [1, 3]] += y1
+        if not self.include_full_image:
+            return boxes
+        cut = np.zeros(len(boxes), dtype=bool)
+        for index, border, inner in ((0, x1, x1 > 0), (1, y1, y1 > 0), (2, x2, x2 < width), (3, y2, y2 < height)):
+            if inner:
+                cut |= np.abs(boxes[:, index] - border) <= EDGE_MARGIN
+        return boxes[~cut]
+
+    def predict(self, images: List[np.ndarray], conf: float, iou: float, image_size: int = 0) -> List[np.ndarray]:
+        if not images:
+            return []
+        crops, windows, owners = [], [], []
+        for index, image in enumerate(images):
+            image_crops, image_windows = self._crops(image)
+            crops.extend(image_crops)
+            windows.extend(image_windows)
+            owners.extend([index] * len(image_crops))
+
+        crop_boxes = self._run(crops, conf, iou, image_size)
+
+        with STAGE_SECONDS.time("merge"):
+            parts: List[List[np.ndarray]] = [[] for _ in images]
+            for owner, window, boxes in zip(owners, windows, crop_boxes):
+                height, width = images[owner].shape[:2]
+                parts[owner].append(self._to_image(boxes, window, (width, height)))
+            return [
+                image_parts[0] if len(image_parts) == 1 else merge_detections(image_parts, iou)
+                for image_parts in parts
+            ]
@@ -0,0 +1,152 @@
+from typing import Dict, List
+
+import numpy as np
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class Track:
+    """One food item followed across frames with a constant-velocity box model"""
+
+    def __init__(self, track_id: int, detection: Dict):
+        self.track_id = track_id
+        self.class_id = detection['class_id']
+        self.class_name = detection['class_name']
+        self.confidence = detection['confidence']
+        self.box = np.asarray(detection['bbox'], dtype=np.float64)
+        self.velocity = np.zeros(4)  # Box change per frame
+        self.hits = 1
+        self.misses = 0
+
+    def to_detection(self, tracked: bool, bbox_decimals: int = -1, confidence_decimals: int = -1) -> Dict:
+        x1, y1, x2, y2 = self.box.tolist()
+        area = (x2 - x1) * (y2 - y1)
+        confidence = self.confidence
+        if bbox_decimals >= 0:
+            x1, y1, x2, y2 = np.round(self.box, bbox_decimals).tolist()
+            area = round(area, bbox_decimals)
+        if confidence_decimals >= 0:
+            confidence = round(confidence, confidence_decimals)
+        return {
+            'class_id': self.class_id,
+            'class_name': self.class_name,
+            'confidence': confidence,
+            'bbox': [x1, y1, x2, y2],
+            'area': area,
+            'track_id': self.track_id,
+            'tracked': tracked
+        }
+
+
+class DetectionTracker:
+    """Smooths detections across video frames and stands in for skipped inferences.
+
+    ``update`` matches fresh detections to tracks greedily by IoU within the
+    same class and blends boxes and confidences with an exponential moving
+    average, so boxes stop jittering between frames. ``step`` advances the
+    tracks by their velocity for frames that were not run through the model.
+    Once every track has been confirmed (seen ``min_hits`` times), only every
+    ``keyframe_interval``-th frame needs full inference. Reported boxes and
+    confidences are rounded like FoodDetector output (-1 keeps full precision).
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, smoothing: float = 0.5, max_misses: int = 2,
+                 min_hits: int = 2, keyframe_interval: int = 3, bbox_decimals: int = -1,
+                 confidence_decimals: int = -1):
+        self.iou_threshold = iou_threshold
+        self.smoothing = smoothing
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.keyframe_interval = keyframe_interval
+        self.bbox_decimals = bbox_decimals
+        self.confidence_decimals = confidence_decimals
+        self.tracks: List[Track] = []
+        self.frames_since_inference = 0
+        self._next_id = 1
+
+    def should_infer(self) -> bool:
+        """Whether the next frame needs a full inference rather than a tracker step"""
+        if self.keyframe_interval <= 1 or not self.tracks:
+            return True
+        if any(track.hits < self.min_hits for track in self.tracks):
+            return True
+        return self.frames_since_inference + 1 >= self.keyframe_interval
+
+    def _advance(self, frames: int):
+        for track in self.tracks:
+            track.box = track.box + track.velocity * frames
+
+    def update(self, detections: List[Dict], frames: int = 1) -> List[Dict]:
+        """Fold in detections from a frame ``frames`` after the previous one"""
+        frames = max(1, frames)
+        previous = [track.box for track in self.tracks]
+        self._advance(frames)
+
+        matched_tracks = set()
+        matched_detections = set()
+        if self.tracks and detections:
+            track_boxes = np.stack([track.box for track in self.tracks])
+            detection_boxes = np.asarray([d['bbox'] for d in detections], dtype=np.float64)
+            ious = box_iou(track_boxes, detection_boxes)
+            same_class = (np.array([t.class_id for t in self.tracks])[:, None]
+                          == np.array([d['class_id'] for d in detections])[None, :])
+            ious[~same_class] = 0.0
+            for flat_index in np.argsort(-ious, axis=None):
+                t, d = np.unravel_index(flat_index, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_detections:
+                    continue
+                matched_tracks.add(t)
+                matched_detections.add(d)
+
+                track, detection = self.tracks[t], detections[d]
+                box = self.smoothing * np.asarray(detection['bbox']) + (1 - self.smoothing) * track.box
+                track.velocity = (self.smoothing * (box - previous[t]) / frames
+                                  + (1 - self.smoothing) * track.velocity)
+                track.box = box
+                track.confidence = (self.smoothing * detection['confidence']
+                                    + (1 - self.smoothing) * track.confidence)
+                track.hits += 1
+                track.misses = 0
+
+        survivors = []
+        for index, track in enumerate(self.tracks):
+            if index not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        for index, detection in enumerate(detections):
+            if index not in matched_detections:
+                survivors.append(Track(self._next_id, detection))
+                self._next_id += 1
+        self.tracks = survivors
+        self.frames_since_inference = 0
+        return self.current(predicted=False)
+
+    def step(self, frames: int = 1) -> List[Dict]:
+        """Advance the tracks for a frame that skipped inference"""
+        self._advance(max(1, frames))
+        self.frames_since_inference += 1
+        return self.current(predicted=True)
+
+    def current(self, predicted: bool = True) -> List[Dict]:
+        """Tracks to report: everything seen on the last inference, plus confirmed tracks coasting on misses.
+
+        ``tracked`` marks boxes that were predicted rather than detected in
+        the current frame.
+        """
+        return [
+            track.to_detection(predicted or track.misses > 0, self.bbox_decimals, self.confidence_decimals)
+            for track in self.tracks
+            if track.misses == 0 or track.hits >= self.min_hits
+        ]
@@ -0,0 +1,360 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.logging import setup_logging
+from app.ml.inference.executor import InferenceTimeout, InferenceWorkerLost
+from app.ml.inference.food_detector import FoodDetector
+from app.ml.inference.preprocessing import PreparedImage
+
+logger = logging.getLogger(__name__)
+
+# How often the result reader checks that the worker processes are still alive
+LIVENESS_INTERVAL_SECONDS = 1.0
+
+
+def _worker_main(worker_id: int, shm_name: str, slot_bytes: int, model_path: str,
+                 requests, results, max_batch_size: int):
+    """Worker process: own one model and serve images from its shared-memory ring"""
+    setup_logging()
+    shm = SharedMemory(name=shm_name)
+    try:
+        detector = FoodDetector(model_path)
+    except Exception as e:
+        results.put(("failed", worker_id, str(e)))
+        shm.close()
+        return
+    results.put(("ready", worker_id, None))
+
+    running = True
+    while running:
+        batch = [requests.get()]
+        # Drain whatever else is already waiting into the same forward pass
+        while len(batch) < max_batch_size:
+            try:
+                batch.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        if None in batch:
+            running = False
+            batch = [message for message in batch if message is not None]
+        if not batch:
+            continue
+
+        images = [
+            np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            for _, slot, height, width, _ in batch
+        ]
+        # Boxes are mapped back to the client's frame before formatting, so rounding is final
+        prepared = [PreparedImage(image, message[4]) for image, message in zip(images, batch)]
+        try:
+            batch_detections = detector.detect_batch(images, prepared)
+        except Exception as e:
+            logger.exception("Batched detection failed in inference worker %d", worker_id)
+            # Sent back as the result, so each waiting request fails instead of receiving no detections
+            batch_detections = [RuntimeError(f"Detection failed: {e}")] * len(batch)
+        del images, prepared  # Release the views before the slots are reused
+        for (request_id, _, _, _, _), detections in zip(batch, batch_detections):
+            results.put((request_id, worker_id, detections))
+
+    shm.close()
+
+
+class _WorkerRing:
+    """Front-end view of one worker's shared-memory ring buffer"""
+
+    def __init__(self, worker_id: int, slots: int, slot_bytes: int, context):
+        self.worker_id = worker_id
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = SharedMemory(create=True, size=slots * slot_bytes)
+        self.requests = context.Queue()
+        self.head = 0
+        self.in_use = 0
+        self.process = None
+        self.ready = False
+        self.failed = False
+        self.restarting = False
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.completed_total = 0
+        self.restarts = 0
+
+    def write(self, image: np.ndarray) -> int:
+        """Copy an image into the next free slot and return the slot index"""
+        slot = self.head
+        height, width = image.shape[:2]
+        view = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+        view[:] = image
+        del view
+        self.head = (self.head + 1) % self.slots
+        self.in_use += 1
+        return slot
+
+    def release(self):
+        """Free the oldest slot (workers answer their requests in order)"""
+        self.in_use -= 1
+        self.completed_total += 1
+
+    def reset(self, context):
+        """Forget the slots and queued requests of a dead worker before its replacement starts"""
+        self.requests = context.Queue()
+        self.head = 0
+        self.in_use = 0
+        self.pending = {}
+        self.ready = False
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedMemoryWorkerPool:
+    """K model-owning worker processes fed decoded images over shared memory.
+
+    Each worker gets a ring of ``slots_per_worker`` fixed-size slots holding
+    images of up to ``max_image_side`` pixels per side, so the front end only
+    copies pixels into shared memory and never pickles them, and total image
+    memory is bounded by ``num_workers * slots_per_worker`` slots. Larger
+    images are downscaled before transfer; workers map their boxes back to
+    original coordinates.
+
+    A worker process that dies after loading its model (OOM kill,
+    segfault) is noticed by the result reader within
+    LIVENESS_INTERVAL_SECONDS: its waiting requests fail with
+    InferenceWorkerLost, its slots are freed and a replacement is spawned.
+    A request still unanswered after ``request_timeout`` seconds raises
+    InferenceTimeout; its slot stays reserved until the worker answers.
+    """
+
+    def __init__(self, num_workers: int, slots_per_worker: int = 4,
+                 max_image_side: int = 1280, model_path: str = "app/ml/models/best.pt",
+                 max_batch_size: int = 8, request_timeout: float = 30.0):
+        self.num_workers = max(1, num_workers)
+        self.slots_per_worker = max(1, slots_per_worker)
+        self.max_image_side = max_image_side
+        self.model_path = model_path
+        self.max_batch_size = max(1, max_batch_size)
+        self.request_timeout = request_timeout
+
+        self._context = mp.get_context("spawn")
+        self._rings: List[_WorkerRing] = []
+        self._results = None
+        self._reader: Optional[threading.Thread] = None
+        self._request_ids = itertools.count()
+        self._slot_available: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+        self.timeouts_total = 0
+
+    @property
+    def ready_workers(self) -> int:
+        return sum(1 for ring in self._rings if ring.ready)
+
+    def start(self):
+        """Create the shared-memory rings and spawn the worker processes"""
+        if self._rings:
+            return
+        slot_bytes = self.max_image_side * self.max_image_side * 3
+        self._results = self._context.Queue()
+        self._closing = False
+        for worker_id in range(self.num_workers):
+            ring = _WorkerRing(worker_id, self.slots_per_worker, slot_bytes, self._context)
+            self._spawn(ring)
+            self._rings.append(ring)
+
+        self._reader = threading.Thread(target=self._read_results, name="shm-results", daemon=True)
+        self._reader.start()
+        logger.info("Started %d inference worker processes (%d x %.1f MB slots each)",
+                    self.num_workers, self.slots_per_worker, slot_bytes / 1e6)
+
+    def _spawn(self, ring: _WorkerRing):
+        ring.process = self._context.Process(
+            target=_worker_main,
+            args=(ring.worker_id, ring.shm.name, ring.slot_bytes, self.model_path,
+                  ring.requests, self._results, self.max_batch_size),
+            daemon=True
+        )
+        ring.process.start()
+
+    def _read_results(self):
+        """Background thread: hand worker results back to the waiting coroutines and watch for dead workers"""
+        next_check = time.monotonic() + LIVENESS_INTERVAL_SECONDS
+        while True:
+            try:
+                message = self._results.get(timeout=LIVENESS_INTERVAL_SECONDS)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + LIVENESS_INTERVAL_SECONDS
+            if not message:
+                continue
+            request_id, worker_id, detections = message
+            ring = self._rings[worker_id]
+            if request_id == "ready":
+                ring.ready = True
+                logger.info("Inference worker %d ready", worker_id)
+                continue
+            if request_id == "failed":
+                ring.failed = True
+                logger.error("Inference worker %d failed to load model: %s", worker_id, detections)
+                continue
+            self._call_soon(self._complete, ring, request_id, detections)
+
+    def _call_soon(self, callback, *args):
+        """Run a ring update on the event loop, which owns the ring bookkeeping"""
+        if self._loop is None:
+            callback(*args)  # No request was ever sent, so nothing else touches the rings
+            return
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Event loop closed during shutdown
+
+    def _check_workers(self):
+        for ring in self._rings:
+            if self._closing or ring.failed or ring.restarting or ring.process.is_alive():
+                continue
+            if not ring.ready:
+                # Died while loading, e.g. out of memory: a replacement would most likely die too
+                ring.failed = True
+                logger.error("Inference worker %d exited with code %s while loading the model",
+                             ring.worker_id, ring.process.exitcode)
+                continue
+            ring.restarting = True
+            self._call_soon(self._replace_worker, ring)
+
+    def _replace_worker(self, ring: _WorkerRing):
+        """Runs on the event loop: fail a dead worker's requests, free its slots and spawn a new one"""
+        pending = list(ring.pending.values())
+        logger.error("Inference worker %d exited with code %s, failing %d requests and restarting it",
+                     ring.worker_id, ring.process.exitcode, len(pending),
+                     extra={"worker_id": ring.worker_id, "exit_code": ring.process.exitcode})
+        for future in pending:
+            if not future.done():
+                future.set_exception(InferenceWorkerLost(f"Inference worker {ring.worker_id} exited"))
+        ring.reset(self._context)
+        ring.restarts += 1
+        ring.restarting = False
+        if not self._closing:
+            self._spawn(ring)
+        if self._slot_available is not None:
+            self._slot_available.set()
+
+    def _complete(self, ring: _WorkerRing, request_id: int, detections: List[Dict]):
+        """Runs on the event loop: free the slot and resolve the request"""
+        future = ring.pending.pop(request_id, None)
+        if future is None:
+            return  # Failed when its worker died; the slot was freed then
+        ring.release()
+        if not future.done():
+            if isinstance(detections, Exception):
+                future.set_exception(detections)
+            else:
+                future.set_result(detections)
+        self._slot_available.set()
+
+    def fit_image(self, image: np.ndarray) -> np.ndarray:
+        """Downscale an image so it fits a slot"""
+        height, width = image.shape[:2]
+        scale = min(1.0, self.max_image_side / max(height, width))
+        if scale < 1.0:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image
+
+    def _least_loaded_ring(self) -> Optional[_WorkerRing]:
+        rings = [ring for ring in self._rings if not ring.failed]
+        if not rings:
+            raise RuntimeError("No inference worker could load the model")
+        # Skip a dead worker waiting for its replacement, so new work does not queue behind it
+        rings = [ring for ring in rings if not ring.restarting]
+        if not rings:
+            return None
+        ring = min(rings, key=lambda r: r.in_use)
+        return ring if ring.in_use < ring.slots else None
+
+    async def detect(self, image: np.ndarray, original_size: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        """Send a decoded BGR image to a worker and wait for its detections
+
+        Boxes are reported in the (width, height) frame of ``original_size``,
+        by default the image as passed in.
+        """
+        if self._slot_available is None:
+            self._slot_available = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        if original_size is None:
+            original_size = (image.shape[1], image.shape[0])
+        image = self.fit_image(image)
+
+        # Wait for a free slot; checking and writing happen without yielding the loop
+        ring = self._least_loaded_ring()
+        while ring is None:
+            self._slot_available.clear()
+            await self._slot_available.wait()
+            ring = self._least_loaded_ring()
+        slot = ring.write(image)
+
+        future = self._loop.create_future()
+        request_id = next(self._request_ids)
+        ring.pending[request_id] = future
+        ring.requests.put((request_id, slot, image.shape[0], image.shape[1], original_size))
+        try:
+            # Shielded: on timeout the request stays pending so its slot is freed when the worker answers
+            return await asyncio.wait_for(asyncio.shield(future), self.request_timeout or None)
+        except asyncio.TimeoutError:
+            self.timeouts_total += 1
+            raise InferenceTimeout(
+                f"Inference worker {ring.worker_id} did not answer within {self.request_timeout:g}s"
+            )
+
+    def shutdown(self):
+        """Stop the workers and release the shared memory"""
+        self._closing = True
+        for ring in self._rings:
+            ring.requests.put(None)
+        for ring in self._rings:
+            ring.process.join(timeout=10)
+            if ring.process.is_alive():
+                ring.process.terminate()
+            ring.close()
+        if self._results is not None:
+            self._results.put(None)
+        if self._reader is not None:
+            self._reader.join(timeout=LIVENESS_INTERVAL_SECONDS * 2)
+        self._rings = []
+
+    def stats(self) -> Dict:
+        """Per-worker ring occupancy"""
+        return {
+            "num_workers": self.num_workers,
+            "ready_workers": self.ready_workers,
+            "slots_per_worker": self.slots_per_worker,
+            "max_image_side": self.max_image_side,
+            "pending_requests": sum(len(ring.pending) for ring in self._rings),
+            "request_timeout": self.request_timeout,
+            "timeouts_total": self.timeouts_total,
+            "workers": [
+                {
+                    "worker_id": ring.worker_id,
+                    "ready": ring.ready,
+                    "failed": ring.failed,
+                    "slots_in_use": ring.in_use,
+                    "completed_total": ring.completed_total,
+                    "restarts": ring.restarts
+                }
+                for ring in self._rings
+            ]
+        }
@@ -0,0 +1,22 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+# Several times MAX_DETECTIONS per image, for clients that merge results of a few photos
+MAX_MEAL_DETECTIONS = 1000
+
+
+class MealDetection(BaseModel):
+    """One item of a /detect-food response, sent back for meal analysis (other keys are ignored)"""
+
+    class_id: int = -1  # Needed for nutrition; -1 counts the item as unknown
+    class_name: str
+    confidence: float = Field(ge=0.0, le=1.0)
+    area: float = Field(default=0.0, ge=0.0)
+
+
+class MealDetectionsRequest(BaseModel):
+    detections: List[MealDetection] = Field(max_length=MAX_MEAL_DETECTIONS)
+    # Size of the photo, so nutrition portions can be estimated from box areas (0 = one serving per item)
+    image_width: int = Field(default=0, ge=0)
+    image_height: int = Field(default=0, ge=0)
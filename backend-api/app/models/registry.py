@@ -0,0 +1,16 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ModelLoadRequest(BaseModel):
+    """Weights to load in the background, as the next active version or as the A/B candidate"""
+
+    model_path: str = Field(min_length=1)
+    role: Literal["active", "candidate"] = "active"
+    # Share of detection requests for a candidate (unchanged if omitted)
+    traffic: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+
+class CandidateTrafficRequest(BaseModel):
+    traffic: float = Field(ge=0.0, le=1.0)
@@ -0,0 +1,71 @@
+from bisect import bisect_right
+from typing import Dict, List, Sequence
+
+# Bounds of the legacy confidence_summary buckets: low < 0.5 <= medium <= 0.7 < high
+LOW_CONFIDENCE = 0.5
+HIGH_CONFIDENCE = 0.7
+
+
+class MealAnalyzer:
+    """Meal composition statistics computed in a single pass over the detections.
+
+    Besides the original fields (item and type counts, food distribution
+    and the low/medium/high confidence summary) ``analyze`` reports a
+    confidence histogram over ``confidence_edges``, the total food area and
+    per-class count, mean confidence and area share.
+    """
+
+    def __init__(self, confidence_edges: Sequence[float] = (0.5, 0.7, 0.9)):
+        self.confidence_edges = sorted(edge for edge in confidence_edges if 0.0 < edge < 1.0)
+        self.histogram_edges = [0.0] + self.confidence_edges + [1.0]
+
+    def analyze(self, detections: List[Dict]) -> Dict:
+        edges = self.confidence_edges
+        histogram = [0] * (len(edges) + 1)
+        high = medium = 0
+        total_area = 0.0
+        # class name -> [count, confidence sum, area sum]
+        per_class: Dict[str, List[float]] = {}
+
+        for detection in detections:
+            confidence = detection['confidence']
+            area = detection['area']
+            name = detection['class_name']
+            histogram[bisect_right(edges, confidence)] += 1
+            if confidence > HIGH_CONFIDENCE:
+                high += 1
+            elif confidence >= LOW_CONFIDENCE:
+                medium += 1
+            total_area += area
+            totals = per_class.get(name)
+            if totals is None:
+                per_class[name] = [1, confidence, area]
+            else:
+                totals[0] += 1
+                totals[1] += confidence
+                totals[2] += area
+
+        return {
+            "total_food_items": len(detections),
+            "unique_food_types": len(per_class),
+            "food_distribution": {name: totals[0] for name, totals in per_class.items()},
+            "confidence_summary": {
+                "high_confidence": high,
+                "medium_confidence": medium,
+                "low_confidence": len(detections) - high - medium
+            },
+            "confidence_histogram": {
+                "edges": self.histogram_edges,
+                "counts": histogram
+            },
+            "total_food_area": total_area,
+            "class_stats": {
+                name: {
+                    "count": count,
+                    "mean_confidence": confidence_sum / count,
+                    "area": area_sum,
+                    "area_fraction": area_sum / total_area if total_area > 0 else 0.0
+                }
+                for name, (count, confidence_sum, area_sum) in per_class.items()
+            }
+        }
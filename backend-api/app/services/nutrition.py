@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ml.inference.preprocessing import read_header
+
+# Columns of the nutrient matrix, per 100 g; sodium in mg, the rest in g except calories (kcal)
+NUTRIENTS = ("calories", "protein_g", "carbs_g", "fat_g", "fiber_g", "sodium_mg")
+
+# Approximate values for the cooked/served item (USDA FoodData Central and typical recipes),
+# followed by the grams of one standard serving
+NUTRITION_TABLE: Dict[str, Tuple[float, ...]] = {
+    # name: (kcal, protein, carbs, fat, fiber, sodium mg, serving g)
+    'baby corn': (26, 2.0, 5.0, 0.2, 2.0, 7, 50),
+    'bean sprout': (30, 3.0, 5.9, 0.2, 1.8, 6, 60),
+    'black glutinous rice': (160, 4.5, 34.0, 1.2, 1.8, 4, 150),
+    'boiled egg': (155, 12.6, 1.1, 10.6, 0.0, 124, 50),
+    'brocoli': (35, 2.4, 7.2, 0.4, 3.3, 41, 80),
+    'cabbage': (23, 1.3, 5.5, 0.1, 1.9, 8, 80),
+    'carrot': (35, 0.8, 8.2, 0.2, 3.0, 58, 60),
+    'chicken breast': (165, 31.0, 0.0, 3.6, 0.0, 74, 120),
+    'chicken leg': (216, 27.0, 0.0, 11.2, 0.0, 90, 110),
+    'corn': (96, 3.4, 21.0, 1.5, 2.4, 1, 90),
+    'cucumber': (15, 0.7, 3.6, 0.1, 0.5, 2, 60),
+    'dark green leaf vegetable': (23, 3.0, 3.8, 0.3, 2.4, 70, 80),
+    'fried chicken': (260, 25.0, 9.0, 14.0, 0.5, 420, 120),
+    'fried egg': (196, 13.6, 0.8, 14.8, 0.0, 207, 46),
+    'fried tofu': (271, 17.0, 10.5, 20.0, 3.9, 16, 80),
+    'green bean': (35, 1.9, 7.9, 0.3, 3.2, 1, 80),
+    'green pepper': (20, 0.9, 4.6, 0.2, 1.7, 3, 60),
+    'oily tofu': (180, 12.0, 6.0, 12.5, 1.5, 300, 80),
+    'okra': (22, 1.9, 4.5, 0.2, 2.5, 6, 60),
+    'pork chop': (231, 25.7, 0.0, 13.5, 0.0, 62, 120),
+    'rice': (130, 2.7, 28.2, 0.3, 0.4, 1, 150),
+    'salmon': (206, 22.0, 0.0, 12.4, 0.0, 61, 120),
+    'sausage': (301, 12.0, 2.0, 27.0, 0.0, 750, 50),
+    'scrambled eggs with tomatoes': (100, 5.5, 4.0, 7.0, 0.6, 230, 150),
+    'shred chicken': (170, 28.0, 1.0, 5.5, 0.0, 350, 100),
+    'shrimp': (99, 24.0, 0.2, 0.3, 0.0, 111, 85),
+    'shrimp roll': (220, 8.0, 24.0, 10.5, 1.2, 420, 60),
+    'stewed pork': (280, 18.0, 5.0, 21.0, 0.2, 600, 120),
+    'sweet potato': (90, 2.0, 20.7, 0.2, 3.3, 36, 130),
+    'tomato': (18, 0.9, 3.9, 0.2, 1.2, 5, 80),
+}
+
+
+def image_area(image_bytes: bytes) -> Optional[float]:
+    """Pixel area of an uploaded image from its header, or None if it cannot be read"""
+    header = read_header(image_bytes)
+    return float(header[0] * header[1]) if header is not None else None
+
+
+class NutritionEstimator:
+    """Calories and macros for detections, computed in one vectorized pass.
+
+    The nutrient matrix has one row per class id of the loaded model (plus a
+    trailing zero row for ids without nutrition data), so a detection's
+    nutrients are a row lookup scaled by its estimated portion. A portion is
+    one standard serving scaled by how much of the photo the box covers
+    relative to ``reference_area_fraction`` (the share a standard serving
+    takes up in a top-down plate photo), clipped to ``portion_range``
+    servings. Without the image size every item counts as one serving.
+    """
+
+    def __init__(self, class_names: Sequence[str], reference_area_fraction: float = 0.08,
+                 portion_range: Sequence[float] = (0.25, 4.0)):
+        self.class_names = list(class_names)
+        self.reference_area_fraction = reference_area_fraction
+        self.min_portion, self.max_portion = portion_range
+
+        rows = [NUTRITION_TABLE.get(name) for name in self.class_names]
+        self.known = np.array([row is not None for row in rows] + [False])
+        table = np.array([row or (0.0,) * (len(NUTRIENTS) + 1) for row in rows]
+                         + [(0.0,) * (len(NUTRIENTS) + 1)], dtype=np.float64)
+        # Nutrients per gram, so a lookup times grams gives the item's nutrients
+        self.nutrients_per_gram = table[:, :len(NUTRIENTS)] / 100.0
+        self.serving_grams = table[:, len(NUTRIENTS)]
+
+    @property
+    def unknown_row(self) -> int:
+        return len(self.class_names)
+
+    def _rows(self, detections: List[Dict]) -> np.ndarray:
+        class_ids = np.fromiter((d['class_id'] for d in detections), dtype=np.int64, count=len(detections))
+        return np.where((class_ids >= 0) & (class_ids < len(self.class_names)), class_ids, self.unknown_row)
+
+    def _grams(self, rows: np.ndarray, areas: np.ndarray, image_areas: np.ndarray) -> np.ndarray:
+        """Estimated grams per item; image_areas of 0 mean the image size is unknown"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            portions = areas / (image_areas * self.reference_area_fraction)
+        portions = np.where(image_areas > 0, np.clip(portions, self.min_portion, self.max_portion), 1.0)
+        return self.serving_grams[rows] * portions
+
+    def estimate(self, detections: List[Dict], image_area: Optional[float] = None) -> Dict:
+        """Nutrition of one plate"""
+        return self.estimate_batch([(detections, image_area)])[0]
+
+    def estimate_image(self, detections: List[Dict], image_bytes: bytes) -> Dict:
+        """Nutrition of one plate, with portions sized against the upload's dimensions"""
+        return self.estimate(detections, image_area(image_bytes))
+
+    def estimate_images(self, plates: Sequence[List[Dict]], images_bytes: Sequence[bytes]) -> List[Dict]:
+        """Nutrition of several plates, each sized against its upload's dimensions"""
+        return self.estimate_batch([(detections, image_area(data)) for detections, data in zip(plates, images_bytes)])
+
+    def estimate_batch(self, plates: Sequence[Tuple[List[Dict], Optional[float]]]) -> List[Dict]:
+        """Nutrition of several plates of (detections, image pixel area) with one pass over all items"""
+        if not plates:
+            return []
+        counts = [len(detections) for detections, _ in plates]
+        detections = [d for plate, _ in plates for d in plate]
+        rows = self._rows(detections)
+        areas = np.fromiter((d['area'] for d in detections), dtype=np.float64, count=len(detections))
+        plate_index = np.repeat(np.arange(len(plates)), counts)
+        image_areas = np.array([area or 0.0 for _, area in plates], dtype=np.float64)[plate_index]
+
+        grams = self._grams(rows, areas, image_areas)
+        # (items, grams + NUTRIENTS), rounded per item so totals add up to what the items show
+        items = np.column_stack([grams, grams[:, None] * self.nutrients_per_gram[rows]]).round(1)
+        unknown = np.bincount(plate_index, weights=~self.known[rows], minlength=len(plates))
+        totals = self._column_sums(plate_index, items, len(plates))
+        # Per-class sums over (plate, class) groups of the whole batch
+        groups, group_index = np.unique(plate_index * len(self.serving_grams) + rows, return_inverse=True)
+        class_sums = self._column_sums(group_index, items, len(groups))
+        group_plates, group_rows = np.divmod(groups, len(self.serving_grams))
+
+        keys = ("grams",) + NUTRIENTS
+        results = [
+            {"totals": dict(zip(keys, plate_totals)), "items": [], "by_class": {}, "unknown_items": int(plate_unknown)}
+            for plate_totals, plate_unknown in zip(totals, unknown.tolist())
+        ]
+        for plate, detection, values in zip(plate_index.tolist(), detections, items.tolist()):
+            results[plate]["items"].append({
+                "class_id": detection['class_id'],
+                "class_name": detection['class_name'],
+                **dict(zip(keys, values))
+            })
+        for plate, row, values in zip(group_plates.tolist(), group_rows.tolist(), class_sums):
+            if row != self.unknown_row:
+                results[plate]["by_class"][self.class_names[row]] = dict(zip(keys, values))
+        return results
+
+    @staticmethod
+    def _column_sums(index: np.ndarray, items: np.ndarray, groups: int) -> List[List[float]]:
+        """Sum item rows into groups with a single bincount over (group, column) cells"""
+        columns = items.shape[1]
+        cells = (index[:, None] * columns + np.arange(columns)).ravel()
+        sums = np.bincount(cells, weights=items.ravel(), minlength=groups * columns)
+        # bincount gives ints when there are no items
+        return sums.reshape(groups, columns).astype(np.float64).round(1).tolist()
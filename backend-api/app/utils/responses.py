@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from app.core.metrics import STAGE_SECONDS
+
+# NumPy arrays and scalars are written directly from their buffers; dict keys
+# such as class ids need not be strings
+DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# MessagePack with the detection list packed into typed little-endian arrays, see pack_detections
+COLUMNAR_MEDIA_TYPE = "application/vnd.healthsphere.columnar+msgpack"
+# Formats of detection responses in server preference order; JSON wins ties and */*
+DETECTION_MEDIA_TYPES = (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE)
+# Registered and legacy names clients send for MessagePack
+MEDIA_TYPE_ALIASES = {"application/x-msgpack": MSGPACK_MEDIA_TYPE, "application/vnd.msgpack": MSGPACK_MEDIA_TYPE}
+
+
+def _default(value: Any) -> Any:
+    """Fallback for values orjson does not handle natively, e.g. non-contiguous array slices"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON"""
+    return orjson.dumps(content, default=_default, option=DUMPS_OPTIONS)
+
+
+def packb(content: Any) -> bytes:
+    """Encode content as MessagePack (str as str, bytes as bin)"""
+    return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-encoded JSONResponse that records serialization time as the "serialize" stage.
+
+    Handlers on hot paths return it directly, which also skips FastAPI's
+    per-value jsonable_encoder pass over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with STAGE_SECONDS.time("serialize"):
+            return dumps(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack counterpart of FastJSONResponse"""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        with STAGE_SECONDS.time("serialize"):
+            return packb(content)
+
+
+def negotiate(accept: Optional[str], offers: Sequence[str]) -> str:
+    """Pick the offer an Accept header prefers, by q-value and then by the order of offers.
+
+    Each offer takes the q-value of the most specific media range matching
+    it. The first offer is returned when the header is missing or accepts
+    none of them, so clients with unusual headers still get the default.
+    """
+    if not accept:
+        return offers[0]
+    # offer -> (specificity of the matching range, q-value)
+    matches: Dict[str, tuple] = {}
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        for offer in offers:
+            if media_type == offer:
+                specificity = 2
+            elif media_type == offer.split("/")[0] + "/*":
+                specificity = 1
+            elif media_type == "*/*":
+                specificity = 0
+            else:
+                continue
+            if offer not in matches or specificity > matches[offer][0]:
+                matches[offer] = (specificity, q)
+
+    best, best_q = offers[0], 0.0
+    for offer in offers:
+        q = matches.get(offer, (0, 0.0))[1]
+        if q > best_q:
+            best, best_q = offer, q
+    return best
+
+
+def pack_detections(detections: List[Dict]) -> Dict:
+    """Columnar form of a detection list for COLUMNAR_MEDIA_TYPE.
+
+    Instead of repeating the keys on every box, each field is one
+    little-endian array (see ``dtypes``): ``class_ids`` uint8 (uint16 for
+    ids above 255), ``confidence`` and ``area`` float32 per box, and
+    ``bbox`` float32 with four values [x1, y1, x2, y2] per box. Class names
+    are sent once, keyed by the class id as a string.
+    """
+    import numpy as np  # Deferred so importing the app does not load numpy
+
+    count = len(detections)
+    class_ids = np.fromiter((d['class_id'] for d in detections), dtype=np.int64, count=count)
+    id_dtype = "<u1" if count == 0 or class_ids.max() < 256 else "<u2"
+    dtypes = {"class_ids": id_dtype, "confidence": "<f4", "bbox": "<f4", "area": "<f4"}
+    return {
+        "layout": "columnar",
+        "count": count,
+        "class_names": {str(d['class_id']): d['class_name'] for d in detections},
+        "dtypes": dtypes,
+        "class_ids": class_ids.astype(id_dtype).tobytes(),
+        "confidence": np.fromiter((d['confidence'] for d in detections), dtype="<f4", count=count).tobytes(),
+        "bbox": np.array([d['bbox'] for d in detections], dtype="<f4").reshape(count, 4).tobytes(),
+        "area": np.fromiter((d['area'] for d in detections), dtype="<f4", count=count).tobytes()
+    }
+
+
+def detection_response(request: Request, content: Dict) -> Response:
+    """Encode a response holding a ``detections`` list in the format the client's Accept header asks for.
+
+    JSON by default; MessagePack keeps the same structure; the columnar
+    format replaces ``detections`` with pack_detections output.
+    """
+    media_type = negotiate(request.headers.get("accept"), DETECTION_MEDIA_TYPES)
+    headers = {"Vary": "Accept"}
+    if media_type == JSON_MEDIA_TYPE:
+        return FastJSONResponse(content=content, headers=headers)
+    if media_type == COLUMNAR_MEDIA_TYPE:
+        with STAGE_SECONDS.time("format"):
+            content = {**content, "detections": pack_detections(content["detections"])}
+    return MsgPackResponse(content=content, media_type=media_type, headers=headers)
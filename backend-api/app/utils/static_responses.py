@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.utils.responses import dumps
+
+
+class PrecomputedResponse:
+    """A JSON payload encoded once and served as pre-encoded bytes with an ETag.
+
+    For metadata that only changes when the model does (class list, model
+    info). Requests pay no dict building or serialization, and a client that
+    sends the current ETag in If-None-Match gets an empty 304.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, max_age: Optional[int] = None):
+        self.content = content
+        self.body = dumps(content)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        max_age = settings.STATIC_RESPONSE_MAX_AGE if max_age is None else max_age
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={max_age}"}
+
+    def not_modified(self, request: Request) -> bool:
+        """Whether If-None-Match already names this payload (weak comparison, as for GET)"""
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == self.etag for tag in header.split(","))
+
+    def response(self, request: Request) -> Response:
+        if self.not_modified(request):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type=self.media_type, headers=self.headers)
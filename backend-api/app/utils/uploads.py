@@ -0,0 +1,289 @@
+import struct
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS
+
+# Magic bytes of the formats OpenCV decodes for us
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"BM", "bmp"),
+]
+
+# JPEG start-of-frame markers carrying the dimensions (C4, C8 and CC are DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Dimensions are looked for in this much of the file; JPEG EXIF/ICC segments come before the frame header
+HEADER_SCAN_BYTES = 512 * 1024
+
+# Room for a multipart part's own headers on top of MAX_FILE_SIZE when counting part sizes in flight
+PART_HEADER_ALLOWANCE = 16 * 1024
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """Image format from the leading magic bytes, or None if unsupported"""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def _jpeg_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            raise ValueError("corrupt JPEG marker")
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            offset += 2
+            continue
+        if marker == 0xDA:
+            raise ValueError("JPEG scan data before frame header")
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + struct.unpack(">H", data[offset + 2:offset + 4])[0]
+    return None
+
+
+def _webp_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    if len(data) < 30:
+        return None
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    raise ValueError("unknown WebP chunk")
+
+
+def sniff_dimensions(image_format: str, data: memoryview) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header, None if more data is needed.
+
+    Raises ValueError when the header is malformed.
+    """
+    if image_format == "jpeg":
+        return _jpeg_size(data)
+    if image_format == "png":
+        if len(data) < 24:
+            return None
+        if bytes(data[12:16]) != b"IHDR":
+            raise ValueError("PNG without IHDR chunk")
+        return struct.unpack(">II", data[16:24])
+    if image_format == "bmp":
+        if len(data) < 26:
+            return None
+        width, height = struct.unpack("<ii", data[18:26])
+        return abs(width), abs(height)
+    if image_format == "webp":
+        return _webp_size(data)
+    return None
+
+
+def _upload_size(file: UploadFile) -> int:
+    """Size of the spooled upload, without reading it"""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
+def _check_dimensions(name: str, image_format: str, data: memoryview,
+                      max_pixels: int) -> Optional[Tuple[int, int]]:
+    """Sniff dimensions and enforce max_pixels, raising 400/413; None if the header is incomplete"""
+    try:
+        dimensions = sniff_dimensions(image_format, data)
+    except (ValueError, struct.error) as e:
+        raise HTTPException(status_code=400, detail=f"{name}: invalid {image_format} header ({e})")
+    if dimensions is not None:
+        width, height = dimensions
+        if width == 0 or height == 0:
+            raise HTTPException(status_code=400, detail=f"{name}: image has no pixels")
+        if width * height > max_pixels:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{name}: {width}x{height} exceeds the {max_pixels} pixel limit"
+            )
+    return dimensions
+
+
+def validate_image(data: bytes, name: str = "image", max_bytes: Optional[int] = None,
+                   max_pixels: Optional[int] = None) -> str:
+    """Apply read_upload's checks to an image already in memory (e.g. a WebSocket frame); returns its format"""
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+    max_pixels = max_pixels or settings.MAX_IMAGE_PIXELS
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"{name}: {len(data)} bytes exceeds the {max_bytes} byte limit")
+    if not data:
+        raise HTTPException(status_code=400, detail=f"{name}: empty file")
+    image_format = sniff_format(bytes(data[:16]))
+    if image_format is None:
+        raise HTTPException(status_code=415, detail=f"{name}: unsupported image format")
+    _check_dimensions(name, image_format, memoryview(data)[:HEADER_SCAN_BYTES], max_pixels)
+    return image_format
+
+
+async def read_upload(file: UploadFile, max_bytes: Optional[int] = None,
+                      max_pixels: Optional[int] = None, chunk_size: Optional[int] = None) -> bytearray:
+    """Timed wrapper around _read_upload (the "upload_read" stage)"""
+    with STAGE_SECONDS.time("upload_read"):
+        return await _read_upload(file, max_bytes, max_pixels, chunk_size)
+
+
+async def _read_upload(file: UploadFile, max_bytes: Optional[int] = None,
+                       max_pixels: Optional[int] = None, chunk_size: Optional[int] = None) -> bytearray:
+    """Read a spooled upload in chunks into one preallocated buffer, validating it before any decoding.
+
+    Starlette spools each multipart part before the endpoint runs; while the
+    body streams in, RequestSizeLimitMiddleware already cuts off any part
+    over MAX_FILE_SIZE (plus header room). Here oversized files are rejected
+    from their exact size (413), the first chunk must carry a supported
+    magic number (415), and dimensions are taken from the header and
+    checked against max_pixels (413 for oversized, 400 for malformed
+    headers). At most one chunk is held besides the buffer itself.
+    """
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+    max_pixels = max_pixels or settings.MAX_IMAGE_PIXELS
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    size = _upload_size(file)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{file.filename}: {size} bytes exceeds the {max_bytes} byte limit"
+        )
+    if size == 0:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: empty file")
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    image_format = None
+    dimensions = None
+    offset = 0
+    await file.seek(0)
+    while offset < size:
+        chunk = await file.read(min(chunk_size, size - offset))
+        if not chunk:
+            break
+        view[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+
+        if image_format is None:
+            image_format = sniff_format(chunk)
+            if image_format is None:
+                raise HTTPException(status_code=415, detail=f"{file.filename}: unsupported image format")
+        if dimensions is None and offset <= HEADER_SCAN_BYTES + chunk_size:
+            dimensions = _check_dimensions(file.filename, image_format, view[:offset], max_pixels)
+
+    if offset != size:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: upload ended early")
+    return buffer
+
+
+class MultipartPartCounter:
+    """Tracks the size of each part of a multipart body as its chunks arrive.
+
+    Part sizes are measured between boundary delimiters, so they include the
+    part's own headers. ``feed`` returns the size of the largest part seen in
+    the chunk, counting the still-open part so far.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.delimiter = b"\r\n--" + boundary
+        self.part_bytes = 0
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> int:
+        data = self._tail + chunk
+        # Bytes of the open part before this data (the tail was already counted)
+        before = self.part_bytes - len(self._tail)
+        largest = 0
+        part_start = 0
+        position = data.find(self.delimiter)
+        while position >= 0:
+            largest = max(largest, before + position - part_start)
+            before = 0
+            part_start = position + len(self.delimiter)
+            position = data.find(self.delimiter, part_start)
+        self.part_bytes = before + len(data) - part_start
+        self._tail = data[-(len(self.delimiter) - 1):]
+        return max(largest, self.part_bytes)
+
+
+def multipart_boundary(headers) -> Optional[bytes]:
+    """Boundary of a multipart request from its raw ASGI headers"""
+    for name, value in headers:
+        if name == b"content-type" and value.lower().startswith(b"multipart/"):
+            for parameter in value.split(b";")[1:]:
+                key, _, boundary = parameter.strip().partition(b"=")
+                if key.lower() == b"boundary" and boundary:
+                    return boundary.strip(b'"')
+    return None
+
+
+class RequestSizeLimitMiddleware:
+    """Reject request bodies over max_body_size under path_prefix as the bytes arrive.
+
+    A declared Content-Length over the limit is answered with 413 before the
+    body is read. Chunked bodies are counted while the multipart parser pulls
+    them, so an oversized upload is never spooled in full. With
+    max_file_size, each part of a multipart body is also counted as it
+    arrives and one larger than max_file_size plus PART_HEADER_ALLOWANCE is
+    cut off without spooling it (read_upload checks the exact file size).
+    """
+
+    def __init__(self, app, max_body_size: int, path_prefix: str = "", max_file_size: Optional[int] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_prefix = path_prefix
+        self.max_file_size = max_file_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the {self.max_body_size} byte limit"
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_size:
+                await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+                return
+
+        received = 0
+        boundary = multipart_boundary(scope["headers"]) if self.max_file_size else None
+        parts = MultipartPartCounter(boundary) if boundary else None
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received > self.max_body_size:
+                    raise HTTPException(status_code=413, detail=detail)
+                if parts is not None and parts.feed(body) > self.max_file_size + PART_HEADER_ALLOWANCE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"A file exceeds the {self.max_file_size} byte limit"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
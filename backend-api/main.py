@@ -1,17 +1,29 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.api.v1.endpoints import ml
 from app.core.config import settings
+from app.core.logging import RequestIdMiddleware, setup_logging
+from datetime import datetime, timezone
 import os
 
+# Configure logging before the routers are imported, so eager model loading is logged too
+setup_logging()
+
+from app.api.v1.endpoints import ml  # noqa: E402
+from app.core.metrics import MetricsMiddleware, registry  # noqa: E402
+from app.utils.responses import FastJSONResponse  # noqa: E402
+from app.utils.static_responses import PrecomputedResponse  # noqa: E402
+from app.utils.uploads import RequestSizeLimitMiddleware  # noqa: E402
+
 # Create FastAPI app instance
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="AI-powered health and nutrition analysis platform with YOLOv8 food detection",
     version=settings.VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware for frontend integration
@@ -21,8 +33,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Reject oversized ML uploads while they stream in, before they are spooled
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_body_size=settings.MAX_REQUEST_SIZE,
+    path_prefix="/api/v1/ml",
+    max_file_size=settings.MAX_FILE_SIZE
+)
+
+# Request counts, latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Correlation ID for every log record of a request (outermost, so all layers see it)
+app.add_middleware(RequestIdMiddleware)
+
 # Mount static files
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -40,7 +67,9 @@ async def root():
         "endpoints": {
             "docs": "/docs",
             "ml_api": "/api/v1/ml",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics",
+            "ready": "/api/v1/ml/ready"
         }
     }
 
@@ -51,29 +80,36 @@ async def health_check():
         "status": "healthy",
         "service": "HealthSphere AI Backend",
         "ml_model": "YOLOv8 Food Detection",
-        "timestamp": "2024-01-01T00:00:00Z"
+        "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
-@app.get("/api-info")
-async def api_info():
-    """Get comprehensive API information"""
-    return {
-        "api_name": "HealthSphere AI Backend",
-        "version": "1.0.0",
-        "description": "AI-powered health and nutrition analysis platform",
-        "features": [
-            "YOLOv8 Food Detection",
-            "Real-time Image Analysis",
-            "Meal Composition Analysis",
-            "RESTful API Interface"
-        ],
-        "ml_capabilities": {
-            "model": "YOLOv8",
-            "task": "Object Detection",
-            "classes": 30,
-            "supported_formats": ["JPG", "PNG", "JPEG"]
-        }
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: per-stage ML latency, request counts, model load time and RSS"""
+    return Response(content=registry.render(), media_type=registry.content_type)
+
+API_INFO = PrecomputedResponse({
+    "api_name": "HealthSphere AI Backend",
+    "version": "1.0.0",
+    "description": "AI-powered health and nutrition analysis platform",
+    "features": [
+        "YOLOv8 Food Detection",
+        "Real-time Image Analysis",
+        "Meal Composition Analysis",
+        "RESTful API Interface"
+    ],
+    "ml_capabilities": {
+        "model": "YOLOv8",
+        "task": "Object Detection",
+        "classes": 30,
+        "supported_formats": ["JPG", "PNG", "JPEG"]
     }
+})
+
+@app.get("/api-info")
+async def api_info(request: Request):
+    """Get comprehensive API information (cacheable: ETag, 304 on If-None-Match)"""
+    return API_INFO.response(request)
 
 if __name__ == "__main__":
     import uvicorn
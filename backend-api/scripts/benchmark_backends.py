@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Inference backend benchmark for HealthSphere AI Food Detection
+Runs the PyTorch, ONNX Runtime and OpenVINO backends on the same images,
+checks their detections against the PyTorch reference and compares latency
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.backends import create_backend
+from app.ml.inference.tracking import box_iou
+
+
+def load_images(image_dir: str, limit: int):
+    """Load real images from a directory, or synthesize some if none are given"""
+    if image_dir:
+        paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        images = [cv2.imread(str(p)) for p in paths[:limit]]
+        return [image for image in images if image is not None]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(limit)]
+
+
+def export_model(pt_path: str, fmt: str) -> str:
+    """Export the .pt weights with ultralytics and return the exported path"""
+    from ultralytics import YOLO
+    return YOLO(pt_path).export(format=fmt, dynamic=(fmt == "onnx"))
+
+
+def match_rate(reference: np.ndarray, candidate: np.ndarray, min_iou: float = 0.9) -> float:
+    """Fraction of reference boxes found by candidate with the same class and IoU >= min_iou"""
+    if len(reference) == 0:
+        return 1.0 if len(candidate) == 0 else 0.0
+    if len(candidate) == 0:
+        return 0.0
+    ious = box_iou(reference, candidate)
+    same_class = reference[:, None, 5] == candidate[None, :, 5]
+    return float(((ious >= min_iou) & same_class).any(axis=1).mean())
+
+
+def benchmark(backend, images, conf, iou, repeats):
+    """Per-image latency (ms) over repeated runs plus the detections from the last run"""
+    backend.predict(images[:1], conf, iou)  # Warm-up
+    timings = []
+    outputs = []
+    for _ in range(repeats):
+        outputs = []
+        for image in images:
+            start = time.perf_counter()
+            outputs.append(backend.predict([image], conf, iou)[0])
+            timings.append((time.perf_counter() - start) * 1000)
+    return np.asarray(timings), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends")
+    parser.add_argument("--pt", default="app/ml/models/best.pt", help="PyTorch weights (reference)")
+    parser.add_argument("--onnx", default=None, help="ONNX model path")
+    parser.add_argument("--openvino", default=None, help="OpenVINO model directory")
+    parser.add_argument("--export", action="store_true", help="Export missing ONNX/OpenVINO models from --pt")
+    parser.add_argument("--images", default=None, help="Directory of test images")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = runtime default)")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.export:
+        args.onnx = args.onnx or export_model(args.pt, "onnx")
+        args.openvino = args.openvino or export_model(args.pt, "openvino")
+
+    images = load_images(args.images, args.limit)
+    print(f"Benchmarking on {len(images)} images\n")
+
+    candidates = [("pytorch", args.pt), ("onnxruntime", args.onnx), ("openvino", args.openvino)]
+    reference = None
+    print(f"{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'detections':>11} {'match':>7}")
+    for name, path in candidates:
+        if not path:
+            continue
+        try:
+            backend = create_backend(path, name, intra_op_threads=args.threads)
+        except ImportError as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        timings, outputs = benchmark(backend, images, args.conf, args.iou, args.repeats)
+        if reference is None:
+            reference = outputs
+        match = np.mean([match_rate(ref, out) for ref, out in zip(reference, outputs)])
+        print(f"{name:<12} {np.percentile(timings, 50):>8.2f} {np.percentile(timings, 95):>8.2f} "
+              f"{timings.mean():>8.2f} {sum(len(o) for o in outputs):>11} {match:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
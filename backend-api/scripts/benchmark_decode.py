@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Decode path benchmark for HealthSphere AI Food Detection
+Compares the legacy PIL -> temp JPEG -> cv2.imread round trip against the
+in-memory cv2.imdecode path
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.food_detector import FoodDetector
+
+IMAGE_SIZES = [(640, 480), (1280, 960), (1920, 1440), (4032, 3024)]
+
+
+def make_sample_jpeg(width: int, height: int, quality: int = 90) -> bytes:
+    """Build a photo-like JPEG (smooth gradients plus sensor noise)"""
+    rng = np.random.default_rng(width * height)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    base = (xs[None, :] + ys[:, None]) / 2
+    image = np.stack([base, np.flipud(base), np.fliplr(base)], axis=-1)
+    image += rng.normal(0, 12, image.shape).astype(np.float32)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Failed to encode sample image")
+    return encoded.tobytes()
+
+
+def legacy_decode(image_bytes: bytes, temp_path: str) -> np.ndarray:
+    """Previous detect_from_bytes behaviour: PIL decode, JPEG re-encode to disk, read back"""
+    image = Image.open(io.BytesIO(image_bytes))
+    image.save(temp_path)
+    try:
+        return cv2.imread(temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def in_memory_decode(image_bytes: bytes) -> np.ndarray:
+    """Full-size cv2.imdecode straight from the upload buffer, without copying it"""
+    buffer = np.frombuffer(memoryview(image_bytes), dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+
+
+def time_call(fn, repeats: int) -> float:
+    """Return the median wall-clock time of fn() in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run_benchmark(repeats: int):
+    """Time both decode paths for every sample size"""
+    print(f"{'size':>11} {'bytes':>10} {'legacy ms':>10} {'in-memory ms':>13} {'saved ms':>9} {'max diff':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        temp_path = os.path.join(tmp_dir, "temp_image.jpg")
+        for width, height in IMAGE_SIZES:
+            image_bytes = make_sample_jpeg(width, height)
+
+            legacy_ms = time_call(lambda: legacy_decode(image_bytes, temp_path), repeats)
+            direct_ms = time_call(lambda: in_memory_decode(image_bytes), repeats)
+
+            # The legacy path re-encodes the JPEG, so pixels drift slightly
+            legacy = legacy_decode(image_bytes, temp_path)
+            direct = in_memory_decode(image_bytes)
+            max_diff = int(np.abs(legacy.astype(np.int16) - direct.astype(np.int16)).max())
+
+            print(f"{width:>5}x{height:<5} {len(image_bytes):>10} {legacy_ms:>10.2f} "
+                  f"{direct_ms:>13.2f} {legacy_ms - direct_ms:>9.2f} {max_diff:>9}")
+
+
+def compare_detections(model_path: str, image_paths):
+    """Check that both paths produce the same detections on real photos"""
+    detector = FoodDetector(model_path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        temp_path = os.path.join(tmp_dir, "temp_image.jpg")
+        for image_path in image_paths:
+            image_bytes = Path(image_path).read_bytes()
+            legacy = detector.detect_food_items(legacy_decode(image_bytes, temp_path))
+            direct = detector.detect_from_bytes(image_bytes)
+            legacy_classes = sorted(d['class_name'] for d in legacy)
+            direct_classes = sorted(d['class_name'] for d in direct)
+            status = "match" if legacy_classes == direct_classes else "DIFF"
+            print(f"{status}: {image_path} legacy={legacy_classes} in-memory={direct_classes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image decode paths")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs per image size")
+    parser.add_argument("--model", default=None, help="Optional model path for detection parity check")
+    parser.add_argument("images", nargs="*", help="Real images to use for the parity check")
+    args = parser.parse_args()
+
+    run_benchmark(args.repeats)
+    if args.model and args.images:
+        print("\nDetection parity")
+        compare_detections(args.model, args.images)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Load test and latency benchmark for HealthSphere AI Food Detection
+Drives the API with a weighted mix of endpoints (/detect-food, /analyze-meal,
+/food-classes) and a distribution of image sizes, either closed-loop at fixed
+concurrency levels or open-loop at fixed Poisson arrival rates, and reports
+p50/p95/p99 latency, throughput and errors per run as JSON.
+
+By default a local uvicorn server is started with the stub model backend
+(MODEL_BACKEND=stub), which exercises decoding, batching, caching and
+serialization with a simulated forward pass; pass --model to load real
+weights or --url to test a running server. Save the JSON with --output and
+compare a later run against it with --compare to catch regressions between
+commits.
+
+Examples:
+    python scripts/benchmark_load.py --concurrency 1,4,16 --duration 20 --output before.json
+    python scripts/benchmark_load.py --rates 5,10,20 --mix detect-food=1 --sizes 4032=1
+    python scripts/benchmark_load.py --concurrency 8 --compare before.json --max-regression 10
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = {
+    "detect-food": ("POST", "/api/v1/ml/detect-food"),
+    "analyze-meal": ("POST", "/api/v1/ml/analyze-meal"),
+    "food-classes": ("GET", "/api/v1/ml/food-classes"),
+}
+
+# (endpoint, image size or None, status code or error name, latency ms, response bytes)
+Sample = Tuple[str, Optional[int], str, float, int]
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """"a=3,b=1" -> {"a": 3.0, "b": 1.0}"""
+    weights = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def parse_levels(text: Optional[str], kind=int) -> List:
+    return [kind(level) for level in text.split(",")] if text else []
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))]
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    values = sorted(latencies)
+    return {
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0
+    }
+
+
+def synthetic_jpeg(long_side: int, seed: int) -> bytes:
+    """A 4:3 JPEG with smooth random content, so file sizes resemble photos"""
+    rng = np.random.default_rng(seed)
+    width, height = long_side, long_side * 3 // 4
+    coarse = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 6, image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise RuntimeError(f"Could not encode a {width}x{height} test image")
+    return encoded.tobytes()
+
+
+def build_images(sizes: Dict[str, float], per_size: int, image_dir: Optional[str]) -> Dict[int, List[bytes]]:
+    """Images to upload, keyed by long side; from image_dir if given (bucketed by nearest size)"""
+    targets = [int(size) for size in sizes]
+    images: Dict[int, List[bytes]] = {size: [] for size in targets}
+    if image_dir:
+        for path in sorted(Path(image_dir).iterdir()):
+            if path.suffix.lower() not in (".jpg", ".jpeg", ".png", ".webp"):
+                continue
+            data = path.read_bytes()
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            long_side = max(image.shape[:2])
+            images[min(targets, key=lambda size: abs(size - long_side))].append(data)
+        missing = [size for size, bucket in images.items() if not bucket]
+        if missing:
+            raise SystemExit(f"No images in {image_dir} close to sizes {missing}")
+        return images
+    for size in targets:
+        images[size] = [synthetic_jpeg(size, seed=size * 1000 + i) for i in range(per_size)]
+    return images
+
+
+class Workload:
+    """Draws requests from the endpoint mix and image size distribution"""
+
+    def __init__(self, base_url: str, mix: Dict[str, float], sizes: Dict[str, float],
+                 images: Dict[int, List[bytes]], timeout: float, seed: int = 0):
+        unknown = set(mix) - set(ENDPOINTS)
+        if unknown:
+            raise SystemExit(f"Unknown endpoints {sorted(unknown)}, expected some of {sorted(ENDPOINTS)}")
+        self.base_url = base_url.rstrip("/")
+        self.endpoints = list(mix)
+        self.endpoint_weights = list(mix.values())
+        self.sizes = [int(size) for size in sizes]
+        self.size_weights = list(sizes.values())
+        self.images = images
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def next_request(self) -> Tuple[str, Optional[int], Optional[bytes]]:
+        with self._random_lock:
+            endpoint = self._random.choices(self.endpoints, self.endpoint_weights)[0]
+            if ENDPOINTS[endpoint][0] == "GET":
+                return endpoint, None, None
+            size = self._random.choices(self.sizes, self.size_weights)[0]
+            return endpoint, size, self._random.choice(self.images[size])
+
+    def send(self, endpoint: str, image: Optional[bytes], started: Optional[float] = None):
+        """Send one request; returns (status, latency ms, response bytes).
+
+        ``started`` lets open-loop runs count the time a request waited for
+        a free client thread, so a slow server cannot hide latency by
+        delaying the sender (coordinated omission).
+        """
+        method, path = ENDPOINTS[endpoint]
+        started = time.perf_counter() if started is None else started
+        try:
+            if method == "GET":
+                response = self._session().get(self.base_url + path, timeout=self.timeout)
+            else:
+                response = self._session().post(
+                    self.base_url + path, files={"file": ("image.jpg", image, "image/jpeg")}, timeout=self.timeout
+                )
+            status, size = str(response.status_code), len(response.content)
+        except requests.RequestException as e:
+            status, size = type(e).__name__, 0
+        return status, (time.perf_counter() - started) * 1000, size
+
+
+def run_closed_loop(workload: Workload, concurrency: int, duration: float) -> Tuple[List[Sample], float]:
+    """``concurrency`` clients each sending their next request as soon as the last one returns"""
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local = []
+        while time.perf_counter() < deadline:
+            endpoint, size, image = workload.next_request()
+            status, latency_ms, response_bytes = workload.send(endpoint, image)
+            local.append((endpoint, size, status, latency_ms, response_bytes))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def run_open_loop(workload: Workload, rate: float, duration: float,
+                  max_in_flight: int, seed: int = 0) -> Tuple[List[Sample], float]:
+    """Poisson arrivals at ``rate`` requests per second, whether or not earlier requests finished"""
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    arrivals = random.Random(seed)
+
+    def fire(endpoint: str, size: Optional[int], image: Optional[bytes], scheduled: float):
+        status, latency_ms, response_bytes = workload.send(endpoint, image, started=scheduled)
+        with lock:
+            samples.append((endpoint, size, status, latency_ms, response_bytes))
+
+    started = time.perf_counter()
+    next_arrival = started
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            next_arrival += arrivals.expovariate(rate)
+            if next_arrival - started >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, *workload.next_request(), next_arrival)
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict:
+    """Latency percentiles, throughput and errors, overall and per endpoint and image size"""
+    def group(selected: List[Sample]) -> Dict:
+        ok = [s for s in selected if s[2].startswith("2")]
+        status_codes: Dict[str, int] = {}
+        for sample in selected:
+            status_codes[sample[2]] = status_codes.get(sample[2], 0) + 1
+        return {
+            "requests": len(selected),
+            "errors": len(selected) - len(ok),
+            "throughput_rps": len(ok) / elapsed if elapsed > 0 else 0.0,
+            "mean_response_bytes": sum(s[4] for s in ok) / len(ok) if ok else 0.0,
+            "status_codes": status_codes,
+            "latency_ms": latency_summary([s[3] for s in ok])
+        }
+
+    summary = group(samples)
+    summary["elapsed_seconds"] = elapsed
+    summary["error_rate"] = summary["errors"] / summary["requests"] if summary["requests"] else 0.0
+    summary["endpoints"] = {
+        endpoint: group([s for s in samples if s[0] == endpoint])
+        for endpoint in sorted({s[0] for s in samples})
+    }
+    summary["image_sizes"] = {
+        str(size): group([s for s in samples if s[1] == size])
+        for size in sorted({s[1] for s in samples if s[1] is not None})
+    }
+    return summary
+
+
+def run_key(run: Dict) -> str:
+    return f"{run['mode']}={run['level']}"
+
+
+def compare(results: Dict, baseline_path: str, max_regression: Optional[float]) -> bool:
+    """Print p50/p99/throughput changes against a baseline file; False if a limit is exceeded"""
+    with open(baseline_path) as f:
+        baseline = {run_key(run): run for run in json.load(f)["runs"]}
+
+    print(f"\nCompared with {baseline_path}", file=sys.stderr)
+    print(f"{'run':<16} {'p50 ms':>16} {'p99 ms':>16} {'throughput rps':>22} {'errors':>10}", file=sys.stderr)
+    within_limits = True
+    for run in results["runs"]:
+        before = baseline.get(run_key(run))
+        if before is None:
+            print(f"{run_key(run):<16} (not in baseline)", file=sys.stderr)
+            continue
+        changes = {}
+        cells = []
+        for metric, now, then in (
+            ("p50", run["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            ("p99", run["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            ("throughput", run["throughput_rps"], before["throughput_rps"]),
+        ):
+            change = (now - then) / then * 100 if then else 0.0
+            changes[metric] = change
+            cells.append(f"{now:.1f} ({change:+.0f}%)")
+        print(f"{run_key(run):<16} {cells[0]:>16} {cells[1]:>16} {cells[2]:>22} "
+              f"{before['errors']:>4} -> {run['errors']:<4}", file=sys.stderr)
+        if max_regression is not None and (
+            changes["p50"] > max_regression or changes["p99"] > max_regression
+            or -changes["throughput"] > max_regression or run["errors"] > before["errors"]
+        ):
+            within_limits = False
+    return within_limits
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, server: subprocess.Popen, timeout: float):
+    """Poll url until it answers 200"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} did not answer within {timeout}s")
+
+
+def start_server(args, server_env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {**os.environ, **server_env}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.server_logs else subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(f"{base_url}/api/v1/ml/ready", server, args.startup_timeout)
+    except Exception:
+        server.terminate()
+        raise
+    return server, base_url
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the food detection API")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--model", help="Serve real weights from this path instead of the stub backend")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra setting for the started server, e.g. --env BATCH_WINDOW_MS=5")
+    parser.add_argument("--stub-forward-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", help="Closed-loop concurrency levels, e.g. 1,4,16")
+    parser.add_argument("--rates", help="Open-loop arrival rates in requests/s, e.g. 5,10,20")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per run")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unrecorded seconds at concurrency 2 first")
+    parser.add_argument("--mix", default="detect-food=6,analyze-meal=3,food-classes=1",
+                        help="Endpoint weights")
+    parser.add_argument("--sizes", default="640=3,1280=3,4032=2", help="Image long-side weights")
+    parser.add_argument("--images-per-size", type=int, default=16,
+                        help="Distinct images per size; fewer means more detection cache hits")
+    parser.add_argument("--image-dir", help="Upload these images (bucketed by size) instead of synthetic ones")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Client threads for open-loop runs")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="With --compare, exit 1 if p50/p99 or throughput is this many percent worse")
+    parser.add_argument("--server-logs", action="store_true", help="Show the started server's stderr")
+    args = parser.parse_args()
+
+    concurrency_levels = parse_levels(args.concurrency)
+    rates = parse_levels(args.rates, float)
+    if not concurrency_levels and not rates:
+        concurrency_levels = [1, 4, 16]
+
+    mix = parse_weights(args.mix)
+    sizes = parse_weights(args.sizes)
+    images = build_images(sizes, args.images_per_size, args.image_dir)
+
+    server_env: Dict[str, str] = {}
+    if not args.url:
+        if args.model:
+            server_env["MODEL_PATH"] = args.model
+        else:
+            server_env.update(MODEL_BACKEND="stub", STUB_FORWARD_MS=str(args.stub_forward_ms))
+        for item in args.env:
+            name, _, value = item.partition("=")
+            server_env[name] = value
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        print("Starting server...", file=sys.stderr)
+        server, base_url = start_server(args, server_env)
+
+    try:
+        workload = Workload(base_url, mix, sizes, images, args.timeout, seed=args.seed)
+        if args.warmup > 0:
+            run_closed_loop(workload, 2, args.warmup)
+
+        runs = []
+        plan = [("concurrency", level) for level in concurrency_levels] + [("rate", rate) for rate in rates]
+        for mode, level in plan:
+            print(f"Running {mode}={level} for {args.duration:.0f}s...", file=sys.stderr)
+            if mode == "concurrency":
+                samples, elapsed = run_closed_loop(workload, level, args.duration)
+            else:
+                samples, elapsed = run_open_loop(workload, level, args.duration, args.max_in_flight, args.seed)
+            run = {"mode": mode, "level": level, **summarize(samples, elapsed)}
+            runs.append(run)
+            print(f"  {run['throughput_rps']:.1f} req/s, p50 {run['latency_ms']['p50']:.1f} ms, "
+                  f"p95 {run['latency_ms']['p95']:.1f} ms, p99 {run['latency_ms']['p99']:.1f} ms, "
+                  f"{run['errors']} errors", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "target": args.url or "local",
+        "server_env": server_env,
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "duration_seconds": args.duration,
+            "mix": mix,
+            "sizes": sizes,
+            "images_per_size": args.images_per_size,
+            "image_dir": args.image_dir,
+            "image_bytes": {str(size): sum(map(len, data)) / len(data) for size, data in images.items()},
+        },
+        "runs": runs
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        print(f"Regression beyond {args.max_regression}% against {args.compare}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
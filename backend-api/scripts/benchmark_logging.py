@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Logging overhead benchmark for HealthSphere AI Food Detection
+Measures the time the request path spends logging one detection request:
+the original print() calls of detect_from_bytes/detect_food_items, the same
+lines through a synchronous logging.StreamHandler, and the queue-based
+sampled logging of app.core.logging at INFO and DEBUG level. Output goes to
+an unbuffered pipe drained by a reader thread, as stdout does in the
+container (PYTHONUNBUFFERED=1); --reader-delay-ms simulates a slow log
+collector that lets the pipe fill up.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.logging import SampledLogger, get_sampled_logger, setup_logging, stop_logging
+
+CLASS_NAMES = ['rice', 'fried egg', 'tomato', 'cucumber', 'chicken breast', 'broccoli', 'carrot', 'salmon']
+
+
+def open_pipe(reader_delay_ms: float):
+    """Unbuffered text stream into a pipe, drained by a background thread"""
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        while os.read(read_fd, 65536):
+            if reader_delay_ms:
+                time.sleep(reader_delay_ms / 1000)
+        os.close(read_fd)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    stream = io.TextIOWrapper(io.FileIO(write_fd, "w"), write_through=True)
+    return stream, reader
+
+
+def print_request(detections):
+    """The print() calls one request made before structured logging"""
+    print("Starting detection from 182734 bytes of image data")
+    print("Image decoded successfully: 1008x756 (original 4032x3024)")
+    print("Running YOLOv8 detection (pytorch backend)...")
+    print(f"Detected {len(detections)} items: {[d['class_name'] for d in detections]}")
+    print(f"Detection completed. Found {len(detections)} items")
+
+
+def logging_request(logger, sampled_logger, detections):
+    """The log calls one request makes now (see FoodDetector.detect_from_bytes)"""
+    logger.debug("Starting detection from %d bytes of image data", 182734)
+    logger.debug("Image decoded: %dx%d (original %dx%d), running %s backend", 1008, 756, 4032, 3024, "pytorch")
+    sampled_logger.info("Detected %d items", len(detections), extra={"items": len(detections)})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detected classes: %s", [d['class_name'] for d in detections])
+
+
+def measure(fn, requests: int):
+    """Per-request caller-side times in microseconds"""
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return sorted(times)
+
+
+def report(name: str, times):
+    mean = sum(times) / len(times)
+    p50 = times[len(times) // 2]
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"{name:<34} {mean:>9.2f} {p50:>9.2f} {p99:>9.2f} {times[-1]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request-path logging overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--detections", type=int, default=8, help="Detected items per request")
+    parser.add_argument("--sample-every", type=int, default=100, help="LOG_SAMPLE_EVERY for the sampled runs")
+    parser.add_argument("--reader-delay-ms", type=float, default=0.0,
+                        help="Pause after each read of the log pipe (slow collector)")
+    parser.add_argument("--format", choices=["json", "text"], default="json")
+    args = parser.parse_args()
+
+    detections = [{'class_name': CLASS_NAMES[i % len(CLASS_NAMES)]} for i in range(args.detections)]
+    logger = logging.getLogger("benchmark.food_detector")
+
+    print(f"\n{args.requests} requests, {args.detections} detections each, "
+          f"reader delay {args.reader_delay_ms} ms")
+    print(f"\n{'per request (us)':<34} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>10}")
+
+    stream, reader = open_pipe(args.reader_delay_ms)
+    with contextlib.redirect_stdout(stream):
+        times = measure(lambda: print_request(detections), args.requests)
+    report("print() (before)", times)
+
+    root = logging.getLogger()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    unsampled = SampledLogger(logger, every=1)
+    times = measure(lambda: logging_request(logger, unsampled, detections), args.requests)
+    report("sync StreamHandler, INFO", times)
+
+    for level, sample_every in (("INFO", 1), ("INFO", args.sample_every), ("DEBUG", 1)):
+        setup_logging(level=level, log_format=args.format, stream=stream, sample_every=sample_every)
+        sampled = get_sampled_logger(logger.name)
+        times = measure(lambda: logging_request(logger, sampled, detections), args.requests)
+        stop_logging()
+        report(f"queue, {level}, 1 in {sample_every}", times)
+
+    stream.close()
+    reader.join()
+
+
+if __name__ == "__main__":
+    main()
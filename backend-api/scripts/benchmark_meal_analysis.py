@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Meal analysis micro-benchmark for HealthSphere AI Food Detection
+Times the original multi-pass meal composition code of /analyze-meal
+against the single-pass MealAnalyzer for 1 to 100000 synthetic detections,
+and checks that the fields both produce agree. The analyzer also builds
+the confidence histogram, total area and per-class statistics, which the
+original code did not compute
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.meal_analyzer import MealAnalyzer
+
+DETECTION_COUNTS = [1, 10, 100, 1000, 10000, 100000]
+
+CLASS_NAMES = [
+    'baby corn', 'bean sprout', 'black glutinous rice', 'boiled egg', 'brocoli',
+    'cabbage', 'carrot', 'chicken breast', 'chicken leg', 'corn', 'cucumber',
+    'dark green leaf vegetable', 'fried chicken', 'fried egg', 'fried tofu',
+    'green bean', 'green pepper', 'oily tofu', 'okra', 'pork chop', 'rice',
+    'salmon', 'sausage', 'scrambled eggs with tomatoes', 'shred chicken',
+    'shrimp', 'shrimp roll', 'stewed pork', 'sweet potato', 'tomato'
+]
+
+
+def synthetic_detections(count: int):
+    rng = random.Random(count)
+    return [
+        {
+            'class_id': class_id,
+            'class_name': CLASS_NAMES[class_id],
+            'confidence': rng.uniform(0.25, 1.0),
+            'bbox': [0.0, 0.0, 10.0, 10.0],
+            'area': rng.uniform(100.0, 40000.0)
+        }
+        for class_id in (rng.randrange(len(CLASS_NAMES)) for _ in range(count))
+    ]
+
+
+def legacy_analysis(detections):
+    """The original analyze_complete_meal aggregation"""
+    meal_analysis = {
+        "total_food_items": len(detections),
+        "unique_food_types": len(set(det['class_name'] for det in detections)),
+        "food_distribution": {},
+        "confidence_summary": {
+            "high_confidence": len([d for d in detections if d['confidence'] > 0.7]),
+            "medium_confidence": len([d for d in detections if 0.5 <= d['confidence'] <= 0.7]),
+            "low_confidence": len([d for d in detections if d['confidence'] < 0.5])
+        }
+    }
+    for detection in detections:
+        food_type = detection['class_name']
+        if food_type in meal_analysis['food_distribution']:
+            meal_analysis['food_distribution'][food_type] += 1
+        else:
+            meal_analysis['food_distribution'][food_type] = 1
+    return meal_analysis
+
+
+def time_us(fn, repeats: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark meal composition analysis")
+    parser.add_argument("--budget", type=float, default=0.5, help="Approximate seconds per measurement")
+    args = parser.parse_args()
+
+    analyzer = MealAnalyzer()
+    print(f"\n{'detections':>10} {'legacy us':>12} {'analyzer us':>12} {'speedup':>8}")
+    for count in DETECTION_COUNTS:
+        detections = synthetic_detections(count)
+        legacy = legacy_analysis(detections)
+        analysis = analyzer.analyze(detections)
+        for key, value in legacy.items():
+            assert analysis[key] == value, f"{key} differs for {count} detections"
+
+        repeats = max(1, int(args.budget * 1e6 / max(1.0, time_us(lambda: legacy_analysis(detections), 1))))
+        legacy_us = time_us(lambda: legacy_analysis(detections), repeats)
+        analyzer_us = time_us(lambda: analyzer.analyze(detections), repeats)
+        print(f"{count:>10} {legacy_us:>12.1f} {analyzer_us:>12.1f} {legacy_us / analyzer_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
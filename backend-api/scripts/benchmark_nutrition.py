@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Nutrition estimation benchmark for HealthSphere AI Food Detection
+Times NutritionEstimator against a per-item Python loop over the same
+nutrition table, for single plates of 5 to 1000 detections and for
+batches of plates estimated one by one or with one estimate_batch pass,
+and checks that the plate totals agree.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.nutrition import NUTRIENTS, NUTRITION_TABLE, NutritionEstimator
+
+PLATE_SIZES = [5, 50, 200, 500, 1000]
+BATCH_SIZES = [1, 16, 64]
+BATCH_PLATE_SIZE = 20
+IMAGE_AREA = 4032.0 * 3024.0
+
+CLASS_NAMES = list(NUTRITION_TABLE)
+
+
+def synthetic_detections(count: int, seed: int = 0):
+    rng = random.Random(seed * 100003 + count)
+    return [
+        {
+            'class_id': class_id,
+            'class_name': CLASS_NAMES[class_id],
+            'area': rng.uniform(0.005, 0.3) * IMAGE_AREA
+        }
+        for class_id in (rng.randrange(len(CLASS_NAMES)) for _ in range(count))
+    ]
+
+
+def loop_estimate(detections, image_area, reference_area_fraction=0.08, portion_range=(0.25, 4.0)):
+    """The same estimate written as a per-detection loop over the table"""
+    keys = ("grams",) + NUTRIENTS
+    totals = dict.fromkeys(keys, 0.0)
+    by_class = {}
+    items = []
+    for detection in detections:
+        row = NUTRITION_TABLE.get(detection['class_name'])
+        if row is None:
+            continue
+        portion = min(max(detection['area'] / (image_area * reference_area_fraction), portion_range[0]),
+                      portion_range[1])
+        grams = row[-1] * portion
+        item = {"class_name": detection['class_name'], "grams": round(grams, 1)}
+        for name, per_100g in zip(NUTRIENTS, row):
+            item[name] = round(grams * per_100g / 100, 1)
+        items.append(item)
+        class_totals = by_class.setdefault(detection['class_name'], dict.fromkeys(keys, 0.0))
+        for key in keys:
+            totals[key] += item[key]
+            class_totals[key] += item[key]
+    return {"totals": totals, "items": items, "by_class": by_class}
+
+
+def time_us(fn, repeats: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def repeats_for(fn, budget: float) -> int:
+    return max(1, int(budget * 1e6 / max(1.0, time_us(fn, 1))))
+
+
+def check(expected, actual, label: str):
+    for key, value in expected["totals"].items():
+        assert abs(actual["totals"][key] - value) < 0.5, f"{key} differs for {label}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized nutrition estimation")
+    parser.add_argument("--budget", type=float, default=0.5, help="Approximate seconds per measurement")
+    args = parser.parse_args()
+
+    estimator = NutritionEstimator(CLASS_NAMES)
+
+    print(f"\nOne plate\n{'detections':>10} {'loop us':>12} {'vectorized us':>14} {'speedup':>8}")
+    for count in PLATE_SIZES:
+        detections = synthetic_detections(count)
+        check(loop_estimate(detections, IMAGE_AREA), estimator.estimate(detections, IMAGE_AREA), f"{count} items")
+
+        repeats = repeats_for(lambda: loop_estimate(detections, IMAGE_AREA), args.budget)
+        loop_us = time_us(lambda: loop_estimate(detections, IMAGE_AREA), repeats)
+        vector_us = time_us(lambda: estimator.estimate(detections, IMAGE_AREA), repeats)
+        print(f"{count:>10} {loop_us:>12.1f} {vector_us:>14.1f} {loop_us / vector_us:>7.2f}x")
+
+    print(f"\nBatches of {BATCH_PLATE_SIZE}-item plates")
+    print(f"{'images':>10} {'loop us':>12} {'per plate us':>14} {'batch us':>10} {'speedup':>8}")
+    for batch_size in BATCH_SIZES:
+        plates = [(synthetic_detections(BATCH_PLATE_SIZE, seed), IMAGE_AREA) for seed in range(batch_size)]
+        for (detections, area), result in zip(plates, estimator.estimate_batch(plates)):
+            check(loop_estimate(detections, area), result, f"a batch of {batch_size}")
+
+        def loop():
+            return [loop_estimate(detections, area) for detections, area in plates]
+
+        def per_plate():
+            return [estimator.estimate(detections, area) for detections, area in plates]
+
+        repeats = repeats_for(loop, args.budget)
+        loop_us = time_us(loop, repeats)
+        per_plate_us = time_us(per_plate, repeats)
+        batch_us = time_us(lambda: estimator.estimate_batch(plates), repeats)
+        print(f"{batch_size:>10} {loop_us:>12.1f} {per_plate_us:>14.1f} {batch_us:>10.1f} "
+              f"{loop_us / batch_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
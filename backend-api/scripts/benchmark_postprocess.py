@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Post-processing micro-benchmark for HealthSphere AI Food Detection
+Times the conversion of raw detections into response dicts for synthetic
+results with 1-300 boxes: the original per-box loop over ultralytics Boxes,
+a per-row numpy loop, and the vectorized FoodDetector._to_detections
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.food_detector import FoodDetector
+
+BOX_COUNTS = [1, 10, 50, 100, 300]
+
+
+def synthetic_boxes(count: int, num_classes: int = 30) -> np.ndarray:
+    """Random (N, 6) detections [x1, y1, x2, y2, conf, class_id] on a 640x480 image"""
+    rng = np.random.default_rng(count)
+    top_left = rng.uniform(0, 500, (count, 2))
+    size = rng.uniform(10, 140, (count, 2))
+    boxes = np.concatenate([
+        top_left, top_left + size,
+        rng.uniform(0.25, 1.0, (count, 1)),
+        rng.integers(0, num_classes, (count, 1))
+    ], axis=1)
+    return boxes.astype(np.float32)
+
+
+def legacy_loop(class_names, results):
+    """The original detect_food_items loop: three .cpu().numpy() calls per box"""
+    detections = []
+    for result in results:
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            confidence = float(box.conf[0].cpu().numpy())
+            class_id = int(box.cls[0].cpu().numpy())
+            class_name = class_names[class_id] if class_id < len(class_names) else f"class_{class_id}"
+            detections.append({
+                'class_id': class_id,
+                'class_name': class_name,
+                'confidence': confidence,
+                'bbox': [float(x1), float(y1), float(x2), float(y2)],
+                'area': float((x2 - x1) * (y2 - y1))
+            })
+    return detections
+
+
+def row_loop(class_names, boxes):
+    """Per-row loop over an already transferred numpy array"""
+    detections = []
+    for x1, y1, x2, y2, confidence, class_id in boxes:
+        class_id = int(class_id)
+        class_name = class_names[class_id] if class_id < len(class_names) else f"class_{class_id}"
+        detections.append({
+            'class_id': class_id,
+            'class_name': class_name,
+            'confidence': float(confidence),
+            'bbox': [float(x1), float(y1), float(x2), float(y2)],
+            'area': float((x2 - x1) * (y2 - y1))
+        })
+    return detections
+
+
+def make_ultralytics_results(boxes: np.ndarray):
+    """Wrap boxes in ultralytics Boxes objects, or None when ultralytics/torch are missing"""
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+    except ImportError:
+        return None
+
+    class Result:
+        pass
+
+    result = Result()
+    result.boxes = Boxes(torch.from_numpy(boxes), (480, 640))
+    return [result]
+
+
+def time_us(fn, repeats: int) -> float:
+    """Median wall-clock time of fn() in microseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection post-processing")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    detector = FoodDetector(load_model=False)
+    names = detector.class_names
+
+    print(f"\n{'boxes':>6} {'legacy us':>10} {'row loop us':>12} {'vectorized us':>14} {'speedup':>8}")
+    for count in BOX_COUNTS:
+        boxes = synthetic_boxes(count)
+        vectorized = detector._to_detections(boxes)
+        assert vectorized == row_loop(names, boxes), "vectorized output differs from row loop"
+
+        results = make_ultralytics_results(boxes)
+        legacy_us = time_us(lambda: legacy_loop(names, results), args.repeats) if results else float("nan")
+        row_us = time_us(lambda: row_loop(names, boxes), args.repeats)
+        vector_us = time_us(lambda: detector._to_detections(boxes), args.repeats)
+        baseline = legacy_us if results else row_us
+        print(f"{count:>6} {legacy_us:>10.1f} {row_us:>12.1f} {vector_us:>14.1f} {baseline / vector_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Preprocessing benchmark for HealthSphere AI Food Detection
+Compares the full-size decode + letterbox path against reduced-size JPEG
+decoding (decode_for_inference) on phone-sized photos: decode time, total
+preprocessing time and the peak memory each request adds
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.backends import preprocess_images
+from app.ml.inference.food_detector import FoodDetector
+from app.ml.inference.preprocessing import decode_for_inference
+
+IMAGE_SIZES = [(1280, 960), (1920, 1440), (4032, 3024), (4000, 6000)]
+INPUT_SIZE = (640, 640)
+
+
+def make_sample_jpeg(width: int, height: int, quality: int = 90) -> bytes:
+    """Build a photo-like JPEG (smooth gradients plus sensor noise)"""
+    rng = np.random.default_rng(width * height)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    base = (xs[None, :] + ys[:, None]) / 2
+    image = np.stack([base, np.flipud(base), np.fliplr(base)], axis=-1)
+    image += rng.normal(0, 12, image.shape).astype(np.float32)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Failed to encode sample image")
+    return encoded.tobytes()
+
+
+def full_size_decode(image_bytes: bytes) -> np.ndarray:
+    """Decode the whole photo at full resolution (EXIF orientation ignored)"""
+    buffer = np.frombuffer(memoryview(image_bytes), dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+
+
+def time_call(fn, repeats: int) -> float:
+    """Return the median wall-clock time of fn() in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def read_status_kb(field: str) -> int:
+    """A memory field from /proc/self/status in kB (Linux)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def peak_memory_mb(fn):
+    """Peak memory one call adds: (numpy/Python heap via tracemalloc, RSS high-water mark)"""
+    rss_mb = float("nan")
+    try:
+        # Writing 5 to clear_refs resets VmHWM, so the peak below belongs to this call alone
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        rss_before = read_status_kb("VmRSS")
+        fn()
+        rss_mb = (read_status_kb("VmHWM") - rss_before) / 1024
+    except (OSError, KeyError):
+        pass
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6, rss_mb
+
+
+def run_benchmark(repeats: int):
+    """Time both paths for every sample size and measure their peak memory"""
+    print(f"{'size':>11} {'bytes':>9} {'decode ms':>17} {'preprocess ms':>17} "
+          f"{'peak heap MB':>17} {'peak RSS MB':>17}")
+    print(f"{'':>21} {'full':>8} {'reduced':>8} {'full':>8} {'reduced':>8} "
+          f"{'full':>8} {'reduced':>8} {'full':>8} {'reduced':>8}")
+    results = []
+    for width, height in IMAGE_SIZES:
+        image_bytes = make_sample_jpeg(width, height)
+        full = lambda: preprocess_images([full_size_decode(image_bytes)], INPUT_SIZE)
+        reduced = lambda: preprocess_images([decode_for_inference(image_bytes).image], INPUT_SIZE)
+
+        decode_ms = (time_call(lambda: full_size_decode(image_bytes), repeats),
+                     time_call(lambda: decode_for_inference(image_bytes), repeats))
+        preprocess_ms = (time_call(full, repeats), time_call(reduced, repeats))
+        (full_heap, full_rss), (reduced_heap, reduced_rss) = peak_memory_mb(full), peak_memory_mb(reduced)
+
+        print(f"{width:>5}x{height:<5} {len(image_bytes):>9} {decode_ms[0]:>8.2f} {decode_ms[1]:>8.2f} "
+              f"{preprocess_ms[0]:>8.2f} {preprocess_ms[1]:>8.2f} {full_heap:>8.1f} {reduced_heap:>8.1f} "
+              f"{full_rss:>8.1f} {reduced_rss:>8.1f}")
+        results.append({
+            "size": [width, height], "bytes": len(image_bytes),
+            "decode_ms": {"full": decode_ms[0], "reduced": decode_ms[1]},
+            "preprocess_ms": {"full": preprocess_ms[0], "reduced": preprocess_ms[1]},
+            "peak_heap_mb": {"full": full_heap, "reduced": reduced_heap},
+            "peak_rss_mb": {"full": full_rss, "reduced": reduced_rss}
+        })
+    return results
+
+
+def compare_detections(model_path: str, image_paths):
+    """Check that both paths find the same foods in the same places on real photos"""
+    detector = FoodDetector(model_path)
+    for image_path in image_paths:
+        image_bytes = Path(image_path).read_bytes()
+        full = detector.detect_food_items(full_size_decode(image_bytes))
+        prepared = detector.prepare_image(image_bytes)
+        reduced = detector.detect_food_items(prepared.image, prepared)
+        status = "match" if sorted(d['class_name'] for d in full) == sorted(d['class_name'] for d in reduced) \
+            else "DIFF"
+        note = f" (EXIF orientation {prepared.orientation})" if prepared.orientation != 1 else ""
+        print(f"{status}: {image_path}{note}")
+        for detection in reduced:
+            print(f"    {detection['class_name']:<24} {detection['confidence']:.2f} "
+                  f"{[round(v) for v in detection['bbox']]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-size vs reduced-size preprocessing")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs per image size")
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    parser.add_argument("--model", default=None, help="Optional model path for detection parity check")
+    parser.add_argument("images", nargs="*", help="Real images to use for the parity check")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeats)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.model and args.images:
+        print("\nDetection parity")
+        compare_detections(args.model, args.images)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Response format benchmark for HealthSphere AI Food Detection
+Compares the formats /detect-food and /analyze-meal negotiate through the
+Accept header: JSON, MessagePack with the same structure, and the columnar
+MessagePack layout (typed arrays plus a class-name dictionary). Reports
+body size, raw and gzipped, the server's encode time and a client's decode
+time; for the columnar format decoding includes viewing each column as a
+NumPy array.
+"""
+
+import argparse
+import gzip
+import sys
+import time
+from pathlib import Path
+
+import msgpack
+import numpy as np
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.food_detector import FoodDetector
+from app.utils.responses import dumps, pack_detections, packb
+
+
+def make_boxes(count: int, seed: int = 0) -> np.ndarray:
+    """Backend-style float32 rows [x1, y1, x2, y2, conf, class_id] on a 4032x3024 photo"""
+    rng = np.random.default_rng(seed)
+    top_left = rng.uniform(0, 3000, size=(count, 2))
+    size = rng.uniform(50, 1000, size=(count, 2))
+    confidence = rng.uniform(0.25, 1.0, size=(count, 1))
+    class_id = rng.integers(0, 30, size=(count, 1))
+    return np.hstack([top_left, top_left + size, confidence, class_id]).astype(np.float32)
+
+
+def decode_columnar(body: bytes):
+    content = msgpack.unpackb(body)
+    detections = content["detections"]
+    dtypes = detections["dtypes"]
+    for column in ("class_ids", "confidence", "bbox", "area"):
+        detections[column] = np.frombuffer(detections[column], dtype=dtypes[column])
+    detections["bbox"] = detections["bbox"].reshape(-1, 4)
+    return content
+
+
+def timed(fn, repeats: int) -> float:
+    """Mean time of fn in microseconds"""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection response formats")
+    parser.add_argument("--detections", type=int, nargs="+", default=[5, 20, 100, 500],
+                        help="Detections per response")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    detector = FoodDetector(load_model=False)
+    formats = [
+        ("json", dumps, orjson.loads),
+        ("msgpack", packb, msgpack.unpackb),
+        ("columnar msgpack",
+         lambda content: packb({**content, "detections": pack_detections(content["detections"])}),
+         decode_columnar),
+    ]
+
+    print(f"\nbbox rounded to {detector.bbox_decimals} and confidence to {detector.confidence_decimals} "
+          f"decimals (BBOX_DECIMALS/CONFIDENCE_DECIMALS)")
+    print(f"\n{'per response':<20} {'bytes':>8} {'gzip':>8} {'vs json':>8} {'encode us':>10} {'decode us':>10}")
+    for count in args.detections:
+        detections = detector._to_detections(make_boxes(count))
+        content = {
+            "success": True,
+            "image_filename": "meal.jpg",
+            "total_detections": len(detections),
+            "detections": detections,
+            "model_info": {
+                "model_name": "HealthSphere_Food_Detection_v1",
+                "confidence_threshold": detector.confidence_threshold,
+                "num_classes": len(detector.class_names)
+            }
+        }
+        print(f"\n{count} detections")
+        json_size = None
+        for name, encode, decode in formats:
+            body = encode(content)
+            json_size = json_size or len(body)
+            encode_us = timed(lambda: encode(content), args.repeats)
+            decode_us = timed(lambda: decode(body), args.repeats)
+            print(f"  {name:<18} {len(body):>8} {len(gzip.compress(body)):>8} "
+                  f"{len(body) / json_size:>7.0%} {encode_us:>10.1f} {decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark for HealthSphere AI Food Detection
+Encodes /analyze-meal-shaped payloads (detections, meal analysis and the
+model_info block with the class list) of several sizes the ways the API
+has served them: FastAPI's jsonable_encoder pass followed by the stdlib
+JSONResponse (handlers returning dicts), the stdlib JSONResponse alone
+(handlers returning a response), and FastJSONResponse with full-precision
+and rounded detections. Reports encode time per response and body size.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.ml.inference.food_detector import FoodDetector
+from app.services.meal_analyzer import MealAnalyzer
+from app.utils.responses import FastJSONResponse
+
+
+def make_boxes(count: int, seed: int = 0) -> np.ndarray:
+    """Backend-style float32 rows [x1, y1, x2, y2, conf, class_id] on a 4032x3024 photo"""
+    rng = np.random.default_rng(seed)
+    top_left = rng.uniform(0, 3000, size=(count, 2))
+    size = rng.uniform(50, 1000, size=(count, 2))
+    confidence = rng.uniform(0.25, 1.0, size=(count, 1))
+    class_id = rng.integers(0, 30, size=(count, 1))
+    return np.hstack([top_left, top_left + size, confidence, class_id]).astype(np.float32)
+
+
+def make_payload(detector: FoodDetector, boxes: np.ndarray, bbox_decimals: int, confidence_decimals: int):
+    detector.bbox_decimals = bbox_decimals
+    detector.confidence_decimals = confidence_decimals
+    detections = detector._to_detections(boxes)
+    return {
+        "success": True,
+        "image_filename": "meal.jpg",
+        "detections": detections,
+        "meal_analysis": MealAnalyzer().analyze(detections),
+        "model_info": {
+            "model_path": detector.model_path,
+            "num_classes": len(detector.class_names),
+            "class_names": detector.class_names,
+            "confidence_threshold": detector.confidence_threshold,
+            "iou_threshold": detector.iou_threshold
+        }
+    }
+
+
+def measure(encode, repeats: int):
+    """Per-response encode times in microseconds, and the body size"""
+    body = encode()
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        encode()
+        times.append((time.perf_counter() - started) * 1e6)
+    times.sort()
+    return times, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON response serialization")
+    parser.add_argument("--detections", type=int, nargs="+", default=[5, 20, 100, 500],
+                        help="Detections per response")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--bbox-decimals", type=int, default=1)
+    parser.add_argument("--confidence-decimals", type=int, default=4)
+    args = parser.parse_args()
+
+    detector = FoodDetector(load_model=False)
+    stdlib = JSONResponse(content=None)
+    fast = FastJSONResponse(content=None)
+
+    print(f"\n{'per response':<32} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'bytes':>9} {'speedup':>8}")
+    for count in args.detections:
+        boxes = make_boxes(count)
+        full = make_payload(detector, boxes, -1, -1)
+        rounded = make_payload(detector, boxes, args.bbox_decimals, args.confidence_decimals)
+        variants = [
+            ("jsonable_encoder + json", lambda: stdlib.render(jsonable_encoder(full))),
+            ("json (JSONResponse)", lambda: stdlib.render(full)),
+            ("orjson", lambda: fast.render(full)),
+            (f"orjson, rounded {args.bbox_decimals}/{args.confidence_decimals}", lambda: fast.render(rounded)),
+        ]
+        print(f"\n{count} detections")
+        baseline = None
+        for name, encode in variants:
+            times, size = measure(encode, args.repeats)
+            mean = sum(times) / len(times)
+            baseline = baseline or mean
+            p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+            print(f"  {name:<30} {mean:>9.1f} {times[len(times) // 2]:>9.1f} {p99:>9.1f} "
+                  f"{size:>9} {baseline / mean:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
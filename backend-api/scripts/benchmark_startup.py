@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark for HealthSphere AI Food Detection
+Measures, in fresh subprocesses, how long `import main` takes and how long a
+uvicorn server needs to answer /health (liveness) and /api/v1/ml/ready
+(model loaded and warmed), with lazy and eager model loading
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    """Seconds to `import main` in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(url: str, server: subprocess.Popen, started: float, timeout: float) -> float:
+    """Poll url until it answers 200; returns seconds since started"""
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not answer within {timeout}s")
+
+
+def measure_server(env: dict, timeout: float):
+    """Seconds from process launch to first /health response and to readiness"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        first_response = wait_for(f"{base}/health", server, started, timeout)
+        ready = wait_for(f"{base}/api/v1/ml/ready", server, started, timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return first_response, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time and time to first response")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--model", default=None, help="MODEL_PATH override")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'import s':>9} {'first /health s':>16} {'ready s':>8}")
+    for mode, lazy in [("lazy", "true"), ("eager", "false")]:
+        env = dict(os.environ, LAZY_MODEL_LOADING=lazy)
+        if args.model:
+            env["MODEL_PATH"] = args.model
+
+        imports, first_responses, readies = [], [], []
+        for _ in range(args.runs):
+            imports.append(measure_import(env))
+            first_response, ready = measure_server(env, args.timeout)
+            first_responses.append(first_response)
+            readies.append(ready)
+        print(f"{mode:<6} {np.median(imports):>9.2f} {np.median(first_responses):>16.2f} "
+              f"{np.median(readies):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tiled inference benchmark for HealthSphere AI Food Detection
+Compares single-pass inference (upload decoded to DECODE_TARGET_SIZE) with
+sliced inference (decoded to TILING_DECODE_SIZE and run as overlapping
+tiles) on the valid split: per-image latency, forward passes, and recall
+against the YOLO labels overall and for small items, with precision to
+show what the extra tiles cost in false positives.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.ml.evaluation import count_matches, label_path, list_images, read_labels, valid_split_dir
+from app.ml.inference.backends import create_backend
+from app.ml.inference.preprocessing import decode_for_inference
+from app.ml.inference.tiling import TiledBackend
+
+
+def load_uploads(image_dir: str, limit: int):
+    """(upload bytes, labels in original pixels) pairs, or synthetic 12 MP photos without labels"""
+    directory = Path(image_dir) if image_dir else valid_split_dir()
+    if directory.is_dir():
+        samples = []
+        for path in list_images(directory, limit):
+            data = path.read_bytes()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                samples.append((data, read_labels(label_path(path), image.shape[1], image.shape[0])))
+        return samples, str(directory)
+    rng = np.random.default_rng(0)
+    samples = []
+    for _ in range(limit):
+        image = cv2.resize(rng.integers(0, 255, (300, 400, 3), dtype=np.uint8), (4032, 3024))
+        samples.append((cv2.imencode(".jpg", image)[1].tobytes(), None))
+    return samples, f"{limit} synthetic 4032x3024 photos ({directory} not found, no labels)"
+
+
+class CountingBackend:
+    """Counts the images a backend is asked to run, i.e. forward-pass inputs"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.model_path = backend.model_path
+        self.image_size = backend.image_size
+        self.model = backend.model
+        self.names = backend.names
+        self.thread_safe = backend.thread_safe
+        self.inputs = 0
+
+    def predict(self, images, conf, iou, image_size=0):
+        self.inputs += len(images)
+        return self.backend.predict(images, conf, iou, image_size)
+
+
+def run(backend, uploads, decode_size: int, conf: float, iou: float):
+    """Per-image latency (ms, decode included) and boxes in original-image pixels"""
+    timings, outputs = [], []
+    for data in uploads:
+        started = time.perf_counter()
+        prepared = decode_for_inference(data, decode_size, settings.APPLY_EXIF_ORIENTATION)
+        boxes = backend.predict([prepared.image], conf, iou)[0]
+        outputs.append(prepared.restore_boxes(boxes))
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.asarray(timings), outputs
+
+
+def recall_precision(labels, outputs, min_iou: float, small_fraction: float, sizes):
+    """Recall over all labels and over small ones (area below small_fraction of the image), and precision"""
+    found = total = small_found = small_total = 0
+    for truth, boxes, (width, height) in zip(labels, outputs, sizes):
+        areas = (truth[:, 2] - truth[:, 0]) * (truth[:, 3] - truth[:, 1])
+        small = areas < small_fraction * width * height
+        found += count_matches(truth[:, :4], truth[:, 4], boxes, min_iou)
+        small_found += count_matches(truth[small, :4], truth[small, 4], boxes, min_iou)
+        total += len(truth)
+        small_total += int(small.sum())
+    predicted = sum(len(boxes) for boxes in outputs)
+    return (found / total if total else 0.0, small_found / small_total if small_total else 0.0,
+            found / predicted if predicted else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tiled against single-pass inference")
+    parser.add_argument("--model", default=settings.MODEL_PATH)
+    parser.add_argument("--backend", default=settings.MODEL_BACKEND)
+    parser.add_argument("--images", default=None, help="Images directory (default: val split of dataset.yaml)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--decode-size", type=int, default=settings.TILING_DECODE_SIZE,
+                        help="Decode target long side for tiled runs")
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[settings.TILING_TILE_SIZE])
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[settings.TILING_OVERLAP])
+    parser.add_argument("--workers", type=int, default=settings.TILING_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.TILING_BATCH_SIZE)
+    parser.add_argument("--no-full-image", action="store_true", help="Do not add the whole-image pass")
+    parser.add_argument("--small", type=float, default=0.01, help="Label area fraction counted as a small item")
+    parser.add_argument("--conf", type=float, default=settings.CONFIDENCE_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=settings.IOU_THRESHOLD)
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    samples, source = load_uploads(args.images, args.limit)
+    if not samples:
+        sys.exit(f"No images found in {source}")
+    uploads = [data for data, _ in samples]
+    labels = [truth for _, truth in samples]
+    labelled = all(truth is not None for truth in labels)
+    sizes = [decode_for_inference(data, 0).original_size for data in uploads]
+    print(f"Benchmarking on {len(uploads)} images from {source}\n")
+
+    backend = CountingBackend(create_backend(args.model, args.backend, intra_op_threads=settings.INTRA_OP_THREADS,
+                                             inter_op_threads=settings.INTER_OP_THREADS))
+    backend.predict([np.zeros((640, 640, 3), dtype=np.uint8)], args.conf, args.iou)  # Warm-up
+
+    header = f"{'config':<26} {'mean ms':>8} {'p95 ms':>8} {'inputs/img':>11} {'boxes/img':>10}"
+    if labelled:
+        header += f" {'recall':>7} {'small':>7} {'precision':>10}"
+    print(header)
+
+    def report(name, runner, decode_size):
+        backend.inputs = 0
+        timings, outputs = run(runner, uploads, decode_size, args.conf, args.iou)
+        line = (f"{name:<26} {timings.mean():>8.1f} {np.percentile(timings, 95):>8.1f} "
+                f"{backend.inputs / len(uploads):>11.1f} {sum(map(len, outputs)) / len(uploads):>10.1f}")
+        if labelled:
+            recall, small_recall, precision = recall_precision(labels, outputs, args.match_iou, args.small, sizes)
+            line += f" {recall:>7.3f} {small_recall:>7.3f} {precision:>10.3f}"
+        print(line)
+
+    report(f"single pass @{settings.DECODE_TARGET_SIZE}", backend, settings.DECODE_TARGET_SIZE)
+    for tile_size in args.tile_sizes:
+        for overlap in args.overlaps:
+            tiled = TiledBackend(backend, tile_size, overlap, include_full_image=not args.no_full_image,
+                                 batch_size=args.batch_size, workers=args.workers)
+            report(f"tiles {tile_size}/{overlap:g} @{args.decode_size}", tiled, args.decode_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Worker pool scaling benchmark for HealthSphere AI Food Detection
+Measures throughput of the shared-memory inference worker pool for an
+increasing number of worker processes
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.inference.worker_pool import SharedMemoryWorkerPool
+
+
+async def wait_until_ready(pool: SharedMemoryWorkerPool, timeout: float = 300.0):
+    """Wait for every worker to finish loading its model"""
+    deadline = time.perf_counter() + timeout
+    while pool.ready_workers < pool.num_workers:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Workers did not load the model in time")
+        await asyncio.sleep(0.1)
+
+
+async def measure(num_workers: int, args) -> float:
+    """Return images per second for one pool size"""
+    pool = SharedMemoryWorkerPool(
+        num_workers=num_workers,
+        slots_per_worker=args.slots,
+        max_image_side=args.max_side,
+        model_path=args.model
+    )
+    pool.start()
+    try:
+        await wait_until_ready(pool)
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+
+        # Warm every worker before timing
+        await asyncio.gather(*[pool.detect(image) for _ in range(num_workers * 2)])
+
+        start = time.perf_counter()
+        await asyncio.gather(*[pool.detect(image) for _ in range(args.images)])
+        return args.images / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+async def run(args):
+    print(f"{'workers':>8} {'images/s':>10} {'speedup':>8} {'efficiency':>11}")
+    baseline = None
+    for num_workers in range(1, args.max_workers + 1):
+        throughput = await measure(num_workers, args)
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+        print(f"{num_workers:>8} {throughput:>10.2f} {speedup:>8.2f} {speedup / num_workers:>10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared-memory worker pool scaling")
+    parser.add_argument("--model", default="app/ml/models/best.pt", help="Model weights path")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--images", type=int, default=200, help="Images per measurement")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--slots", type=int, default=4, help="Slots per worker ring")
+    parser.add_argument("--max-side", type=int, default=1280, help="Slot image side in pixels")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Model cascade evaluation for HealthSphere AI Food Detection
+Runs the valid split through the accurate model alone and through the
+confidence-gated cascade (fast low-resolution pass, accurate pass only for
+uncertain images), then reports the average latency saved, how often
+images were escalated, precision/recall/F1 against the YOLO labels and how
+closely the cascade agrees with the accurate-only detections.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.ml.evaluation import count_matches, label_path, list_images, read_labels, valid_split_dir
+from app.ml.inference.backends import create_backend
+from app.ml.inference.cascade import ModelCascade
+
+
+def load_split(image_dir: str, limit: int):
+    """(image, labels) pairs of the split, or synthetic unlabelled images if it is not available"""
+    directory = Path(image_dir) if image_dir else valid_split_dir()
+    if directory.is_dir():
+        samples = []
+        for path in list_images(directory, limit):
+            image = cv2.imread(str(path))
+            if image is not None:
+                samples.append((image, read_labels(label_path(path), image.shape[1], image.shape[0])))
+        return samples, str(directory)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(limit)]
+    return [(image, None) for image in images], f"{limit} synthetic images ({directory} not found, no labels)"
+
+
+def scores(labels, outputs, min_iou: float):
+    """Precision, recall and F1 of outputs against the labels"""
+    true_positive = sum(count_matches(truth[:, :4], truth[:, 4], boxes, min_iou)
+                        for truth, boxes in zip(labels, outputs))
+    predicted = sum(len(boxes) for boxes in outputs)
+    actual = sum(len(truth) for truth in labels)
+    precision = true_positive / predicted if predicted else 0.0
+    recall = true_positive / actual if actual else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def agreement(reference, outputs, min_iou: float) -> float:
+    """Share of accurate-only boxes the cascade also reports (same class, IoU >= min_iou)"""
+    total = sum(len(boxes) for boxes in reference)
+    if total == 0:
+        return 1.0
+    found = sum(count_matches(ref[:, :4], ref[:, 5], boxes, min_iou) for ref, boxes in zip(reference, outputs))
+    return found / total
+
+
+def run(predict, images):
+    """Per-image latency (ms) and boxes, one image per call as the API serves them"""
+    predict(images[:1])  # Warm-up
+    timings, outputs = [], []
+    for image in images:
+        started = time.perf_counter()
+        outputs.append(predict([image])[0])
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.asarray(timings), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the confidence-gated model cascade")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Accurate model (the one served today)")
+    parser.add_argument("--fast-model", default=settings.CASCADE_FAST_MODEL_PATH,
+                        help="Fast pass weights (default: --model)")
+    parser.add_argument("--fast-size", type=int, default=settings.CASCADE_FAST_IMAGE_SIZE)
+    parser.add_argument("--backend", default=settings.MODEL_BACKEND)
+    parser.add_argument("--images", default=None, help="Images directory (default: val split of dataset.yaml)")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--band", type=float, nargs=2, default=settings.CASCADE_UNCERTAIN_BAND,
+                        metavar=("LOW", "HIGH"))
+    parser.add_argument("--bands", type=float, nargs="+", default=None,
+                        help="Also sweep these band upper bounds, keeping LOW")
+    parser.add_argument("--no-escalate-empty", action="store_true")
+    parser.add_argument("--conf", type=float, default=settings.CONFIDENCE_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=settings.IOU_THRESHOLD)
+    parser.add_argument("--match-iou", type=float, default=0.5, help="IoU for a detection to count as correct")
+    args = parser.parse_args()
+
+    samples, source = load_split(args.images, args.limit)
+    if not samples:
+        sys.exit(f"No images found in {source}")
+    images = [image for image, _ in samples]
+    labels = [truth for _, truth in samples]
+    labelled = all(truth is not None for truth in labels)
+    print(f"Evaluating on {len(images)} images from {source}\n")
+
+    accurate = create_backend(args.model, args.backend, intra_op_threads=settings.INTRA_OP_THREADS,
+                              inter_op_threads=settings.INTER_OP_THREADS)
+    # Like the app, the fast pass reuses the accurate model unless it has weights of its own
+    fast = accurate
+    if args.fast_model:
+        fast = create_backend(args.fast_model, args.backend, intra_op_threads=settings.INTRA_OP_THREADS,
+                              inter_op_threads=settings.INTER_OP_THREADS)
+
+    baseline_ms, baseline = run(lambda batch: accurate.predict(batch, args.conf, args.iou), images)
+
+    header = f"{'config':<22} {'mean ms':>8} {'p50 ms':>8} {'saved':>7} {'escalated':>10} {'agree':>7}"
+    if labelled:
+        header += f" {'precision':>10} {'recall':>7} {'f1':>6}"
+    print(header)
+
+    def report(name, timings, outputs, escalation_rate=None):
+        line = (f"{name:<22} {timings.mean():>8.2f} {np.percentile(timings, 50):>8.2f} "
+                f"{1 - timings.mean() / baseline_ms.mean():>7.1%} "
+                f"{'-' if escalation_rate is None else f'{escalation_rate:.1%}':>10} "
+                f"{agreement(baseline, outputs, args.match_iou):>7.1%}")
+        if labelled:
+            precision, recall, f1 = scores(labels, outputs, args.match_iou)
+            line += f" {precision:>10.3f} {recall:>7.3f} {f1:>6.3f}"
+        print(line)
+
+    report("accurate only", baseline_ms, baseline)
+    low = args.band[0]
+    highs = [args.band[1]] + [high for high in args.bands or [] if high != args.band[1]]
+    for high in highs:
+        cascade = ModelCascade(fast, accurate, (low, high), escalate_empty=not args.no_escalate_empty,
+                               fast_image_size=args.fast_size)
+        stages = []
+
+        def predict(batch):
+            boxes, batch_stages = cascade.predict(batch, args.conf, args.iou)
+            stages.extend(batch_stages)
+            return boxes
+
+        timings, outputs = run(predict, images)
+        escalated = sum(len(image_stages) > 1 for image_stages in stages[1:])  # Skip the warm-up call
+        report(f"cascade {low:g}-{high:g}", timings, outputs, escalated / len(images))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Model evaluation pipeline for HealthSphere AI Food Detection
+Streams a Food_Dataset split (images and YOLO labels from the dataset.yaml
+paths) through FoodDetector with batched inference while a thread pool
+decodes the next images, then reports mAP50, mAP50-95, precision, recall
+and per-class AP next to the numbers recorded in model_info.yaml, plus
+decode/inference throughput. Decoded images are cached in a memory-mapped
+file, so repeated runs (other thresholds, backends or quantized variants)
+skip decoding entirely; precision/recall at extra confidence thresholds
+come from the same pass without running the model again.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.evaluation import (
+    MODELS_DIR,
+    compute_metrics,
+    label_path,
+    list_images,
+    match_predictions,
+    read_labels,
+    resolve_split_dir
+)
+from app.ml.inference.food_detector import FoodDetector
+from app.ml.inference.preprocessing import PreparedImage
+
+# (prepared image, labels [x1, y1, x2, y2, class_id] in original pixels)
+Sample = Tuple[PreparedImage, np.ndarray]
+
+
+class DecodeCache:
+    """Decoded images of one split in a single memory-mapped uint8 file plus a JSON index.
+
+    The key covers the image and label files (names, sizes, mtimes) and the
+    decode settings, so a changed split, relabelled image or
+    DECODE_TARGET_SIZE gets a new cache.
+    Images are read back as views into the mapping: no decode and no copy.
+    """
+
+    def __init__(self, cache_dir: Path, paths: List[Path], decode_target_size: int, apply_exif_orientation: bool):
+        digest = hashlib.sha1(f"{decode_target_size}|{int(apply_exif_orientation)}".encode())
+        for path in paths:
+            stat = path.stat()
+            digest.update(f"|{path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+            label = label_path(path)
+            if label.exists():
+                stat = label.stat()
+                digest.update(f"|{label.resolve()}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+            else:
+                digest.update(f"|{label}:missing".encode())
+        self.data_path = cache_dir / f"{digest.hexdigest()[:16]}.u8"
+        self.index_path = self.data_path.with_suffix(".json")
+        self._writer = None
+        self._entries: List[Dict] = []
+        self._offset = 0
+
+    def read(self) -> Optional[List[Sample]]:
+        """All cached samples, or None when this split has not been cached yet"""
+        if not (self.index_path.exists() and self.data_path.exists()):
+            return None
+        with open(self.index_path) as f:
+            entries = json.load(f)
+        data = np.memmap(self.data_path, dtype=np.uint8, mode="r") if entries else None
+        samples = []
+        for entry in entries:
+            height, width = entry["shape"]
+            image = data[entry["offset"]:entry["offset"] + height * width * 3].reshape(height, width, 3)
+            labels = np.asarray(entry["labels"], dtype=np.float32).reshape(-1, 5)
+            samples.append((PreparedImage(image, tuple(entry["original_size"]), entry["orientation"]), labels))
+        return samples
+
+    def append(self, sample: Sample):
+        prepared, labels = sample
+        if self._writer is None:
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = open(f"{self.data_path}.tmp", "wb")
+        image = np.ascontiguousarray(prepared.image)
+        self._writer.write(memoryview(image).cast("B"))
+        self._entries.append({
+            "offset": self._offset,
+            "shape": list(image.shape[:2]),
+            "original_size": list(prepared.original_size),
+            "orientation": prepared.orientation,
+            "labels": labels.tolist()
+        })
+        self._offset += image.nbytes
+
+    def commit(self):
+        """Publish the written samples; the index is renamed last so readers never see a partial cache"""
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(f"{self.data_path}.tmp", self.data_path)
+        with open(f"{self.index_path}.tmp", "w") as f:
+            json.dump(self._entries, f)
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+
+
+def decoded_stream(paths: List[Path], detector: FoodDetector, workers: int,
+                   prefetch: int, timings: Dict) -> Iterator[Sample]:
+    """Decode images and read their labels on a thread pool, at most prefetch ahead of the consumer
+
+    Adds the decode threads' busy time to timings["decode"].
+    """
+    def decode(path: Path) -> Tuple[Optional[Sample], float]:
+        started = time.perf_counter()
+        prepared = detector.prepare_image(path.read_bytes())
+        if prepared is None:
+            return None, time.perf_counter() - started
+        width, height = prepared.original_size
+        sample = (prepared, read_labels(label_path(path), width, height))
+        return sample, time.perf_counter() - started
+
+    def collect(future) -> Optional[Sample]:
+        sample, seconds = future.result()
+        timings["decode"] += seconds
+        return sample
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(decode, path))
+            if len(pending) > prefetch:
+                sample = collect(pending.popleft())
+                if sample is not None:
+                    yield sample
+        while pending:
+            sample = collect(pending.popleft())
+            if sample is not None:
+                yield sample
+
+
+def batches(samples: Iterator[Sample], batch_size: int) -> Iterator[List[Sample]]:
+    batch = []
+    for sample in samples:
+        batch.append(sample)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_boxes(detections: List[Dict]) -> np.ndarray:
+    """Detection dicts back to (N, 6) rows [x1, y1, x2, y2, confidence, class_id]"""
+    if not detections:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.array([d['bbox'] + [d['confidence'], d['class_id']] for d in detections], dtype=np.float32)
+
+
+def operating_point(correct: np.ndarray, confidence: np.ndarray, labels: int, threshold: float) -> Dict:
+    """Precision, recall and F1 at IoU 0.5 keeping only predictions at or above a confidence threshold"""
+    kept = confidence >= threshold
+    true_positives = int(correct[kept, 0].sum())
+    predicted = int(kept.sum())
+    precision = true_positives / predicted if predicted else 0.0
+    recall = true_positives / labels if labels else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"confidence": threshold, "precision": precision, "recall": recall, "f1": f1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a detection model on a Food_Dataset split")
+    parser.add_argument("--model", default=None, help="Model path (default: MODEL_PATH)")
+    parser.add_argument("--backend", default=None, help="Inference backend (default: MODEL_BACKEND)")
+    parser.add_argument("--data", default=str(MODELS_DIR / "dataset.yaml"), help="dataset.yaml with split paths")
+    parser.add_argument("--split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--limit", type=int, default=0, help="Evaluate only the first N images (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--prefetch", type=int, default=32, help="Images decoded ahead of inference")
+    parser.add_argument("--cache-dir", default="app/cache/eval", help="Memory-mapped decode cache ('' = off)")
+    parser.add_argument("--conf", type=float, default=0.001, help="Detection threshold for the mAP pass")
+    parser.add_argument("--iou", type=float, default=0.7, help="NMS IoU (ultralytics val default)")
+    parser.add_argument("--conf-thresholds", type=float, nargs="*", default=[0.25, 0.5],
+                        help="Also report precision/recall/F1 at these confidences (no extra inference)")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    split_dir = resolve_split_dir(Path(args.data), args.split)
+    if not split_dir.is_dir():
+        sys.exit(f"Split directory not found: {split_dir}")
+    paths = list_images(split_dir, args.limit)
+    if not paths:
+        sys.exit(f"No images found in {split_dir}")
+
+    started = time.perf_counter()
+    detector = FoodDetector(args.model, backend=args.backend)
+    detector.confidence_threshold = args.conf
+    detector.iou_threshold = args.iou
+    load_seconds = time.perf_counter() - started
+
+    cache = (DecodeCache(Path(args.cache_dir), paths, detector.decode_target_size, detector.apply_exif_orientation)
+             if args.cache_dir else None)
+    cached = cache.read() if cache is not None else None
+    timings = {"decode": 0.0, "inference": 0.0}
+    samples = iter(cached) if cached is not None else decoded_stream(
+        paths, detector, args.decode_workers, args.prefetch, timings
+    )
+    print(f"Evaluating {detector.model_path} ({detector.backend.name}) on {len(paths)} images from {split_dir}")
+    print(f"Decode: {'memory-mapped cache ' + str(cache.data_path) if cached is not None else 'threads'}\n")
+
+    correct, confidence, predicted_class, label_class = [], [], [], []
+    evaluated = 0
+    started = time.perf_counter()
+    for batch in batches(samples, args.batch_size):
+        prepared = [p for p, _ in batch]
+        inference_started = time.perf_counter()
+        batch_detections = detector.detect_batch([p.image for p in prepared], prepared)
+        timings["inference"] += time.perf_counter() - inference_started
+        for (sample_prepared, labels), detections in zip(batch, batch_detections):
+            boxes = to_boxes(detections)
+            correct.append(match_predictions(boxes, labels))
+            confidence.append(boxes[:, 4])
+            predicted_class.append(boxes[:, 5])
+            label_class.append(labels[:, 4])
+            if cache is not None and cached is None:
+                cache.append((sample_prepared, labels))
+        evaluated += len(batch)
+    wall_seconds = time.perf_counter() - started
+    if cache is not None and cached is None:
+        cache.commit()
+
+    correct = np.concatenate(correct) if correct else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+    confidence = np.concatenate(confidence) if confidence else np.zeros(0)
+    predicted_class = np.concatenate(predicted_class) if predicted_class else np.zeros(0)
+    label_class = np.concatenate(label_class) if label_class else np.zeros(0)
+    metrics = compute_metrics(correct, confidence, predicted_class, label_class)
+
+    with open(MODELS_DIR / "model_info.yaml") as f:
+        recorded = (yaml.safe_load(f) or {}).get("performance_metrics", {})
+
+    print(f"{'':<28} {'mAP50':>8} {'mAP50-95':>9} {'precision':>10} {'recall':>8}")
+    if recorded:
+        print(f"{'model_info.yaml (recorded)':<28} {recorded['map50']:>8.4f} {recorded['map50_95']:>9.4f} "
+              f"{recorded['precision']:>10.4f} {recorded['recall']:>8.4f}")
+    print(f"{'this run':<28} {metrics['map50']:>8.4f} {metrics['map50_95']:>9.4f} "
+          f"{metrics['precision']:>10.4f} {metrics['recall']:>8.4f}  "
+          f"(best F1 at confidence {metrics['best_f1_confidence']:.3f})")
+
+    points = [operating_point(correct, confidence, len(label_class), t) for t in args.conf_thresholds]
+    if points:
+        print(f"\n{'confidence':>10} {'precision':>10} {'recall':>8} {'f1':>6}   (IoU 0.5)")
+        for point in points:
+            print(f"{point['confidence']:>10.3f} {point['precision']:>10.4f} {point['recall']:>8.4f} "
+                  f"{point['f1']:>6.4f}")
+
+    print(f"\n{'class':<30} {'labels':>7} {'AP50':>7} {'AP50-95':>8}")
+    for class_id, values in sorted(metrics["per_class"].items()):
+        name = detector.class_names[class_id] if class_id < len(detector.class_names) else f"class_{class_id}"
+        print(f"{name:<30} {values['labels']:>7} {values['ap50']:>7.3f} {values['ap50_95']:>8.3f}")
+
+    throughput = {
+        "images": evaluated,
+        "model_load_seconds": load_seconds,
+        "wall_seconds": wall_seconds,
+        "images_per_second": evaluated / wall_seconds if wall_seconds > 0 else 0.0,
+        "decode_seconds": timings["decode"],
+        "inference_seconds": timings["inference"],
+        "inference_images_per_second": evaluated / timings["inference"] if timings["inference"] > 0 else 0.0,
+        "decode_cached": cached is not None
+    }
+    decode_note = ("skipped (memory-mapped cache)" if cached is not None
+                   else f"{timings['decode']:.2f} thread-seconds on {args.decode_workers} threads")
+    print(f"\n{evaluated} images in {wall_seconds:.2f}s ({throughput['images_per_second']:.1f} img/s end to end, "
+          f"{throughput['inference_images_per_second']:.1f} img/s inference); decode {decode_note}")
+
+    if args.output:
+        report = {
+            "model": detector.model_path,
+            "model_version": detector.model_version,
+            "backend": detector.backend.name,
+            "split": args.split,
+            "conf": args.conf,
+            "iou": args.iou,
+            "metrics": metrics,
+            "operating_points": points,
+            "recorded_metrics": recorded,
+            "throughput": throughput
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
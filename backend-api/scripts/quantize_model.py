@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+INT8 quantization pipeline for HealthSphere AI Food Detection
+Exports best.pt to ONNX, statically quantizes it to INT8 using images from
+the Food_Dataset valid split for calibration, and writes a report comparing
+accuracy, latency and memory against the FP32 model and model_info.yaml
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.evaluation import MODELS_DIR, list_images, resolve_split_dir
+from app.ml.inference.backends import create_backend, preprocess_images
+
+
+class ValidSplitCalibrationReader:
+    """Feeds letterboxed valid-split images to the ONNX Runtime calibrator one at a time"""
+
+    def __init__(self, image_paths, input_name: str, input_size=(640, 640)):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.input_size = input_size
+        self._index = 0
+
+    def get_next(self):
+        while self._index < len(self.image_paths):
+            image = cv2.imread(str(self.image_paths[self._index]))
+            self._index += 1
+            if image is not None:
+                return {self.input_name: preprocess_images([image], self.input_size)}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def detect_head_nodes(onnx_model) -> list:
+    """Node names of the final Detect layer, which loses too much accuracy when quantized"""
+    indices = [int(m.group(1)) for node in onnx_model.graph.node
+               for m in [re.match(r"/model\.(\d+)/", node.name)] if m]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in onnx_model.graph.node if node.name.startswith(prefix)]
+
+
+def quantize(fp32_path: Path, int8_path: Path, calibration_paths, per_channel: bool, exclude_head: bool,
+             method: str):
+    """Static QDQ INT8 quantization calibrated on the given images"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    model = onnx.load(str(fp32_path))
+    input_name = model.graph.input[0].name
+    excluded = detect_head_nodes(model) if exclude_head else []
+    print(f"Calibrating on {len(calibration_paths)} images, keeping {len(excluded)} Detect head nodes in FP32")
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        ValidSplitCalibrationReader(calibration_paths, input_name),
+        quant_format=QuantFormat.QDQ,
+        per_channel=per_channel,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=getattr(CalibrationMethod, method),
+        nodes_to_exclude=excluded
+    )
+
+    # Keep the ultralytics metadata (class names, stride, imgsz) on the quantized model
+    quantized = onnx.load(str(int8_path))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, str(int8_path))
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def measure_latency(model_path: Path, backend: str, image_paths, threads: int, repeats: int):
+    """Load a model and time single-image inference; returns (p50 ms, mean ms, load RSS MB)"""
+    images = [image for image in (cv2.imread(str(p)) for p in image_paths) if image is not None]
+
+    # RSS growth includes the runtime's buffers, which are only allocated on the first inference
+    rss_before = current_rss_mb()
+    detector_backend = create_backend(str(model_path), backend, intra_op_threads=threads)
+    detector_backend.predict(images[:1], 0.25, 0.5)
+    rss_loaded = current_rss_mb() - rss_before
+
+    timings = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            detector_backend.predict([image], 0.25, 0.5)
+            timings.append((time.perf_counter() - start) * 1000)
+    del detector_backend
+    return float(np.percentile(timings, 50)), float(np.mean(timings)), rss_loaded
+
+
+def evaluate_map(model_path: Path, dataset_yaml: Path):
+    """mAP50 / mAP50-95 / precision / recall on the valid split with ultralytics val"""
+    from ultralytics import YOLO
+    metrics = YOLO(str(model_path), task="detect").val(
+        data=str(dataset_yaml.resolve()), split="val", imgsz=640, batch=1, verbose=False, plots=False
+    )
+    precision, recall, map50, map50_95 = metrics.box.mean_results()
+    return {"map50": float(map50), "map50_95": float(map50_95),
+            "precision": float(precision), "recall": float(recall)}
+
+
+def write_report(report: dict, output: Path):
+    """Write the JSON report and a markdown summary next to it"""
+    output.write_text(json.dumps(report, indent=2))
+
+    recorded = report["recorded_metrics"]
+    lines = [
+        "# INT8 Quantization Report",
+        "",
+        f"Calibration: {report['calibration_images']} images from `{report['calibration_split']}` "
+        f"({report['calibration_method']}, per-channel={report['per_channel']}, "
+        f"Detect head excluded={report['exclude_head']})",
+        "",
+        "| Variant | mAP50 | mAP50-95 | Precision | Recall | p50 ms | Mean ms | Load RSS MB | File MB |",
+        "|---|---|---|---|---|---|---|---|---|",
+        f"| model_info.yaml (recorded) | {recorded['map50']:.4f} | {recorded['map50_95']:.4f} | "
+        f"{recorded['precision']:.4f} | {recorded['recall']:.4f} | | | | |",
+    ]
+    for name, variant in report["variants"].items():
+        accuracy = variant.get("accuracy") or {}
+        fmt = lambda key: f"{accuracy[key]:.4f}" if key in accuracy else "n/a"
+        lines.append(
+            f"| {name} | {fmt('map50')} | {fmt('map50_95')} | {fmt('precision')} | {fmt('recall')} | "
+            f"{variant['p50_ms']:.2f} | {variant['mean_ms']:.2f} | {variant['load_rss_mb']:.1f} | "
+            f"{variant['file_mb']:.1f} |"
+        )
+    output.with_suffix(".md").write_text("\n".join(lines) + "\n")
+    print("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and evaluate an INT8 variant of best.pt")
+    parser.add_argument("--pt", default=str(MODELS_DIR / "best.pt"))
+    parser.add_argument("--dataset", default=str(MODELS_DIR / "dataset.yaml"))
+    parser.add_argument("--output", default=str(MODELS_DIR / "best_int8.onnx"))
+    parser.add_argument("--calibration-images", type=int, default=200, help="0 = whole valid split")
+    parser.add_argument("--method", default="MinMax", choices=["MinMax", "Entropy", "Percentile"])
+    parser.add_argument("--no-per-channel", action="store_true")
+    parser.add_argument("--quantize-head", action="store_true", help="Also quantize the Detect head")
+    parser.add_argument("--latency-images", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--skip-eval", action="store_true", help="Skip the mAP evaluation")
+    parser.add_argument("--report", default=str(MODELS_DIR / "quantization_report.json"))
+    args = parser.parse_args()
+
+    dataset_yaml = Path(args.dataset)
+    valid_dir = resolve_split_dir(dataset_yaml, "val")
+    if not valid_dir.exists():
+        sys.exit(f"Valid split not found at {valid_dir}")
+    calibration_paths = list_images(valid_dir, args.calibration_images)
+
+    from ultralytics import YOLO
+    fp32_path = Path(YOLO(args.pt).export(format="onnx", dynamic=True))
+    int8_path = Path(args.output)
+    quantize(fp32_path, int8_path, calibration_paths, not args.no_per_channel,
+             not args.quantize_head, args.method)
+    print(f"INT8 model written to {int8_path}")
+
+    with open(MODELS_DIR / "model_info.yaml", 'r') as f:
+        recorded = yaml.safe_load(f)["performance_metrics"]
+
+    latency_paths = list_images(valid_dir, args.latency_images)
+    report = {
+        "calibration_split": str(valid_dir),
+        "calibration_images": len(calibration_paths),
+        "calibration_method": args.method,
+        "per_channel": not args.no_per_channel,
+        "exclude_head": not args.quantize_head,
+        "recorded_metrics": recorded,
+        "variants": {}
+    }
+    for name, path, backend in [("fp32-pytorch", Path(args.pt), "pytorch"),
+                                ("fp32-onnx", fp32_path, "onnxruntime"),
+                                ("int8-onnx", int8_path, "onnxruntime")]:
+        p50_ms, mean_ms, load_rss_mb = measure_latency(path, backend, latency_paths, args.threads, args.repeats)
+        report["variants"][name] = {
+            "path": str(path),
+            "file_mb": path.stat().st_size / 1e6,
+            "p50_ms": p50_ms,
+            "mean_ms": mean_ms,
+            "load_rss_mb": load_rss_mb,
+            "accuracy": None if args.skip_eval else evaluate_map(path, dataset_yaml)
+        }
+
+    write_report(report, Path(args.report))
+    print(f"\nUse the INT8 variant with MODEL_PATH={int8_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from app.ml.inference.backends import letterbox, nms, postprocess, preprocess_images, scale_boxes
+
+
+def anchors(*rows, num_classes=2):
+    """Raw YOLOv8 head output (4 + num_classes, anchors) from (cx, cy, w, h, class_id, score) rows"""
+    output = np.zeros((4 + num_classes, len(rows)), dtype=np.float32)
+    for column, (cx, cy, w, h, class_id, score) in enumerate(rows):
+        output[:4, column] = [cx, cy, w, h]
+        output[4 + class_id, column] = score
+    return output
+
+
+@pytest.mark.parametrize("shape, resized, padding", [
+    # (height, width) -> content size and (top, left) padding in a 640x640 input
+    ((500, 1000), (320, 640), (160, 0)),
+    ((640, 480), (640, 480), (0, 80)),
+    ((1280, 1280), (640, 640), (0, 0)),
+    ((3, 640), (3, 640), (318, 0)),
+])
+def test_letterbox_scales_and_centres_the_image(shape, resized, padding):
+    image = np.full((*shape, 3), 255, dtype=np.uint8)
+    boxed = letterbox(image, (640, 640))
+    assert boxed.shape == (640, 640, 3)
+    rows, columns = np.nonzero(boxed[..., 0] == 255)
+    assert (rows.min(), columns.min()) == padding
+    assert (rows.max() - rows.min() + 1, columns.max() - columns.min() + 1) == resized
+    assert boxed[0, 0].tolist() == ([114] * 3 if padding != (0, 0) else [255] * 3)
+
+
+@pytest.mark.parametrize("shape", [(500, 1000), (640, 480), (427, 640), (3000, 4000)])
+def test_scale_boxes_inverts_the_letterbox(shape):
+    height, width = shape
+    original = np.array([[0.1 * width, 0.2 * height, 0.6 * width, 0.9 * height]], dtype=np.float32)
+    # Where the box lands in the letterboxed input
+    gain = min(640 / height, 640 / width)
+    pad_x, pad_y = round((640 - width * gain) / 2 - 0.1), round((640 - height * gain) / 2 - 0.1)
+    boxed = original * gain + np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+    np.testing.assert_allclose(scale_boxes(boxed, (640, 640), (height, width, 3)), original, atol=1e-2)
+
+
+def test_scale_boxes_clips_to_the_image():
+    boxes = np.array([[-10.0, 150.0, 700.0, 500.0]], dtype=np.float32)
+    # 1000x500 image: gain 0.64 with 160 px of padding above and below
+    np.testing.assert_allclose(scale_boxes(boxes, (640, 640), (500, 1000, 3)), [[0, 0, 1000, 500]])
+
+
+def test_preprocess_images_is_normalized_rgb_nchw():
+    image = np.zeros((640, 640, 3), dtype=np.uint8)
+    image[..., 0] = 255  # Blue in BGR
+    batch = preprocess_images([image, image], (640, 640))
+    assert batch.shape == (2, 3, 640, 640) and batch.dtype == np.float32
+    assert batch[0, :, 0, 0].tolist() == [0.0, 0.0, 1.0]
+
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 0, 11, 10], [20, 20, 30, 30], [0, 0, 10, 5]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.5, 0.7], dtype=np.float32)
+    # Box 0 overlaps box 1 (IoU 0.82); box 3 overlaps box 1 at IoU 0.43, under 0.5 but not 0.4
+    assert nms(boxes, scores, 0.5).tolist() == [1, 3, 2]
+    assert nms(boxes, scores, 0.4).tolist() == [1, 2]
+
+
+def test_postprocess_suppresses_per_class_only():
+    output = anchors(
+        (50, 50, 20, 20, 0, 0.9),
+        (51, 50, 20, 20, 0, 0.8),   # Same class, overlapping: suppressed
+        (50, 50, 20, 20, 1, 0.7),   # Other class on the same spot: kept
+    )
+    detections = postprocess(output, 0.25, 0.5)
+    assert detections.dtype == np.float32
+    np.testing.assert_allclose(detections, [[40, 40, 60, 60, 0.9, 0], [40, 40, 60, 60, 0.7, 1]])
+
+
+def test_postprocess_drops_scores_at_or_below_conf():
+    output = anchors((50, 50, 20, 20, 0, 0.3), (150, 50, 20, 20, 1, 0.25), (250, 50, 20, 20, 0, 0.1))
+    detections = postprocess(output, 0.25, 0.5)
+    assert detections[:, 4].tolist() == [pytest.approx(0.3)]
+    assert postprocess(output, 0.5, 0.5).shape == (0, 6)
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.ml.inference.batching import BatchScheduler
+
+
+class RecordingDetector:
+    """detect_batch stand-in returning one detection naming its image, recording each batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images):
+        self.batches.append(list(images))
+        return [[{"image": image}] for image in images]
+
+
+async def submit_all(scheduler, images):
+    try:
+        return await asyncio.gather(*(scheduler.submit(image) for image in images), return_exceptions=True)
+    finally:
+        await scheduler.close()
+
+
+def test_requests_within_the_window_share_one_forward():
+    detector = RecordingDetector()
+
+    async def scenario():
+        scheduler = BatchScheduler(detector, max_batch_size=8, window_ms=50)
+
+        async def late(image, delay):
+            await asyncio.sleep(delay)
+            return await scheduler.submit(image)
+
+        try:
+            return await asyncio.gather(late("a", 0), late("b", 0.01), late("c", 0.02))
+        finally:
+            await scheduler.close()
+
+    results = asyncio.run(scenario())
+    assert detector.batches == [["a", "b", "c"]]
+    assert results == [[{"image": "a"}], [{"image": "b"}], [{"image": "c"}]]
+
+
+def test_max_batch_size_splits_larger_groups():
+    detector = RecordingDetector()
+    scheduler = BatchScheduler(detector, max_batch_size=2, window_ms=20)
+    results = asyncio.run(submit_all(scheduler, list("abcde")))
+    assert sorted(map(len, detector.batches)) == [1, 2, 2]
+    assert results == [[{"image": image}] for image in "abcde"]
+    stats = scheduler.stats()
+    assert stats["batches_total"] == 3 and stats["requests_total"] == 5
+    assert stats["batch_size_histogram"] == {"1": 1, "2": 2}
+
+
+def test_a_failed_forward_reaches_every_request_in_the_batch():
+    def detect_batch(images):
+        raise RuntimeError("forward failed")
+
+    scheduler = BatchScheduler(detect_batch, max_batch_size=8, window_ms=20)
+    results = asyncio.run(submit_all(scheduler, ["a", "b", "c"]))
+    assert [str(result) for result in results] == ["forward failed"] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # The loop keeps serving after a failure
+    detector = RecordingDetector()
+    scheduler.detect_batch = detector
+    assert asyncio.run(submit_all(scheduler, ["d"])) == [[{"image": "d"}]]
+
+
+@pytest.mark.parametrize("concurrent, overlapped", [(2, True), (1, False)])
+def test_batches_run_concurrently_up_to_the_limit(concurrent, overlapped):
+    # Both single-image batches wait for each other, which only works when they run at the same time
+    barrier = threading.Barrier(2, timeout=0.5)
+
+    def detect_batch(images):
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            return [["alone"] for _ in images]
+        return [["together"] for _ in images]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        scheduler = BatchScheduler(detect_batch, max_batch_size=1, window_ms=0, executor=executor,
+                                   max_concurrent_batches=concurrent)
+        results = asyncio.run(submit_all(scheduler, ["a", "b"]))
+    assert (results == [["together"], ["together"]]) is overlapped
+    assert scheduler.stats()["max_concurrent_batches"] == concurrent
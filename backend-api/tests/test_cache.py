@@ -0,0 +1,97 @@
+import asyncio
+import os
+
+from app.ml.inference import cache as cache_module
+from app.ml.inference.cache import DetectionCache
+
+DETECTIONS = [{"class_id": 20, "class_name": "rice", "confidence": 0.9, "bbox": [1.0, 2.0, 3.0, 4.0], "area": 4.0}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_key_depends_on_content_model_and_thresholds():
+    key = DetectionCache.make_key(b"image", "best.pt:1:2|decode=640", 0.25, 0.5)
+    assert key == DetectionCache.make_key(b"image", "best.pt:1:2|decode=640", 0.25, 0.5)
+    assert key != DetectionCache.make_key(b"other", "best.pt:1:2|decode=640", 0.25, 0.5)
+    assert key != DetectionCache.make_key(b"image", "best.pt:1:3|decode=640", 0.25, 0.5)
+    assert key != DetectionCache.make_key(b"image", "best.pt:1:2|decode=640", 0.3, 0.5)
+    assert key != DetectionCache.make_key(b"image", "best.pt:1:2|decode=640", 0.25, 0.45)
+
+
+def test_get_and_put_count_hits_and_misses():
+    cache = DetectionCache()
+    assert cache.get("a") is None
+    cache.put("a", DETECTIONS)
+    assert cache.get("a") == DETECTIONS
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction_by_entry_count():
+    cache = DetectionCache(max_entries=2)
+    cache.put("a", DETECTIONS)
+    cache.put("b", DETECTIONS)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", DETECTIONS)
+    assert cache.get("b") is None
+    assert cache.get("a") == DETECTIONS
+    assert cache.get("c") == DETECTIONS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_estimated_bytes():
+    entry_bytes = cache_module.ENTRY_OVERHEAD_BYTES + cache_module.DETECTION_SIZE_BYTES
+    cache = DetectionCache(max_bytes=2 * entry_bytes)
+    for key in "abc":
+        cache.put(key, DETECTIONS)
+    assert cache.get("a") is None
+    assert cache.stats()["estimated_bytes"] == 2 * entry_bytes
+
+
+def test_entry_larger_than_the_cache_is_not_stored():
+    cache = DetectionCache(max_bytes=cache_module.ENTRY_OVERHEAD_BYTES)
+    cache.put("a", DETECTIONS)
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = DetectionCache(ttl_seconds=60)
+    cache.put("a", DETECTIONS)
+    clock.now += 59
+    assert cache.get("a") == DETECTIONS
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["entries"], stats["estimated_bytes"]) == (1, 0, 0)
+
+
+def test_disk_tier_survives_a_new_cache_instance(tmp_path):
+    first = DetectionCache(disk_dir=str(tmp_path))
+    asyncio.run(first.aput("a", DETECTIONS))
+
+    second = DetectionCache(disk_dir=str(tmp_path))
+    assert asyncio.run(second.aget("a")) == DETECTIONS
+    assert second.stats()["disk_hits"] == 1
+    assert second.get("a") == DETECTIONS  # Promoted into memory
+    assert asyncio.run(second.aget("missing")) is None
+    assert second.stats()["misses"] == 1
+
+
+def test_prune_disk_keeps_the_newest_entries(tmp_path):
+    cache = DetectionCache(disk_dir=str(tmp_path), disk_max_entries=2)
+    for index, key in enumerate("abc"):
+        cache.save_to_disk(key, DETECTIONS)
+        path = tmp_path / f"{key}.json"
+        mtime = 1_000_000 + index
+        os.utime(path, (mtime, mtime))
+    cache.prune_disk()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.json", "c.json"]
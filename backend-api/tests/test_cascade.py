@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.core.config import settings
+from app.ml.inference.backends import InferenceBackend
+from app.ml.inference.cascade import ACCURATE_STAGE, FAST_STAGE, ModelCascade
+from app.ml.inference.food_detector import FoodDetector
+
+
+class FixedBackend(InferenceBackend):
+    """Returns one box per image with the confidence given for that image, recording each call"""
+
+    def __init__(self, confidences):
+        super().__init__("fixed.pt")
+        self.confidences = confidences
+        self.calls = []
+
+    def predict(self, images, conf, iou, image_size=0):
+        self.calls.append((len(images), conf, image_size))
+        boxes = [np.array([[0, 0, 10, 10, self.confidences[int(image[0, 0, 0])], 1]], dtype=np.float32)
+                 for image in images]
+        return [b[b[:, 4] >= conf] for b in boxes]
+
+
+def images(count):
+    return [np.full((4, 4, 3), index, dtype=np.uint8) for index in range(count)]
+
+
+def test_only_uncertain_images_are_escalated():
+    fast = FixedBackend([0.9, 0.3, 0.1])
+    accurate = FixedBackend([0.8, 0.7, 0.6])
+    boxes, stages = ModelCascade(fast, accurate, (0.2, 0.5), escalate_empty=True).predict(images(3), 0.25, 0.5)
+    # Image 1 is in the band; image 2 has no box at 0.2 and counts as empty
+    assert stages == [(FAST_STAGE,), (FAST_STAGE, ACCURATE_STAGE), (FAST_STAGE, ACCURATE_STAGE)]
+    assert [b[0, 4] for b in boxes] == [np.float32(0.9), np.float32(0.7), np.float32(0.6)]
+    assert fast.calls == [(3, 0.2, 0)]
+    assert accurate.calls[0][:2] == (2, 0.25)
+
+
+def test_fast_pass_runs_at_fast_image_size():
+    backend = FixedBackend([0.3])
+    cascade = ModelCascade(backend, backend, (0.2, 0.5), fast_image_size=320)
+    cascade.predict(images(1), 0.25, 0.5)
+    assert backend.calls == [(1, 0.2, 320), (1, 0.25, 0)]
+    assert cascade.stats()["escalation_rate"] == 1.0
+
+
+def test_detector_reuses_its_model_for_the_fast_pass(monkeypatch):
+    monkeypatch.setattr(settings, "CASCADE_ENABLED", True)
+    monkeypatch.setattr(settings, "CASCADE_FAST_MODEL_PATH", "")
+    monkeypatch.setattr(settings, "TILING_ENABLED", False)
+    detector = FoodDetector("missing.pt", backend="stub")
+    assert detector.cascade.fast is detector.backend
+    assert detector.cascade.fast_image_size == settings.CASCADE_FAST_IMAGE_SIZE
+
+    monkeypatch.setattr(settings, "CASCADE_FAST_MODEL_PATH", "fast.pt")
+    detector = FoodDetector("missing.pt", backend="stub")
+    assert detector.cascade.fast is not detector.backend
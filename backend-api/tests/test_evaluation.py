@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml.evaluation import (
+    average_precision,
+    compute_metrics,
+    count_matches,
+    label_path,
+    match_predictions,
+    read_labels
+)
+
+# Ground truth rows are [x1, y1, x2, y2, class_id]; predictions [x1, y1, x2, y2, confidence, class_id]
+LABEL = np.array([[0, 0, 10, 10, 0]], dtype=np.float32)
+
+
+def prediction(box, confidence, class_id=0):
+    return [*box, confidence, class_id]
+
+
+def metrics(predictions, labels):
+    boxes = np.array(predictions, dtype=np.float32).reshape(-1, 6)
+    correct = match_predictions(boxes, labels)
+    return compute_metrics(correct, boxes[:, 4], boxes[:, 5], labels[:, 4])
+
+
+def test_perfect_match_scores_one():
+    result = metrics([prediction([0, 0, 10, 10], 0.9)], LABEL)
+    assert result["map50"] == 1.0
+    assert result["map50_95"] == 1.0
+    assert result["precision"] == pytest.approx(1.0) and result["recall"] == pytest.approx(1.0)
+
+
+def test_match_counts_only_the_thresholds_the_iou_reaches():
+    # IoU 0.72 clears 0.50, 0.55, 0.60, 0.65 and 0.70
+    correct = match_predictions(np.array([prediction([0, 0, 10, 7.2], 0.9)], dtype=np.float32), LABEL)
+    assert correct[0].tolist() == [True] * 5 + [False] * 5
+
+
+def test_each_label_matches_one_prediction_highest_iou_first():
+    boxes = np.array([prediction([0, 0, 10, 8], 0.9), prediction([0, 0, 10, 10], 0.5)], dtype=np.float32)
+    correct = match_predictions(boxes, LABEL)
+    assert not correct[0, 0] and correct[1].all()
+
+
+def test_false_positive_ranked_above_true_positive():
+    # Sorted: FP then TP -> precision [0, 0.5] over recall [0, 1]; the envelope is 0.5 everywhere
+    result = metrics([prediction([50, 50, 60, 60], 0.9), prediction([0, 0, 10, 10], 0.8)], LABEL)
+    assert result["map50"] == pytest.approx(0.5)
+    assert result["map50_95"] == pytest.approx(0.5)
+
+
+def test_missed_ground_truth_caps_recall():
+    labels = np.array([[0, 0, 10, 10, 0], [50, 50, 60, 60, 0]], dtype=np.float32)
+    # Recall reaches 0.5 at precision 1: the 51 recall points 0.00..0.50 score 1, the rest 0
+    result = metrics([prediction([0, 0, 10, 10], 0.9)], labels)
+    assert result["map50"] == pytest.approx(51 / 101)
+    assert result["recall"] == pytest.approx(0.5)
+
+
+def test_matching_is_per_class():
+    assert not match_predictions(np.array([prediction([0, 0, 10, 10], 0.9, class_id=1)], dtype=np.float32),
+                                 LABEL).any()
+    labels = np.array([[0, 0, 10, 10, 0], [20, 20, 30, 30, 1]], dtype=np.float32)
+    # Class 1's box lands on class 0's label: class 0 is found, class 1 is not
+    result = metrics([prediction([0, 0, 10, 10], 0.9, class_id=0), prediction([0, 0, 10, 10], 0.8, class_id=1)],
+                     labels)
+    assert result["per_class"][0] == {"labels": 1, "ap50": 1.0, "ap50_95": 1.0}
+    assert result["per_class"][1]["ap50"] == 0.0
+    assert result["map50"] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("recall, precision, expected", [
+    # TP, FP, TP over two labels: envelope 1.0 up to recall 0.5, then 2/3 (51 and 50 of the 101 points)
+    ([0.5, 0.5, 1.0], [1.0, 0.5, 2 / 3], (51 + 50 * 2 / 3) / 101),
+    # FP, TP, FP, TP over two labels: envelope 0.5 to recall 0.5, then 0.5
+    ([0.0, 0.5, 0.5, 1.0], [0.0, 0.5, 1 / 3, 0.5], 0.5),
+    # Recall stops at 0.3: points 0.00..0.30 score 1
+    ([0.3], [1.0], 31 / 101),
+    ([0.1, 0.2], [0.0, 0.0], 0.0),
+])
+def test_average_precision_matches_coco_101_point(recall, precision, expected):
+    assert average_precision(np.array(recall), np.array(precision)) == pytest.approx(expected)
+
+
+def test_no_predictions_score_zero():
+    result = metrics([], LABEL)
+    assert result["map50"] == 0.0 and result["per_class"][0]["labels"] == 1
+
+
+def test_count_matches_is_one_to_one():
+    boxes = np.array([prediction([0, 0, 10, 10], 0.9), prediction([0, 0, 10, 9], 0.8)], dtype=np.float32)
+    assert count_matches(LABEL[:, :4], LABEL[:, 4], boxes, 0.5) == 1
+
+
+def test_read_labels_converts_yolo_rows_to_pixels(tmp_path: Path):
+    image = tmp_path / "valid" / "images" / "plate.jpg"
+    label = label_path(image)
+    assert label == tmp_path / "valid" / "labels" / "plate.txt"
+    label.parent.mkdir(parents=True)
+    label.write_text("3 0.5 0.25 0.2 0.5\n")
+    np.testing.assert_allclose(read_labels(label, 200, 100), [[80, 0, 120, 50, 3]])
+    assert read_labels(tmp_path / "missing.txt", 200, 100).shape == (0, 5)
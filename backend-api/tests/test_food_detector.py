@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.core.config import settings
+from app.ml.inference.food_detector import FoodDetector
+
+
+def make_detector(**overrides) -> FoodDetector:
+    detector = FoodDetector("missing.pt", load_model=False)
+    detector.class_names = ["rice", "tomato"]
+    for name, value in overrides.items():
+        setattr(detector, name, value)
+    return detector
+
+
+def test_thresholds_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CONFIDENCE_THRESHOLD", 0.4)
+    monkeypatch.setattr(settings, "IOU_THRESHOLD", 0.6)
+    detector = FoodDetector("missing.pt", load_model=False)
+    assert (detector.confidence_threshold, detector.iou_threshold) == (0.4, 0.6)
+    assert detector.get_model_info()["confidence_threshold"] == 0.4
+
+
+def test_to_detections_rounds_and_names_classes():
+    detector = make_detector(bbox_decimals=1, confidence_decimals=4)
+    boxes = np.array([
+        [10.04, 20.0, 30.96, 40.0, 0.876543, 1],
+        [0.0, 0.0, 5.0, 4.0, 0.3, 7],
+    ], dtype=np.float32)
+    detections = detector._to_detections(boxes)
+    assert detections[0] == {
+        "class_id": 1,
+        "class_name": "tomato",
+        "confidence": 0.8765,
+        "bbox": [10.0, 20.0, 31.0, 40.0],
+        "area": 418.4
+    }
+    assert detections[1]["class_name"] == "class_7"
+    assert all(isinstance(value, float) for value in detections[0]["bbox"])
+
+
+def test_to_detections_without_rounding_and_without_boxes():
+    detector = make_detector(bbox_decimals=-1, confidence_decimals=-1)
+    boxes = np.array([[0.0, 0.0, 1.5, 2.0, 0.5, 0]], dtype=np.float32)
+    assert detector._to_detections(boxes)[0]["area"] == 3.0
+    assert detector._to_detections(np.zeros((0, 6), dtype=np.float32)) == []
@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import ml
+from app.core.config import settings
+from app.ml.inference.executor import InferencePool, InferenceQueueFull, InferenceTimeout
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(max_workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_admit_rejects_beyond_workers_plus_queue(pool):
+    with pool.admit(), pool.admit():
+        assert pool.in_flight == 2
+        with pytest.raises(InferenceQueueFull):
+            with pool.admit():
+                pass
+    assert pool.in_flight == 0
+    with pool.admit():
+        pass
+    stats = pool.stats()
+    assert stats["admitted_total"] == 3 and stats["rejected_total"] == 1
+
+
+def test_full_queue_answers_503_with_retry_after(pool, monkeypatch):
+    monkeypatch.setattr(ml, "inference_pool", pool)
+    monkeypatch.setattr(settings, "BATCHING_ENABLED", False)
+    pool.in_flight = pool.capacity
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ml.infer_on_pool(b"image", None))
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)}
+    assert pool.rejected_total == 1
+
+
+def test_worker_timeout_answers_504(pool, monkeypatch):
+    async def run(fn, *args):
+        raise InferenceTimeout("Inference worker 0 did not answer within 1s")
+
+    monkeypatch.setattr(ml, "inference_pool", pool)
+    monkeypatch.setattr(settings, "BATCHING_ENABLED", False)
+    monkeypatch.setattr(pool, "run", run)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ml.infer_on_pool(b"image", SimpleNamespace(detect_from_bytes=lambda image_bytes: [])))
+    assert error.value.status_code == 504
+    # The admission slot is given back
+    assert pool.in_flight == 0
@@ -0,0 +1,55 @@
+import pytest
+
+from app.services.meal_analyzer import MealAnalyzer
+
+
+def detection(class_name, confidence, area):
+    return {"class_id": 0, "class_name": class_name, "confidence": confidence, "bbox": [0, 0, 1, 1], "area": area}
+
+
+def test_analyze_counts_and_confidence_summary():
+    analysis = MealAnalyzer().analyze([
+        detection("rice", 0.95, 300.0),
+        detection("rice", 0.6, 100.0),
+        detection("tomato", 0.4, 100.0),
+    ])
+    assert analysis["total_food_items"] == 3
+    assert analysis["unique_food_types"] == 2
+    assert analysis["food_distribution"] == {"rice": 2, "tomato": 1}
+    assert analysis["confidence_summary"] == {"high_confidence": 1, "medium_confidence": 1, "low_confidence": 1}
+    assert analysis["total_food_area"] == 500.0
+
+
+def test_summary_bounds_match_the_original_buckets():
+    # 0.5 and 0.7 are both "medium"; only values above 0.7 are "high"
+    summary = MealAnalyzer().analyze([detection("rice", 0.5, 1.0), detection("rice", 0.7, 1.0)])["confidence_summary"]
+    assert summary == {"high_confidence": 0, "medium_confidence": 2, "low_confidence": 0}
+
+
+def test_confidence_histogram_uses_the_configured_edges():
+    analyzer = MealAnalyzer((0.9, 0.5, 1.5))
+    histogram = analyzer.analyze([
+        detection("rice", 0.2, 1.0),
+        detection("rice", 0.5, 1.0),
+        detection("rice", 0.95, 1.0),
+    ])["confidence_histogram"]
+    assert histogram == {"edges": [0.0, 0.5, 0.9, 1.0], "counts": [1, 1, 1]}
+
+
+def test_class_stats():
+    stats = MealAnalyzer().analyze([
+        detection("rice", 0.9, 300.0),
+        detection("rice", 0.7, 100.0),
+        detection("tomato", 0.8, 100.0),
+    ])["class_stats"]
+    assert stats["rice"]["count"] == 2
+    assert stats["rice"]["mean_confidence"] == pytest.approx(0.8)
+    assert stats["rice"]["area"] == 400.0
+    assert stats["rice"]["area_fraction"] == pytest.approx(0.8)
+
+
+def test_analyze_without_detections():
+    analysis = MealAnalyzer().analyze([])
+    assert analysis["total_food_items"] == 0
+    assert analysis["class_stats"] == {}
+    assert analysis["confidence_histogram"]["counts"] == [0, 0, 0, 0]
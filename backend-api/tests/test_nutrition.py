@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.nutrition import NUTRITION_TABLE, NutritionEstimator, image_area
+
+CLASS_NAMES = ["rice", "tomato", "mystery dish"]
+# Reference area: 8% of a 1000 x 1000 photo is one serving
+IMAGE_AREA = 1_000_000.0
+
+
+def detection(class_id, area=80_000.0):
+    class_name = CLASS_NAMES[class_id] if 0 <= class_id < len(CLASS_NAMES) else f"class_{class_id}"
+    return {"class_id": class_id, "class_name": class_name, "confidence": 0.9, "bbox": [0, 0, 1, 1], "area": area}
+
+
+def test_one_serving_at_the_reference_area():
+    nutrition = NutritionEstimator(CLASS_NAMES).estimate([detection(0)], IMAGE_AREA)
+    kcal, *_, serving = NUTRITION_TABLE["rice"]
+    item = nutrition["items"][0]
+    assert item["class_id"] == 0 and item["class_name"] == "rice"
+    assert item["grams"] == serving
+    assert item["calories"] == pytest.approx(kcal * serving / 100, abs=0.05)
+    assert nutrition["totals"]["calories"] == item["calories"]
+    assert nutrition["unknown_items"] == 0
+
+
+def test_portions_scale_with_area_and_are_clipped():
+    estimator = NutritionEstimator(CLASS_NAMES, portion_range=(0.5, 2.0))
+    serving = NUTRITION_TABLE["rice"][-1]
+    grams = [item["grams"] for item in estimator.estimate([
+        detection(0, area=120_000.0),   # 1.5 servings
+        detection(0, area=1_000.0),     # Clipped up to 0.5
+        detection(0, area=900_000.0),   # Clipped down to 2
+    ], IMAGE_AREA)["items"]]
+    assert grams == [serving * 1.5, serving * 0.5, serving * 2.0]
+
+
+def test_unknown_image_size_counts_one_serving_per_item():
+    nutrition = NutritionEstimator(CLASS_NAMES).estimate([detection(1, area=500_000.0)])
+    assert nutrition["items"][0]["grams"] == NUTRITION_TABLE["tomato"][-1]
+
+
+def test_classes_without_data_count_as_unknown():
+    nutrition = NutritionEstimator(CLASS_NAMES).estimate([detection(2), detection(7), detection(-1), detection(1)],
+                                                         IMAGE_AREA)
+    assert nutrition["unknown_items"] == 3
+    assert all(item["calories"] == 0.0 for item in nutrition["items"][:3])
+    # Ids outside the model's classes are left out of by_class; known classes without data show zeros
+    assert sorted(nutrition["by_class"]) == ["mystery dish", "tomato"]
+    assert nutrition["by_class"]["mystery dish"]["calories"] == 0.0
+    assert nutrition["totals"]["grams"] == NUTRITION_TABLE["tomato"][-1]
+
+
+def test_by_class_sums_items():
+    nutrition = NutritionEstimator(CLASS_NAMES).estimate([detection(0), detection(1), detection(0, 40_000.0)],
+                                                         IMAGE_AREA)
+    rice = [item for item in nutrition["items"] if item["class_name"] == "rice"]
+    assert nutrition["by_class"]["rice"]["calories"] == pytest.approx(sum(i["calories"] for i in rice), abs=0.05)
+    assert nutrition["totals"]["grams"] == pytest.approx(sum(i["grams"] for i in nutrition["items"]), abs=0.05)
+
+
+def test_estimate_batch_matches_plate_by_plate():
+    estimator = NutritionEstimator(CLASS_NAMES)
+    plates = [([detection(0), detection(1)], IMAGE_AREA), ([], None), ([detection(1, 40_000.0)], IMAGE_AREA / 2)]
+    assert estimator.estimate_batch(plates) == [estimator.estimate(*plate) for plate in plates]
+    assert estimator.estimate_batch([]) == []
+
+
+def test_estimate_images_reads_the_size_from_each_upload():
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((500, 400, 3), dtype=np.uint8)).save(buffer, format="PNG")
+    data = buffer.getvalue()
+    assert image_area(data) == 200_000.0
+    assert image_area(b"not an image") is None
+
+    estimator = NutritionEstimator(CLASS_NAMES)
+    plates = [[detection(0, area=16_000.0)], [detection(0, area=16_000.0)]]
+    sized, unsized = estimator.estimate_images(plates, [data, b"not an image"])
+    assert sized == estimator.estimate(plates[0], 200_000.0)
+    assert unsized == estimator.estimate(plates[1])
@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.ml.inference.preprocessing import (
+    EXIF_ORIENTATION_TAG,
+    PreparedImage,
+    decode_for_inference,
+    read_header,
+    reduction_factor
+)
+
+
+def jpeg_bytes(width: int, height: int, orientation: int = 1) -> bytes:
+    """A JPEG whose left half is white, with an optional EXIF orientation"""
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:, :width // 2] = 255
+    exif = Image.Exif()
+    if orientation != 1:
+        exif[EXIF_ORIENTATION_TAG] = orientation
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", exif=exif.tobytes(), quality=95)
+    return buffer.getvalue()
+
+
+def test_read_header_returns_size_and_orientation():
+    assert read_header(jpeg_bytes(64, 48, orientation=6)) == (64, 48, 6)
+    assert read_header(b"not an image") is None
+
+
+def test_reduction_factor_keeps_long_side_above_target():
+    assert reduction_factor(4032, 3024, 640) == 4
+    assert reduction_factor(4032, 3024, 1920) == 2
+    assert reduction_factor(1000, 800, 640) == 1
+    assert reduction_factor(6000, 4000, 640) == 8
+    assert reduction_factor(4032, 3024, 0) == 1
+
+
+def test_decode_reduces_large_uploads():
+    prepared = decode_for_inference(jpeg_bytes(2560, 1920), target_size=640)
+    assert prepared.image.shape[:2] == (480, 640)
+    assert prepared.original_size == (2560, 1920)
+    assert (prepared.scale_x, prepared.scale_y) == (4.0, 4.0)
+
+
+def test_decode_applies_exif_orientation():
+    prepared = decode_for_inference(jpeg_bytes(80, 40, orientation=6), target_size=0)
+    # Rotated 90 degrees clockwise: the white left half ends up at the top
+    assert prepared.image.shape[:2] == (80, 40)
+    assert prepared.original_size == (40, 80)
+    assert prepared.orientation == 6
+    assert prepared.image[5, 20].mean() > 200
+    assert prepared.image[75, 20].mean() < 50
+
+
+def test_decode_can_ignore_exif_orientation():
+    prepared = decode_for_inference(jpeg_bytes(80, 40, orientation=6), target_size=0, apply_exif_orientation=False)
+    assert prepared.image.shape[:2] == (40, 80)
+    assert prepared.original_size == (80, 40)
+
+
+def test_decode_rejects_undecodable_data():
+    assert decode_for_inference(b"\xff\xd8 truncated") is None
+
+
+def test_restore_boxes_maps_back_to_original_pixels():
+    prepared = PreparedImage(np.zeros((100, 200, 3), dtype=np.uint8), (800, 300))
+    boxes = np.array([[10, 20, 30, 40, 0.9, 3]], dtype=np.float32)
+    restored = prepared.restore_boxes(boxes)
+    np.testing.assert_allclose(restored, [[40, 60, 120, 120, 0.9, 3]])
+    assert boxes[0, 0] == 10  # The input is left untouched
+
+
+def test_restore_boxes_is_a_no_op_at_full_size():
+    prepared = PreparedImage(np.zeros((100, 200, 3), dtype=np.uint8), (200, 100))
+    boxes = np.array([[10, 20, 30, 40, 0.9, 3]], dtype=np.float32)
+    assert not prepared.reduced
+    assert prepared.restore_boxes(boxes) is boxes
@@ -0,0 +1,149 @@
+import os
+import random
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.ml.inference.loader import ModelNotReady
+from app.ml.inference.registry import ACTIVE, CANDIDATE, ModelRegistry, resolve_model_path
+
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(settings, "STUB_FORWARD_MS", 0.0)
+    monkeypatch.setattr(settings, "STUB_PER_IMAGE_MS", 0.0)
+    monkeypatch.setattr(settings, "CASCADE_ENABLED", False)
+    monkeypatch.setattr(settings, "TILING_ENABLED", False)
+
+
+@pytest.fixture
+def weights(tmp_path):
+    """Return a function creating an (empty) weights file; the stub backend never reads it"""
+    def make(name):
+        path = tmp_path / name
+        path.touch()
+        return str(path)
+    return make
+
+
+def make_registry(model_path="v1.pt"):
+    registry = ModelRegistry(model_path, warmup_runs=0)
+    registry.load_initial()
+    return registry
+
+
+def load(registry, model_path, role=ACTIVE):
+    """Load a version through the background thread and wait until the registry has settled"""
+    version = registry.load(model_path, role)
+    deadline = time.monotonic() + 10
+    while (registry._loading is not None or version.loader.state in ("pending", "loading")) \
+            and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return version
+
+
+def test_serve_raises_until_the_first_version_is_loaded():
+    registry = ModelRegistry("v1.pt", warmup_runs=0)
+    with pytest.raises(ModelNotReady):
+        with registry.serve():
+            pass
+    registry.load_initial()
+    with registry.serve() as version:
+        assert version is registry.active and version.in_flight == 1
+    assert version.in_flight == 0
+
+
+def test_candidate_receives_its_traffic_fraction(weights):
+    registry = make_registry()
+    candidate = load(registry, weights("v2.pt"), CANDIDATE)
+    assert registry.candidate is candidate
+
+    def candidate_share(requests=2000):
+        served = 0
+        for _ in range(requests):
+            with registry.serve() as version:
+                served += version is candidate
+        return served / requests
+
+    random.seed(0)
+    registry.candidate_traffic = 0.25
+    assert candidate_share() == pytest.approx(0.25, abs=0.04)
+    registry.candidate_traffic = 0.0
+    assert candidate_share() == 0.0
+    registry.candidate_traffic = 1.0
+    assert candidate_share() == 1.0
+
+
+def test_replaced_version_is_released_after_its_last_request(weights):
+    registry = make_registry()
+    with registry.serve() as old:
+        new = load(registry, weights("v2.pt"))
+        assert registry.active is new
+        # Retired, but the in-flight request keeps its model
+        assert old.role == "retired" and old.detector is not None
+        with registry.serve() as version:
+            assert version is new
+    assert old.in_flight == 0 and old.detector is None
+    assert new.detector is not None
+
+
+def test_promote_and_remove_release_only_idle_versions(weights):
+    registry = make_registry()
+    first = registry.active
+    candidate = load(registry, weights("v2.pt"), CANDIDATE)
+    with registry.serve() as held:
+        assert held is first
+        assert registry.promote() is candidate
+        assert registry.active is candidate and registry.candidate is None
+        assert first.detector is not None
+    assert first.detector is None
+
+    second = load(registry, weights("v3.pt"), CANDIDATE)
+    assert registry.remove_candidate() is second
+    assert second.role == "retired" and second.detector is None
+    assert registry.active is candidate and candidate.detector is not None
+
+
+def test_failed_load_keeps_the_active_version(weights, monkeypatch):
+    registry = make_registry()
+    active = registry.active
+    monkeypatch.setattr(settings, "MODEL_BACKEND", "no-such-backend")
+    failed = load(registry, weights("broken.pt"))
+    assert failed.role == "failed" and failed.loader.state == "failed"
+    assert registry.active is active and active.detector is not None
+    with registry.serve() as version:
+        assert version is active
+    stats = registry.stats()
+    assert stats["active"] == active.version_id and stats["loading"] is None
+    assert [v["role"] for v in stats["versions"]] == [ACTIVE, "failed"]
+    assert stats["versions"][1]["model_file"] == "broken.pt"
+
+
+def test_errors_and_latency_are_counted_per_version():
+    registry = make_registry()
+    with pytest.raises(RuntimeError):
+        with registry.serve():
+            raise RuntimeError("inference failed")
+    with registry.serve() as version:
+        version.record(images=2, detections=3, seconds=0.02)
+    stats = version.stats()
+    assert stats["errors_total"] == 1 and stats["requests_total"] == 1
+    assert stats["mean_detections_per_image"] == 1.5
+    assert stats["latency_ms"]["p50"] == pytest.approx(20.0)
+
+
+def test_resolve_model_path_stays_inside_the_models_directory(tmp_path):
+    models = tmp_path / "models"
+    models.mkdir()
+    (models / "best.pt").touch()
+    (tmp_path / "outside.pt").touch()
+    os.symlink(tmp_path / "outside.pt", models / "escape.pt")
+    os.symlink(models / "best.pt", models / "alias.pt")
+
+    assert resolve_model_path(str(models / "best.pt"), str(models)) == str((models / "best.pt").resolve())
+    assert resolve_model_path(str(models / "alias.pt"), str(models)) == str((models / "best.pt").resolve())
+    for path in (models / ".." / "outside.pt", models / "escape.pt", tmp_path / "models-other" / "x.pt", "/etc/passwd"):
+        with pytest.raises(ValueError):
+            resolve_model_path(str(path), str(models))
@@ -0,0 +1,86 @@
+import msgpack
+import numpy as np
+import pytest
+from starlette.requests import Request
+
+from app.utils.responses import (
+    COLUMNAR_MEDIA_TYPE,
+    DETECTION_MEDIA_TYPES,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    detection_response,
+    negotiate,
+    pack_detections
+)
+
+DETECTIONS = [
+    {"class_id": 20, "class_name": "rice", "confidence": 0.91, "bbox": [1.5, 2.0, 30.25, 40.0], "area": 1149.5},
+    {"class_id": 29, "class_name": "tomato", "confidence": 0.42, "bbox": [5.0, 6.0, 7.0, 8.0], "area": 4.0},
+    {"class_id": 20, "class_name": "rice", "confidence": 0.6, "bbox": [0.0, 0.0, 1.0, 1.0], "area": 1.0},
+]
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, JSON_MEDIA_TYPE),
+    ("", JSON_MEDIA_TYPE),
+    ("*/*", JSON_MEDIA_TYPE),
+    ("application/*", JSON_MEDIA_TYPE),
+    ("text/html", JSON_MEDIA_TYPE),
+    ("application/msgpack", MSGPACK_MEDIA_TYPE),
+    ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+    ("Application/MsgPack ; charset=binary", MSGPACK_MEDIA_TYPE),
+    (COLUMNAR_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE),
+    ("application/json;q=0.5, application/msgpack", MSGPACK_MEDIA_TYPE),
+    ("application/json, application/msgpack", JSON_MEDIA_TYPE),
+    ("application/msgpack;q=0.9, */*;q=0.1", MSGPACK_MEDIA_TYPE),
+    # The specific range decides for JSON, not the wildcard
+    ("application/json;q=0, */*", MSGPACK_MEDIA_TYPE),
+    ("application/msgpack;q=bad", JSON_MEDIA_TYPE),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept, DETECTION_MEDIA_TYPES) == expected
+
+
+def test_pack_detections_round_trips_through_numpy():
+    packed = pack_detections(DETECTIONS)
+    assert packed["count"] == 3
+    assert packed["class_names"] == {"20": "rice", "29": "tomato"}
+    dtypes = packed["dtypes"]
+    assert dtypes["class_ids"] == "<u1"
+    np.testing.assert_array_equal(np.frombuffer(packed["class_ids"], dtypes["class_ids"]), [20, 29, 20])
+    np.testing.assert_allclose(np.frombuffer(packed["confidence"], dtypes["confidence"]), [0.91, 0.42, 0.6],
+                               rtol=1e-6)
+    np.testing.assert_allclose(np.frombuffer(packed["bbox"], dtypes["bbox"]).reshape(-1, 4),
+                               [d["bbox"] for d in DETECTIONS])
+    np.testing.assert_allclose(np.frombuffer(packed["area"], dtypes["area"]), [1149.5, 4.0, 1.0])
+
+
+def test_pack_detections_widens_large_class_ids_and_handles_no_detections():
+    packed = pack_detections([{**DETECTIONS[0], "class_id": 300}])
+    assert packed["dtypes"]["class_ids"] == "<u2"
+    assert np.frombuffer(packed["class_ids"], "<u2").tolist() == [300]
+
+    empty = pack_detections([])
+    assert empty["count"] == 0
+    assert empty["class_ids"] == empty["bbox"] == b""
+
+
+def make_request(accept: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [(b"accept", accept.encode())]})
+
+
+def test_detection_response_encodes_the_negotiated_format():
+    content = {"success": True, "detections": DETECTIONS}
+
+    response = detection_response(make_request("application/json"), content)
+    assert response.media_type == JSON_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+
+    response = detection_response(make_request("application/msgpack"), content)
+    assert msgpack.unpackb(response.body) == content
+
+    response = detection_response(make_request(COLUMNAR_MEDIA_TYPE), content)
+    assert response.media_type == COLUMNAR_MEDIA_TYPE
+    body = msgpack.unpackb(response.body)
+    assert body["success"] is True
+    assert body["detections"]["layout"] == "columnar"
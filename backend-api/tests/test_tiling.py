@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from app.ml.inference.backends import InferenceBackend
+from app.ml.inference.tiling import TiledBackend, merge_detections, tile_windows
+
+
+class EdgeBoxBackend(InferenceBackend):
+    """Returns one 40 px box touching the right edge of every crop, 10 px below its top"""
+
+    thread_safe = True
+
+    def __init__(self):
+        super().__init__("edge.pt")
+        self.crop_sizes = []
+
+    def predict(self, images, conf, iou, image_size=0):
+        boxes = []
+        for image in images:
+            height, width = image.shape[:2]
+            self.crop_sizes.append((width, height))
+            boxes.append(np.array([[width - 40, 10, width, 50, 0.9, 0]], dtype=np.float32))
+        return boxes
+
+
+def image(width, height):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def test_tile_windows_shift_the_last_row_and_column_back_inside():
+    # Stride 512: one extra column ending at 1000 and one extra row ending at 700
+    assert tile_windows(1000, 700, 640, 0.2) == [
+        (0, 0, 640, 640), (360, 0, 1000, 640), (0, 60, 640, 700), (360, 60, 1000, 700)
+    ]
+    assert tile_windows(500, 400, 640, 0.2) == [(0, 0, 500, 400)]
+
+
+@pytest.mark.parametrize("width, height, tile_size, overlap", [
+    (4000, 3000, 640, 0.2), (1281, 641, 640, 0.25), (640, 2000, 640, 0.5), (300, 5000, 256, 0.0)
+])
+def test_tile_windows_cover_the_image_with_overlap(width, height, tile_size, overlap):
+    windows = tile_windows(width, height, tile_size, overlap)
+    covered = np.zeros((height, width), dtype=bool)
+    for x1, y1, x2, y2 in windows:
+        assert x2 - x1 == min(tile_size, width) and y2 - y1 == min(tile_size, height)
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    # Neighbouring tiles overlap by at least the requested fraction
+    for starts in ({w[0] for w in windows}, {w[1] for w in windows}):
+        steps = np.diff(sorted(starts))
+        assert (steps <= tile_size * (1 - overlap)).all()
+
+
+def test_merge_detections_suppresses_within_a_class_only():
+    parts = [
+        np.array([[0, 0, 10, 10, 0.6, 1], [100, 100, 110, 110, 0.5, 2]], dtype=np.float32),
+        np.array([[1, 0, 11, 10, 0.9, 1], [0, 0, 10, 10, 0.8, 3]], dtype=np.float32),
+    ]
+    merged = merge_detections(parts, 0.5)
+    # The 0.6 box overlaps the 0.9 box of its class; the class 3 box on the same spot stays
+    assert merged[:, 4].tolist() == pytest.approx([0.9, 0.8, 0.5])
+    assert merged[:, 5].tolist() == [1, 3, 2]
+    assert merged.dtype == np.float32
+    assert merge_detections([], 0.5).shape == (0, 6)
+
+
+def test_tile_boxes_are_shifted_to_image_coordinates():
+    backend = EdgeBoxBackend()
+    tiled = TiledBackend(backend, tile_size=640, overlap=0.2, include_full_image=False)
+    boxes = tiled.predict([image(1000, 700)], 0.25, 0.5)[0]
+    # Each tile's box sits at (tile width - 40, 10) inside the tile
+    expected = {(600, 10, 640, 50), (960, 10, 1000, 50), (600, 70, 640, 110), (960, 70, 1000, 110)}
+    assert {tuple(box[:4].astype(int).tolist()) for box in boxes} == expected
+    assert backend.crop_sizes == [(640, 640)] * 4
+
+
+def test_boxes_on_inner_tile_borders_are_dropped_when_the_full_image_runs():
+    backend = EdgeBoxBackend()
+    tiled = TiledBackend(backend, tile_size=640, overlap=0.2, include_full_image=True)
+    boxes = tiled.predict([image(1000, 700)], 0.25, 0.5)[0]
+    # Boxes ending at x=640 touch an inner border and are dropped; the full-image box
+    # duplicates the right column's first box and is merged with it
+    assert sorted(tuple(box[:4].astype(int).tolist()) for box in boxes) == [(960, 10, 1000, 50), (960, 70, 1000, 110)]
+    assert backend.crop_sizes[-1] == (1000, 700)
+
+
+def test_small_images_run_untiled_and_workers_share_one_executor():
+    backend = EdgeBoxBackend()
+    tiled = TiledBackend(backend, tile_size=640, batch_size=1, workers=2)
+    assert tiled._executor is not None
+    small, large = tiled.predict([image(320, 240), image(1000, 700)], 0.25, 0.5)
+    assert small[:, :4].tolist() == [[280, 10, 320, 50]]
+    assert len(large) == 2
+
+    backend.thread_safe = False
+    assert TiledBackend(backend, workers=2)._executor is None
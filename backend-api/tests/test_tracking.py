@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.ml.inference.tracking import DetectionTracker, box_iou
+
+
+def detection(bbox, class_id=20, confidence=0.8):
+    return {"class_id": class_id, "class_name": f"class_{class_id}", "confidence": confidence,
+            "bbox": list(bbox), "area": (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])}
+
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float64)
+    np.testing.assert_allclose(box_iou(a, b), [[1.0, 1 / 3, 0.0]], atol=1e-6)
+
+
+def test_update_keeps_track_ids_and_smooths_boxes():
+    tracker = DetectionTracker(smoothing=0.5)
+    first = tracker.update([detection((0, 0, 10, 10), confidence=0.6)])
+    second = tracker.update([detection((2, 0, 12, 10), confidence=1.0)])
+    assert first[0]["track_id"] == second[0]["track_id"] == 1
+    assert second[0]["bbox"] == [1.0, 0.0, 11.0, 10.0]
+    assert second[0]["confidence"] == pytest.approx(0.8)
+    assert second[0]["tracked"] is False
+
+
+def test_detections_of_another_class_start_a_new_track():
+    tracker = DetectionTracker(min_hits=1)
+    tracker.update([detection((0, 0, 10, 10), class_id=1)])
+    results = tracker.update([detection((0, 0, 10, 10), class_id=2)])
+    assert sorted(result["track_id"] for result in results) == [1, 2]
+
+
+def test_step_moves_tracks_by_their_velocity():
+    tracker = DetectionTracker(smoothing=1.0)
+    tracker.update([detection((0, 0, 10, 10))])
+    tracker.update([detection((2, 0, 12, 10))])
+    predicted = tracker.step()
+    assert predicted[0]["bbox"] == [4.0, 0.0, 14.0, 10.0]
+    assert predicted[0]["tracked"] is True
+
+
+def test_tracks_are_dropped_after_max_misses():
+    tracker = DetectionTracker(max_misses=1)
+    tracker.update([detection((0, 0, 10, 10))])
+    tracker.update([detection((0, 0, 10, 10))])
+    coasting = tracker.update([])
+    assert len(coasting) == 1 and coasting[0]["tracked"] is True
+    assert tracker.update([]) == []
+
+
+def test_unconfirmed_tracks_are_not_reported_while_missing():
+    tracker = DetectionTracker(min_hits=2, max_misses=2)
+    tracker.update([detection((0, 0, 10, 10))])
+    assert tracker.update([]) == []
+
+
+def test_should_infer_on_keyframes_once_tracks_are_confirmed():
+    tracker = DetectionTracker(keyframe_interval=3, min_hits=2)
+    assert tracker.should_infer()
+    tracker.update([detection((0, 0, 10, 10))])
+    assert tracker.should_infer()  # The track is not confirmed yet
+    tracker.update([detection((0, 0, 10, 10))])
+    assert not tracker.should_infer()
+    tracker.step()
+    assert not tracker.should_infer()
+    tracker.step()
+    assert tracker.should_infer()
+
+
+def test_reported_values_are_rounded():
+    tracker = DetectionTracker(bbox_decimals=1, confidence_decimals=2)
+    result = tracker.update([detection((0.123, 0.0, 10.0, 10.0), confidence=0.66666)])[0]
+    assert result["bbox"][0] == 0.1
+    assert result["confidence"] == 0.67
@@ -0,0 +1,134 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.utils.uploads import (
+    MultipartPartCounter,
+    RequestSizeLimitMiddleware,
+    multipart_boundary,
+    read_upload,
+    sniff_dimensions,
+    sniff_format,
+    validate_image
+)
+
+
+def encode(image_format: str, width: int = 40, height: int = 30) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((height, width, 3), dtype=np.uint8)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("image_format, name", [("JPEG", "jpeg"), ("PNG", "png"), ("BMP", "bmp"), ("WEBP", "webp")])
+def test_sniff_format_and_dimensions(image_format, name):
+    data = encode(image_format)
+    assert sniff_format(data[:16]) == name
+    assert tuple(sniff_dimensions(name, memoryview(data))) == (40, 30)
+
+
+def test_sniff_format_rejects_other_files():
+    assert sniff_format(b"GIF89a\x00\x00") is None
+    assert sniff_format(b"%PDF-1.7") is None
+
+
+def test_sniff_dimensions_needs_more_data_or_rejects_bad_headers():
+    png = encode("PNG")
+    assert sniff_dimensions("png", memoryview(png)[:20]) is None
+    with pytest.raises(ValueError):
+        sniff_dimensions("jpeg", memoryview(b"\xff\xd8\x00\x00\x00\x00"))
+
+
+def test_validate_image_limits():
+    data = encode("JPEG", 200, 100)
+    assert validate_image(data) == "jpeg"
+    with pytest.raises(HTTPException) as error:
+        validate_image(data, max_pixels=100 * 100)
+    assert error.value.status_code == 413
+    with pytest.raises(HTTPException) as error:
+        validate_image(data, max_bytes=len(data) - 1)
+    assert error.value.status_code == 413
+    with pytest.raises(HTTPException) as error:
+        validate_image(b"GIF89a" + bytes(20))
+    assert error.value.status_code == 415
+    with pytest.raises(HTTPException) as error:
+        validate_image(b"")
+    assert error.value.status_code == 400
+
+
+def test_read_upload_copies_the_file_in_chunks():
+    data = encode("PNG", 64, 64)
+    upload = UploadFile(io.BytesIO(data), size=len(data), filename="plate.png")
+    assert asyncio.run(read_upload(upload, chunk_size=16)) == data
+
+
+def test_read_upload_rejects_before_reading_oversized_files():
+    data = encode("PNG", 64, 64)
+    upload = UploadFile(io.BytesIO(data), size=len(data), filename="plate.png")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(upload, max_bytes=len(data) - 1))
+    assert error.value.status_code == 413
+
+
+def test_multipart_boundary_from_headers():
+    headers = [(b"content-type", b'multipart/form-data; boundary="abc123"')]
+    assert multipart_boundary(headers) == b"abc123"
+    assert multipart_boundary([(b"content-type", b"application/json")]) is None
+
+
+def test_part_counter_measures_parts_across_chunk_boundaries():
+    first = b"--xyz\r\nheaders\r\n\r\n" + b"a" * 100
+    body = first + b"\r\n--xyz\r\nh\r\n\r\n" + b"b" * 10 + b"\r\n--xyz--\r\n"
+    assert MultipartPartCounter(b"xyz").feed(body) == len(first)
+    counter = MultipartPartCounter(b"xyz")
+    # Byte by byte, so every delimiter is split between chunks; a partial delimiter counts until it completes
+    largest = max(counter.feed(body[index:index + 1]) for index in range(len(body)))
+    assert len(first) <= largest < len(first) + len(counter.delimiter)
+    assert counter.part_bytes == len(b"--\r\n")
+
+
+def run_middleware(body_chunks, headers, max_body_size=10_000, max_file_size=None):
+    """Send a body through the middleware to an app that reads it all; returns the status code"""
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = RequestSizeLimitMiddleware(app, max_body_size, "/api/v1/ml", max_file_size=max_file_size)
+    messages = [{"type": "http.request", "body": chunk, "more_body": index < len(body_chunks) - 1}
+                for index, chunk in enumerate(body_chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/api/v1/ml/detect-food", "headers": headers}
+    try:
+        asyncio.run(middleware(scope, receive, send))
+    except HTTPException as e:
+        return e.status_code
+    return sent[0]["status"]
+
+
+def test_middleware_rejects_declared_oversized_bodies():
+    assert run_middleware([b""], [(b"content-length", b"20000")]) == 413
+
+
+def test_middleware_counts_streamed_bodies():
+    assert run_middleware([b"x" * 6000, b"x" * 6000], []) == 413
+    assert run_middleware([b"x" * 6000, b"x" * 3000], []) == 200
+
+
+def test_middleware_cuts_off_an_oversized_multipart_file():
+    headers = [(b"content-type", b"multipart/form-data; boundary=xyz")]
+    small = [b"--xyz\r\nContent-Disposition: form-data; name=file\r\n\r\n", b"a" * 100, b"\r\n--xyz--\r\n"]
+    assert run_middleware(small, headers, max_body_size=10**9, max_file_size=1000) == 200
+    large = [b"--xyz\r\nContent-Disposition: form-data; name=file\r\n\r\n"] + [b"a" * 10_000] * 5
+    assert run_middleware(large, headers, max_body_size=10**9, max_file_size=1000) == 413
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.ml.inference.executor import InferenceTimeout, InferenceWorkerLost
+from app.ml.inference.food_detector import FoodDetector
+from app.ml.inference.preprocessing import PreparedImage
+from app.ml.inference.worker_pool import SharedMemoryWorkerPool
+
+# Spawned workers read their settings from the environment
+STUB_ENV = {"MODEL_BACKEND": "stub", "STUB_FORWARD_MS": "200", "STUB_PER_IMAGE_MS": "0",
+            "CASCADE_ENABLED": "false", "TILING_ENABLED": "false"}
+
+
+def wait_until(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name, value in STUB_ENV.items():
+            monkeypatch.setenv(name, value)
+        pool = SharedMemoryWorkerPool(1, slots_per_worker=2, max_image_side=256, model_path="stub.pt")
+        pool.start()
+        try:
+            wait_until(lambda: pool.ready_workers == 1)
+            yield pool
+        finally:
+            pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def loop():
+    # The pool binds to the event loop of its first request
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """In-process detector matching the workers' configuration"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "CASCADE_ENABLED", False)
+        monkeypatch.setattr(settings, "TILING_ENABLED", False)
+        return FoodDetector("stub.pt", backend="stub")
+
+
+def image(width, height, seed):
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_detections_round_trip_through_shared_memory(pool, loop, reference):
+    small = image(200, 150, seed=1)
+    assert loop.run_until_complete(pool.detect(small)) == reference.detect_batch([small])[0]
+
+    # Larger than a slot: sent downscaled, boxes reported in the original frame
+    large = image(512, 384, seed=2)
+    fitted = pool.fit_image(large)
+    assert fitted.shape == (192, 256, 3)
+    expected = reference.detect_batch([fitted], [PreparedImage(fitted, (512, 384))])[0]
+    assert loop.run_until_complete(pool.detect(large)) == expected
+    assert max(d["bbox"][2] for d in expected) > 256 or max(d["bbox"][3] for d in expected) > 192
+
+
+def test_full_ring_waits_for_a_free_slot(pool, loop):
+    images = [image(64, 64, seed) for seed in range(5)]
+
+    async def detect_all():
+        return await asyncio.gather(*(pool.detect(i) for i in images))
+
+    assert len(loop.run_until_complete(detect_all())) == 5
+    assert pool.stats()["workers"][0]["slots_in_use"] == 0
+
+
+def test_slow_worker_times_out(pool, loop, monkeypatch):
+    monkeypatch.setattr(pool, "request_timeout", 0.05)
+    with pytest.raises(InferenceTimeout):
+        loop.run_until_complete(pool.detect(image(64, 64, seed=3)))
+    # The slot is freed once the worker answers anyway
+    loop.run_until_complete(asyncio.sleep(0.5))
+    assert pool.stats()["workers"][0]["slots_in_use"] == 0
+    assert pool.timeouts_total == 1
+
+
+def test_dead_worker_fails_its_requests_and_is_replaced(pool, loop):
+    async def detect_while_killed():
+        request = asyncio.ensure_future(pool.detect(image(64, 64, seed=4)))
+        await asyncio.sleep(0.05)
+        pool._rings[0].process.kill()
+        return await request
+
+    with pytest.raises(InferenceWorkerLost):
+        loop.run_until_complete(detect_while_killed())
+
+    async def ready():
+        while pool.ready_workers < 1:
+            await asyncio.sleep(0.05)
+
+    loop.run_until_complete(asyncio.wait_for(ready(), 60))
+    assert pool.stats()["workers"][0]["restarts"] == 1
+    assert loop.run_until_complete(pool.detect(image(64, 64, seed=5)))